@@ -1,11 +1,22 @@
 import os
 import json
-from typing import Any, Dict, Optional
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
 
 import google.generativeai as genai
 
+from src.analysis import llm_gateway
+from src.utils.cancellation import OperationCancelled, raise_if_cancelled, sleep_or_cancel
+from src.utils.env import get_float_env
+from src.utils.timings import timed
 
-DEFAULT_MODEL = os.environ.get("GEMINI_MODEL", "models/gemini-2.0-flash")
+
+# Backoff between polls of an upload's processing state (seconds)
+PROCESSING_POLL_INITIAL = 1.0
+PROCESSING_POLL_MAX = 15.0
 
 
 def _ensure_api_key():
@@ -15,7 +26,122 @@ def _ensure_api_key():
     genai.configure(api_key=api_key)
 
 
-def generate_analysis(
+def delete_uploaded_file(video_file) -> bool:
+    """
+    Best-effort removal of an uploaded file (file object or name) from Gemini,
+    e.g. after a cancelled analysis. Returns True if the file was deleted.
+    """
+    name = getattr(video_file, "name", video_file)
+    try:
+        genai.delete_file(name)
+        print(f"🗑️ Deleted uploaded file: {name}")
+        return True
+    except Exception as e:
+        print(f"⚠️  Failed to delete uploaded file {name}: {e}")
+        return False
+
+
+def processing_timeout() -> float:
+    """Deadline in seconds for Gemini to finish processing an upload (GEMINI_PROCESSING_TIMEOUT)."""
+    return get_float_env("GEMINI_PROCESSING_TIMEOUT", 600.0)
+
+
+def processing_poll_delays() -> Iterator[float]:
+    """
+    Delays between processing-state polls: exponential backoff from
+    PROCESSING_POLL_INITIAL to PROCESSING_POLL_MAX seconds, each randomly
+    shortened by up to half so concurrent uploads don't poll in lockstep.
+    """
+    delay = PROCESSING_POLL_INITIAL
+    while True:
+        yield delay * random.uniform(0.5, 1.0)
+        delay = min(PROCESSING_POLL_MAX, delay * 2)
+
+
+def ensure_active(video_file):
+    """Return the processed file, or delete it and raise if processing failed."""
+    if video_file.state.name != "ACTIVE":
+        delete_uploaded_file(video_file)
+        raise RuntimeError(f"File processing failed: {video_file.state.name}")
+    print("✅ File is ready")
+    return video_file
+
+
+def upload_file(
+    video_path: str,
+    label: str = "Video analysis",
+    timings: Optional[Dict[str, Any]] = None,
+    cancel_event: Optional[threading.Event] = None,
+):
+    """
+    Upload a video to Gemini without waiting for processing.
+    Records upload/upload_bytes in timings. Blocking - run in the io pool.
+    """
+    _ensure_api_key()
+
+    raise_if_cancelled(cancel_event, label)
+    print(f"📤 Uploading video: {Path(video_path).name}")
+    with timed(timings, "upload"):
+        video_file = genai.upload_file(path=video_path)
+    if timings is not None:
+        timings["upload_bytes"] = os.path.getsize(video_path)
+    print(f"✅ Uploaded as: {video_file.name}")
+    return video_file
+
+
+def get_file(name: str):
+    """Current state of an uploaded file. Blocking."""
+    _ensure_api_key()
+    return genai.get_file(name)
+
+
+def upload_and_wait(
+    video_path: str,
+    label: str = "Video analysis",
+    timings: Optional[Dict[str, Any]] = None,
+    cancel_event: Optional[threading.Event] = None,
+):
+    """
+    Upload a video to Gemini and poll (with backoff, up to
+    GEMINI_PROCESSING_TIMEOUT) until it has been processed.
+
+    Blocking variant for command-line scripts; the analyzers and services
+    wait with the shared asyncio poller instead (see GeminiPoller).
+    The upload is deleted again if the wait is cancelled, times out or
+    processing fails.
+    """
+    video_file = upload_file(video_path, label, timings, cancel_event)
+
+    print("⏳ Waiting for file to be processed...")
+    deadline = time.monotonic() + processing_timeout()
+    delays = processing_poll_delays()
+    try:
+        raise_if_cancelled(cancel_event, label)
+        with timed(timings, "processing_wait"):
+            while video_file.state.name == "PROCESSING":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{label}: file {video_file.name} still processing after {processing_timeout():.0f}s")
+                sleep_or_cancel(cancel_event, min(next(delays), remaining), label)
+                video_file = get_file(video_file.name)
+    except (OperationCancelled, TimeoutError):
+        delete_uploaded_file(video_file)
+        raise
+
+    return ensure_active(video_file)
+
+
+def get_active_file(name: str):
+    """The uploaded file if it still exists and is ACTIVE, else None. Blocking."""
+    try:
+        video_file = get_file(name)
+    except Exception as e:
+        print(f"⚠️  Uploaded file {name} is not available: {e}")
+        return None
+    return video_file if video_file.state.name == "ACTIVE" else None
+
+
+async def generate_analysis(
     video_facts: Dict[str, Any],
     schema: Optional[Dict[str, Any]] = None,
     model_name: Optional[str] = None,
@@ -27,14 +153,6 @@ def generate_analysis(
     - MVP uses only textual/meta fields; do not hallucinate visual details.
     - If schema is provided, we request JSON output accordingly.
     """
-    _ensure_api_key()
-
-    model_to_use = model_name or DEFAULT_MODEL
-    if not model_to_use.startswith("models/"):
-        model_to_use = f"models/{model_to_use}"
-    
-    model = genai.GenerativeModel(model_to_use)
-
     # Check if this is an aggregation task
     task_type = video_facts.get("task")
     
@@ -90,21 +208,9 @@ def generate_analysis(
     else:
         prompt = [system_msg, user_msg, "Відповідь виключно у форматі JSON."]
 
-    resp = model.generate_content(
+    return await llm_gateway.generate_json(
         prompt,
+        model_name=model_name,
         generation_config=generation_config,
+        label="Analysis generation",
     )
-
-    if resp.prompt_feedback and getattr(resp.prompt_feedback, "block_reason", None):
-        raise RuntimeError(f"Gemini blocked the request: {resp.prompt_feedback.block_reason}")
-
-    text = resp.text or "{}"
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # Try to extract fenced JSON if any
-        import re
-        m = re.search(r"\{[\s\S]*\}", text)
-        if m:
-            return json.loads(m.group(0))
-        raise
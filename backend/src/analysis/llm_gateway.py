@@ -0,0 +1,165 @@
+"""
+Async gateway for Gemini generate calls.
+
+All LLM entry points (creative analysis, policy checks, competitor
+aggregation, the chat planner) go through generate_json()/generate(),
+which await the SDK's native generate_content_async instead of holding a
+worker thread for the length of a generation. Model instances, retries
+with jittered backoff, timeouts and JSON parsing live here in one place.
+
+The SDK has no async upload API; uploads run in the io pool (see
+GeminiFiles).
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from src.utils.env import get_float_env, get_int_env
+from src.utils.timings import timed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "models/gemini-2.0-flash"
+
+# Rate limits and transient server errors are retried; everything else fails fast
+RETRYABLE_ERRORS: Tuple[type, ...] = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+)
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 30.0
+
+_models: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+
+
+def _ensure_api_key():
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_API_KEY is not set. Please export your Google AI Studio API key.")
+    genai.configure(api_key=api_key)
+
+
+def normalize_model_name(model_name: Optional[str] = None) -> str:
+    """Model name with the models/ prefix (default GEMINI_MODEL)."""
+    model_to_use = model_name or os.environ.get("GEMINI_MODEL", DEFAULT_MODEL)
+    if not model_to_use.startswith("models/"):
+        model_to_use = f"models/{model_to_use}"
+    return model_to_use
+
+
+def get_model(
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None
+) -> genai.GenerativeModel:
+    """Shared GenerativeModel for a model name and default generation config."""
+    _ensure_api_key()
+    name = normalize_model_name(model_name)
+    key = (name, json.dumps(generation_config or {}, sort_keys=True, default=str))
+    model = _models.get(key)
+    if model is None:
+        model = genai.GenerativeModel(name, generation_config=generation_config)
+        _models[key] = model
+    return model
+
+
+def parse_json(text: Optional[str]) -> Dict[str, Any]:
+    """
+    Parse a JSON object from a model response, falling back to the
+    outermost {...} block (e.g. when wrapped in a markdown fence).
+    Raises ValueError if no JSON object can be parsed.
+    """
+    text = text or "{}"
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r"\{[\s\S]*\}", text)
+        if match:
+            return json.loads(match.group(0))
+        raise
+
+
+async def generate(
+    contents: Any,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+    timings: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    fallback_models: Sequence[str] = (),
+    label: str = "Gemini request",
+):
+    """
+    Await a generation and return the SDK response.
+
+    Each attempt is bounded by timeout (GEMINI_TIMEOUT seconds); rate limits,
+    5xx errors and timeouts are retried up to retries (GEMINI_RETRIES) times
+    with jittered exponential backoff. If the model does not exist, the
+    fallback_models are tried in order. Raises RuntimeError if the prompt
+    was blocked. Generation seconds are recorded under "generate" in timings.
+    """
+    timeout = timeout if timeout is not None else get_float_env("GEMINI_TIMEOUT", 300.0)
+    retries = max(0, retries if retries is not None else get_int_env("GEMINI_RETRIES", 2))
+    candidates = [normalize_model_name(model_name)] + [normalize_model_name(m) for m in fallback_models]
+
+    with timed(timings, "generate"):
+        for index, candidate in enumerate(candidates):
+            model = get_model(candidate)
+            try:
+                response = await _generate_with_retries(
+                    model, contents, generation_config, timeout, retries, label
+                )
+                break
+            except google_exceptions.NotFound:
+                if index == len(candidates) - 1:
+                    raise
+                logger.warning(f"⚠️ Model {candidate} not available, trying {candidates[index + 1]}...")
+
+    feedback = getattr(response, "prompt_feedback", None)
+    if feedback and getattr(feedback, "block_reason", None):
+        raise RuntimeError(f"Gemini blocked the request: {feedback.block_reason}")
+    return response
+
+
+async def generate_json(contents: Any, **kwargs) -> Dict[str, Any]:
+    """generate() and parse the response text as JSON (see parse_json)."""
+    response = await generate(contents, **kwargs)
+    return parse_json(response.text)
+
+
+async def _generate_with_retries(
+    model: genai.GenerativeModel,
+    contents: Any,
+    generation_config: Optional[Dict[str, Any]],
+    timeout: float,
+    retries: int,
+    label: str
+):
+    delay = RETRY_BASE_SECONDS
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.wait_for(
+                model.generate_content_async(
+                    contents,
+                    generation_config=generation_config,
+                    request_options={"timeout": timeout}
+                ),
+                timeout
+            )
+        except RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                raise
+            wait = delay * random.uniform(0.5, 1.0)
+            logger.warning(f"⚠️ {label} failed ({type(e).__name__}: {e}), retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            delay = min(RETRY_MAX_SECONDS, delay * 2)
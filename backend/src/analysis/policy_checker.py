@@ -2,15 +2,27 @@
 Video policy compliance checker using Gemini vision.
 Analyzes videos for Facebook Ads Policy violations.
 """
+import asyncio
 import os
+import tempfile
+import threading
+import time
 from typing import Dict, Any, Optional
 from pathlib import Path
 
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+from src.analysis import llm_gateway
+from src.analysis.gemini_client import delete_uploaded_file
+from src.services.executor_pool import ExecutorPool
+from src.services.gemini_poller import GeminiPoller
+from src.services.video_downloader import VideoDownloader
+
 load_dotenv()
 
+# Bump whenever the policy prompt or output schema changes (invalidates cached checks)
+POLICY_PROMPT_VERSION = "fb-policy-v1"
+
 FACEBOOK_POLICY_PROMPT = """
 Ти — експерт з Facebook/Meta Ads Policy з глибоким знанням всіх рекламних політик платформи. Проаналізуй це відео максимально детально і перевір його на відповідність всім вимогам Meta для рекламного контенту.
 
@@ -494,11 +506,14 @@ FACEBOOK_POLICY_PROMPT = """
 """
 
 
-def check_video_policy(
+async def check_video_policy(
     video_path: str,
     platform: str = "facebook",
     model_name: Optional[str] = None,
-    video_url: Optional[str] = None
+    video_url: Optional[str] = None,
+    timings: Optional[Dict[str, Any]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    video_file=None
 ) -> Dict[str, Any]:
     """
     Check video compliance with platform advertising policy.
@@ -507,6 +522,11 @@ def check_video_policy(
         video_path: Path to video file
         platform: Platform name (currently only 'facebook')
         model_name: Gemini model to use
+        video_url: Video URL to download instead of a local path
+        timings: Optional dict that receives download/upload/processing_wait/generate seconds
+        cancel_event: Optional event that stops the download/upload (when no video_file is given)
+        video_file: Optional ACTIVE Gemini file of this video (from the file registry);
+            it is reused instead of uploading and left in place afterwards
     
     Returns:
         Dictionary with policy check results
@@ -514,101 +534,64 @@ def check_video_policy(
     if platform != "facebook":
         raise ValueError(f"Platform '{platform}' not supported yet. Only 'facebook' is available.")
     
-    # Configure Gemini
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY is not set")
-    
-    genai.configure(api_key=api_key)
-    
-    # Upload video (from path or URL)
-    if video_url:
-        # Direct upload from URL (no intermediate storage)
-        print(f"📤 Uploading video from URL for policy check...")
-        import httpx
-        import io
-        
-        with httpx.stream("GET", video_url, follow_redirects=True, timeout=60.0) as response:
-            response.raise_for_status()
-            
-            # Create in-memory file
-            video_bytes = io.BytesIO()
-            for chunk in response.iter_bytes():
-                video_bytes.write(chunk)
-            video_bytes.seek(0)
-            
-            # Upload to Gemini from memory
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
-                tmp.write(video_bytes.read())
-                tmp_path = tmp.name
-            
-            try:
-                video_file = genai.upload_file(path=tmp_path)
-                print(f"✅ Uploaded as: {video_file.name}")
-            finally:
-                os.unlink(tmp_path)
+    # Upload video (from path or URL) unless an ACTIVE upload is reused.
+    # The upload runs in the io pool and processing is awaited with the shared poller
+    owns_upload = video_file is None
+    if not owns_upload:
+        print(f"♻️ Reusing uploaded file: {video_file.name}")
+    elif video_url:
+        # Download through the shared pooled client to a temporary file, then upload from disk
+        print(f"📥 Downloading video from URL for policy check...")
+        fd, tmp_path = tempfile.mkstemp(prefix="policy_", suffix=".mp4")
+        os.close(fd)
+        try:
+            _, size = await VideoDownloader.download(video_url, Path(tmp_path), cancel_event, timings)
+            if timings is not None:
+                timings["download_bytes"] = size
+            video_file = await GeminiPoller.upload(tmp_path, "Policy check", timings, cancel_event)
+        finally:
+            os.unlink(tmp_path)
     else:
         # Upload from local path
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
         print(f"📤 Uploading video for policy check: {Path(video_path).name}")
-        video_file = genai.upload_file(path=video_path)
-        print(f"✅ Uploaded as: {video_file.name}")
-    
-    # Wait for processing
-    import time
-    print("⏳ Waiting for video processing...")
-    while video_file.state.name == "PROCESSING":
-        time.sleep(2)
-        video_file = genai.get_file(video_file.name)
-    
-    if video_file.state.name != "ACTIVE":
-        raise RuntimeError(f"Video processing failed: {video_file.state.name}")
+        video_file = await GeminiPoller.upload(video_path, "Policy check", timings, cancel_event)
     
     print("✅ Video ready for analysis")
     
-    # Get model
-    model_to_use = model_name or os.environ.get("GEMINI_MODEL", "models/gemini-2.0-flash")
-    if not model_to_use.startswith("models/"):
-        model_to_use = f"models/{model_to_use}"
-    
-    model = genai.GenerativeModel(model_to_use)
-    
     # Analyze
+    model_to_use = llm_gateway.normalize_model_name(model_name)
     print("🔍 Analyzing video for policy compliance...")
-    response = model.generate_content(
-        [video_file, FACEBOOK_POLICY_PROMPT],
-        generation_config={
-            "temperature": 0.2,
-            "response_mime_type": "application/json"
-        }
-    )
-    
-    if response.prompt_feedback and getattr(response.prompt_feedback, "block_reason", None):
-        raise RuntimeError(f"Gemini blocked the request: {response.prompt_feedback.block_reason}")
+    try:
+        response = await llm_gateway.generate(
+            [video_file, FACEBOOK_POLICY_PROMPT],
+            model_name=model_to_use,
+            generation_config={
+                "temperature": 0.2,
+                "response_mime_type": "application/json"
+            },
+            timings=timings,
+            label="Policy check",
+        )
+    except asyncio.CancelledError:
+        # Result is no longer wanted - don't leave our own upload behind
+        if owns_upload:
+            await ExecutorPool.run("io", delete_uploaded_file, video_file)
+        raise
     
     # Parse result
-    import json
-    result_text = response.text or "{}"
-    
     try:
-        result = json.loads(result_text)
-    except json.JSONDecodeError:
-        # Try to extract JSON from response
-        import re
-        match = re.search(r'\{[\s\S]*\}', result_text)
-        if match:
-            result = json.loads(match.group(0))
-        else:
-            raise ValueError("Failed to parse Gemini response as JSON")
+        result = llm_gateway.parse_json(response.text)
+    except ValueError:
+        raise ValueError("Failed to parse Gemini response as JSON")
     
     print("✅ Policy check complete!")
     
     # Add metadata
     result["metadata"] = {
-        "video_path": video_path if video_path else "streamed_from_url",
+        "video_path": video_path if video_path else "downloaded_from_url",
         "video_url": video_url,
         "platform": platform,
         "model": model_to_use,
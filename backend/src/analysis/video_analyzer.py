@@ -2,29 +2,40 @@
 Video analysis prototype using Gemini vision capabilities.
 Extracts hooks, CTAs, visual elements, on-screen text, and product showcase from video ads.
 """
+import asyncio
 import os
 import json
+import threading
 from typing import Dict, Any, Optional
-from pathlib import Path
 
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from src.analysis import llm_gateway
+from src.analysis.gemini_client import delete_uploaded_file
+from src.services.executor_pool import ExecutorPool
+from src.services.gemini_poller import GeminiPoller
 
 load_dotenv()
-DEFAULT_MODEL = os.environ.get("GEMINI_MODEL", "models/gemini-2.0-flash")
 
+# Bump whenever the analysis prompt or output schema changes (invalidates cached analyses)
+PROMPT_VERSION = "perf-marketing-v1"
+
+# Tried in order when the requested model is not available
+FALLBACK_MODELS = ("models/gemini-2.0-flash", "models/gemini-2.0-pro-exp")
 
-def _ensure_api_key():
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY is not set. Please export your Google AI Studio API key.")
-    genai.configure(api_key=api_key)
 
+def resolve_model_name(model_name: Optional[str] = None) -> str:
+    """Model that analyze_video_file will request, with the models/ prefix."""
+    return llm_gateway.normalize_model_name(model_name)
 
-def analyze_video_file(
+
+async def analyze_video_file(
     video_path: str,
     meta: Optional[Dict[str, Any]] = None,
     model_name: Optional[str] = None,
+    timings: Optional[Dict[str, Any]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    video_file=None,
 ) -> Dict[str, Any]:
     """
     Analyze a video file using Gemini vision model.
@@ -32,48 +43,21 @@ def analyze_video_file(
     Args:
         video_path: Path to the cached video file
         meta: Optional metadata about the creative (page_name, platforms, etc.)
-        model_name: Gemini model to use (default: gemini-1.5-flash)
+        model_name: Gemini model to use (default: GEMINI_MODEL)
+        timings: Optional dict that receives upload/processing_wait/generate seconds
+        cancel_event: Optional event that stops uploading video_path (when no video_file is given)
+        video_file: Optional ACTIVE Gemini file of this video (from the file registry);
+            it is reused instead of uploading and left in place afterwards
     
     Returns:
         Dictionary with structured analysis
     """
-    _ensure_api_key()
-    
-    if not os.path.exists(video_path):
-        raise FileNotFoundError(f"Video file not found: {video_path}")
-    
-    # Upload video to Gemini
-    print(f"📤 Uploading video: {Path(video_path).name}")
-    video_file = genai.upload_file(path=video_path)
-    print(f"✅ Uploaded as: {video_file.name}")
-    
-    # Wait for file to become active
-    import time
-    print("⏳ Waiting for file to be processed...")
-    while video_file.state.name == "PROCESSING":
-        time.sleep(2)
-        video_file = genai.get_file(video_file.name)
-    
-    if video_file.state.name != "ACTIVE":
-        raise RuntimeError(f"File processing failed: {video_file.state.name}")
-    print("✅ File is ready")
-    
-    # Try to use specified model, fallback to working alternatives
-    model_to_use = model_name or DEFAULT_MODEL
-    
-    # Ensure model name has correct prefix
-    if not model_to_use.startswith("models/"):
-        model_to_use = f"models/{model_to_use}"
-    
-    try:
-        model = genai.GenerativeModel(model_to_use)
-    except Exception as e:
-        print(f"⚠️  Model {model_to_use} not available, trying models/gemini-2.0-flash...")
-        try:
-            model = genai.GenerativeModel("models/gemini-2.0-flash")
-        except Exception:
-            print("⚠️  Trying models/gemini-2.0-pro-exp...")
-            model = genai.GenerativeModel("models/gemini-2.0-pro-exp")
+    owns_upload = video_file is None
+    if owns_upload:
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+        # Upload in the io pool and wait with the shared poller (services pass a registry file instead)
+        video_file = await GeminiPoller.upload(video_path, "Video analysis", timings, cancel_event)
     
     # Build context
     context = ""
@@ -209,26 +193,31 @@ CTA (Call-to-Action): Проаналізуй заклик до дії. Чи є 
 
     # Generate analysis
     print("🤖 Аналізую відео з Gemini...")
-    response = model.generate_content(
-        [video_file, prompt],
-        generation_config={
-            "temperature": 0.3,
-            "response_mime_type": "application/json",
-        }
-    )
+    try:
+        response = await llm_gateway.generate(
+            [video_file, prompt],
+            model_name=model_name,
+            generation_config={
+                "temperature": 0.3,
+                "response_mime_type": "application/json",
+            },
+            timings=timings,
+            fallback_models=FALLBACK_MODELS,
+            label="Video analysis",
+        )
+    except asyncio.CancelledError:
+        # Result is no longer wanted - don't leave our own upload behind
+        if owns_upload:
+            await ExecutorPool.run("io", delete_uploaded_file, video_file)
+        raise
     
     # Parse JSON response
     try:
-        result = json.loads(response.text)
+        result = llm_gateway.parse_json(response.text)
         print("✅ Аналіз завершено")
         return result
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"⚠️  JSON parse error: {e}")
-        # Try to extract JSON from response
-        import re
-        m = re.search(r"\{[\s\S]*\}", response.text)
-        if m:
-            return json.loads(m.group(0))
         # Fallback
         return {
             "error": "Failed to parse JSON",
@@ -247,7 +236,7 @@ def analyze_video_prototype(video_path: str, output_path: Optional[str] = None)
     Returns:
         Analysis dictionary
     """
-    result = analyze_video_file(video_path)
+    result = asyncio.run(analyze_video_file(video_path))
     
     if output_path:
         with open(output_path, "w", encoding="utf-8") as f:
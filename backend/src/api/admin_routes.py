@@ -0,0 +1,185 @@
+"""
+Operational endpoints: worker pool gauges and other runtime statistics.
+"""
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import Literal, Optional
+import logging
+
+from src.db import MongoDB
+from src.services.analysis_cache import AnalysisCache
+from src.services.executor_pool import ExecutorPool
+from src.services.gemini_files import GeminiFiles
+from src.services.video_cache import VideoCache
+from src.services.video_downloader import VideoDownloader
+from src.utils.timings import timing_report
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/executors", summary="Executor pool gauges")
+async def get_executor_stats():
+    """
+    Get queue depth and active-worker gauges for the shared executor pools.
+    """
+    return {
+        "success": True,
+        "executors": ExecutorPool.stats()
+    }
+
+
+@router.get("/downloads", summary="Video downloader metrics")
+async def get_download_stats():
+    """
+    Get download counts, retries/resumes, bytes and average throughput of the
+    shared video downloader, plus transfers in flight per host.
+    """
+    return {
+        "success": True,
+        "downloads": VideoDownloader.stats()
+    }
+
+
+@router.get("/analysis-cache", summary="Analysis cache statistics")
+async def get_analysis_cache_stats():
+    """
+    Get the number of cached creative analyses and how often they were reused.
+    """
+    try:
+        return {
+            "success": True,
+            "analysis_cache": await AnalysisCache.stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting analysis cache stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get analysis cache stats: {str(e)}"
+        )
+
+
+@router.delete("/analysis-cache", summary="Invalidate cached analyses")
+async def invalidate_analysis_cache(
+    ad_archive_id: Optional[str] = Query(None, description="Only entries for this ad"),
+    video_hash: Optional[str] = Query(None, description="Only entries for this video content hash"),
+    prompt_version: Optional[str] = Query(None, description="Only entries produced by this prompt version")
+):
+    """
+    Delete cached creative analyses. Without filters the whole cache is cleared.
+    """
+    try:
+        deleted = await AnalysisCache.invalidate(ad_archive_id, video_hash, prompt_version)
+        return {"success": True, "deleted": deleted}
+    except Exception as e:
+        logger.error(f"Error invalidating analysis cache: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to invalidate analysis cache: {str(e)}"
+        )
+
+
+@router.get("/video-cache", summary="Video cache statistics")
+async def get_video_cache_stats():
+    """
+    Get size, blob/alias counts and hit/miss/eviction counters of the video cache.
+    """
+    try:
+        return {
+            "success": True,
+            "video_cache": await VideoCache.stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting video cache stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get video cache stats: {str(e)}"
+        )
+
+
+@router.post("/video-cache/cleanup", summary="Evict and clean up cached videos")
+async def cleanup_video_cache(
+    max_bytes: Optional[int] = Query(None, ge=1, description="Size to evict down to (default VIDEO_CACHE_MAX_BYTES)")
+):
+    """
+    Remove orphaned files/records, then evict least recently used unpinned
+    videos until the cache fits the size cap.
+    """
+    try:
+        orphans = await VideoCache.cleanup_orphans()
+        eviction = await VideoCache.evict(max_bytes)
+        return {"success": True, "orphans": orphans, "eviction": eviction}
+    except Exception as e:
+        logger.error(f"Error cleaning up video cache: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to clean up video cache: {str(e)}"
+        )
+
+
+@router.get("/gemini-files", summary="Gemini upload registry statistics")
+async def get_gemini_file_stats():
+    """
+    Get the number of registered (and still reusable) Gemini uploads and how
+    often this process uploaded vs reused a video.
+    """
+    try:
+        return {
+            "success": True,
+            "gemini_files": await GeminiFiles.stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting Gemini file stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get Gemini file stats: {str(e)}"
+        )
+
+
+@router.post("/gemini-files/cleanup", summary="Delete expired and unused Gemini uploads")
+async def cleanup_gemini_files(
+    idle_seconds: Optional[int] = Query(None, ge=0, description="Idle time before deletion (default GEMINI_FILE_IDLE_SECONDS)")
+):
+    """
+    Run the Gemini file janitor now: drop records of expired uploads and
+    delete uploads that expire soon or have not been used recently.
+    """
+    try:
+        return {"success": True, **await GeminiFiles.cleanup(idle_seconds)}
+    except Exception as e:
+        logger.error(f"Error cleaning up Gemini files: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to clean up Gemini files: {str(e)}"
+        )
+
+
+@router.get("/timings", summary="Stage timing percentiles")
+async def get_timing_percentiles(
+    kind: Literal["task", "policy"] = Query("task", description="Ads tasks or policy-check tasks"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of most recent tasks to include")
+):
+    """
+    Get p50/p90/p99 wall-clock timings per pipeline stage (and per creative
+    stage) across the most recent tasks, to see which stage needs scaling.
+    """
+    try:
+        db = MongoDB.get_db()
+        collection = db.tasks if kind == "task" else db.policy_tasks
+        cursor = collection.find(
+            {"timings.stages": {"$exists": True}},
+            {"timings": 1}
+        ).sort("updated_at", -1).limit(limit)
+        docs = await cursor.to_list(length=limit)
+        
+        return {
+            "success": True,
+            "kind": kind,
+            **timing_report(doc.get("timings") for doc in docs)
+        }
+    except Exception as e:
+        logger.error(f"Error computing timing percentiles: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute timing percentiles: {str(e)}"
+        )
@@ -21,13 +21,25 @@ from src.services.chat_planner import (
     get_missing_fields,
     is_brief_complete
 )
+from src.services.executor_pool import ExecutorPool
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize planner (singleton)
-planner = ChatPlanner()
+# Planner singleton, created on first use so importing the API does not need GOOGLE_API_KEY
+_planner: Optional[ChatPlanner] = None
+
+# Task fields the planner's patterns are extracted from
+PATTERN_FIELDS = {"page_name": 1, "creatives_analyzed": 1, "aggregated_analysis": 1}
+
+
+def get_planner() -> ChatPlanner:
+    """Shared ChatPlanner (raises ValueError if GOOGLE_API_KEY is not set)."""
+    global _planner
+    if _planner is None:
+        _planner = ChatPlanner()
+    return _planner
 
 
 # ============================================================================
@@ -207,16 +219,16 @@ async def send_message(request: SendMessageRequest):
         # Get patterns from task if available
         patterns = None
         if session.task_id:
-            task = await db.tasks.find_one({"task_id": session.task_id})
+            task = await db.tasks.find_one({"task_id": session.task_id}, PATTERN_FIELDS)
             if task:
                 from src.services.patterns_extractor import extract_patterns_summary
-                patterns = extract_patterns_summary(task)
+                patterns = await ExecutorPool.run("cpu", extract_patterns_summary, task)
                 logger.info(f"✅ Loaded patterns from task {session.task_id}")
 
-        # Call LLM planner
+        # Call LLM planner (async Gemini call - keeps the event loop free)
         logger.info(f"🤖 Planning next step for session {request.session_id}")
         try:
-            plan_result = planner.plan_next_step(
+            plan_result = await get_planner().plan_next_step(
                 user_message=request.message,
                 known_fields=session.known.model_dump(),
                 conversation_history=conversation_history,
@@ -539,7 +551,7 @@ async def _create_initial_greeting(task_id: Optional[str], db) -> str:
     
     try:
         # Get task data
-        task = await db.tasks.find_one({"task_id": task_id})
+        task = await db.tasks.find_one({"task_id": task_id}, PATTERN_FIELDS)
         if not task:
             return default_greeting
             
@@ -552,7 +564,7 @@ async def _create_initial_greeting(task_id: Optional[str], db) -> str:
             
         # Extract patterns for personalized greeting
         from src.services.patterns_extractor import extract_patterns_summary
-        patterns = extract_patterns_summary(task)
+        patterns = await ExecutorPool.run("cpu", extract_patterns_summary, task)
         
         # Create personalized greeting
         greeting_parts = [
@@ -73,9 +73,20 @@ class ParseAdsRequest(BaseModel):
     max_results: int = Field(default=5, ge=1, le=100, description="Maximum number of ads to extract")
     fetch_all_details: bool = Field(default=True, description="Whether to fetch full creative details")
     auto_analyze: bool = Field(default=True, description="Automatically start video analysis after parsing")
+    analysis_budget: int = Field(default=10, ge=1, le=100, description="Maximum number of top-ranked video ads to analyze")
+    check_policy: bool = Field(default=False, description="Also run the ads-policy check on each analyzed video (same upload, runs concurrently)")
     output_filename: Optional[str] = Field(default=None, description="Custom output filename (without extension)")
 
 
+class ParseAdsBatchRequest(BaseModel):
+    """Request model for parsing several competitors with one Apify run."""
+    urls: List[str] = Field(..., min_length=1, max_length=20, description="Facebook Ads Library URLs, one per competitor")
+    max_results: int = Field(default=5, ge=1, le=100, description="Maximum number of ads to extract per URL")
+    auto_analyze: bool = Field(default=True, description="Automatically start video analysis after parsing")
+    analysis_budget: int = Field(default=10, ge=1, le=100, description="Maximum number of top-ranked video ads to analyze per competitor")
+    check_policy: bool = Field(default=False, description="Also run the ads-policy check on each analyzed video (same upload, runs concurrently)")
+
+
 class ParseAdsResponse(BaseModel):
     """Response model for parsing ads."""
     success: bool
@@ -9,8 +9,6 @@ import logging
 import tempfile
 import os
 from pathlib import Path
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from src.analysis.policy_checker import check_video_policy, format_policy_report
 
@@ -47,17 +45,13 @@ async def check_video_from_url(request: PolicyCheckRequest):
     try:
         logger.info(f"Policy check requested for URL: {request.video_url}")
         
-        # Check policy directly from URL (streaming - no local storage)
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(
-                executor,
-                check_video_policy,
-                None,  # video_path
-                request.platform,
-                None,  # model_name
-                request.video_url  # video_url for direct streaming
-            )
+        # Downloaded through the shared video downloader to a temporary file
+        result = await check_video_policy(
+            None,  # video_path
+            request.platform,
+            None,  # model_name
+            request.video_url
+        )
         
         # Generate text report
         text_report = format_policy_report(result)
@@ -114,15 +108,8 @@ async def check_video_from_upload(
                 
                 logger.info(f"File saved to: {temp_path}")
                 
-                # Check policy in thread pool
-                loop = asyncio.get_event_loop()
-                with ThreadPoolExecutor() as executor:
-                    result = await loop.run_in_executor(
-                        executor,
-                        check_video_policy,
-                        temp_path,
-                        platform
-                    )
+                # Check policy (async Gemini call)
+                result = await check_video_policy(temp_path, platform)
                 
                 # Generate text report
                 text_report = format_policy_report(result)
@@ -2,6 +2,7 @@
 API routes for video policy compliance checking with task tracking.
 """
 from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
 import logging
@@ -9,16 +10,18 @@ import tempfile
 import os
 import uuid
 from pathlib import Path
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from src.db import MongoDB, PolicyTask, PolicyCheckStatus
+from src.db import MongoDB, PolicyTask, PolicyCheckStatus, JobType
+from src.services.job_queue import JobQueue
+from src.services.task_events import TaskEvents, sse_stream
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+TERMINAL_STATUSES = [PolicyCheckStatus.COMPLETED, PolicyCheckStatus.FAILED, PolicyCheckStatus.CANCELLED]
+
 
 class CreatePolicyCheckRequest(BaseModel):
     """Request to create policy check task."""
@@ -52,13 +55,14 @@ async def create_policy_check(request: CreatePolicyCheckRequest):
         )
         await db.policy_tasks.insert_one(task.model_dump())
         
-        # Start background check
-        asyncio.create_task(
-            policy_check_task(
-                task_id=task_id,
-                video_url=request.video_url,
-                platform=request.platform
-            )
+        # Queue background check
+        await JobQueue.enqueue(
+            JobType.POLICY_CHECK,
+            {
+                "task_id": task_id,
+                "video_url": request.video_url,
+                "platform": request.platform
+            }
         )
         
         logger.info(f"✅ Created policy check task {task_id}")
@@ -114,6 +118,82 @@ async def get_policy_task(task_id: str):
         )
 
 
+@router.delete("/task/{task_id}", summary="Cancel policy check task")
+async def cancel_policy_task(task_id: str):
+    """
+    Cancel a pending or running policy check.
+    The worker stops the download / Gemini processing poll and deletes the uploaded video.
+    """
+    try:
+        db = MongoDB.get_db()
+        
+        task = await db.policy_tasks.find_one({"task_id": task_id}, {"status": 1})
+        
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Policy task {task_id} not found"
+            )
+        
+        result = await db.policy_tasks.update_one(
+            {"task_id": task_id, "status": {"$nin": TERMINAL_STATUSES}},
+            {"$set": {"status": PolicyCheckStatus.CANCELLED, "updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Policy check already finished. Current status: {task['status']}"
+            )
+        
+        await JobQueue.request_cancel(task_id, [JobType.POLICY_CHECK])
+        await TaskEvents.publish(task_id, "status", {"status": PolicyCheckStatus.CANCELLED}, kind="policy")
+        
+        logger.info(f"🛑 Cancelled policy check {task_id}")
+        
+        return {
+            "success": True,
+            "message": "Policy check cancelled",
+            "task_id": task_id,
+            "status": PolicyCheckStatus.CANCELLED
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling policy task {task_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to cancel policy task: {str(e)}"
+        )
+
+
+@router.get("/task/{task_id}/events", summary="Stream policy check progress")
+async def stream_policy_task_events(task_id: str):
+    """
+    Server-Sent Events stream of policy check progress.
+    Ends once the check is COMPLETED, FAILED or CANCELLED.
+    """
+    db = MongoDB.get_db()
+    since = datetime.utcnow()  # Events from here on are streamed; older ones are in the snapshot
+    
+    task = await db.policy_tasks.find_one(
+        {"task_id": task_id},
+        projection={"_id": 0, "html_report": 0, "policy_result": 0}
+    )
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Policy task {task_id} not found"
+        )
+    
+    return StreamingResponse(
+        sse_stream(task_id, "policy", task, TERMINAL_STATUSES, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/tasks", summary="List all policy check tasks")
 async def list_policy_tasks(
     skip: int = Query(0, ge=0),
@@ -174,72 +254,3 @@ async def get_supported_platforms():
             }
         ]
     }
-
-
-async def policy_check_task(task_id: str, video_url: str, platform: str):
-    """
-    Background task for policy checking.
-    """
-    from src.analysis.policy_checker import check_video_policy, format_policy_report
-    from src.utils.policy_html_report import generate_comprehensive_policy_html
-    
-    db = MongoDB.get_db()
-    
-    try:
-        # Update status to CHECKING
-        await db.policy_tasks.update_one(
-            {"task_id": task_id},
-            {"$set": {
-                "status": PolicyCheckStatus.CHECKING,
-                "updated_at": datetime.utcnow()
-            }}
-        )
-        
-        logger.info(f"🔍 Starting policy check for task {task_id}")
-        
-        # Run policy check in thread pool
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(
-                executor,
-                check_video_policy,
-                None,  # video_path
-                platform,
-                None,  # model_name
-                video_url  # video_url
-            )
-        
-        # Generate comprehensive HTML report with all new fields
-        html_report = generate_comprehensive_policy_html(result, video_url, platform)
-        
-        # Extract key metrics
-        compliance = result.get("compliance_summary", {})
-        violations = result.get("facebook_policy_violations", [])
-        
-        # Update task with results
-        await db.policy_tasks.update_one(
-            {"task_id": task_id},
-            {"$set": {
-                "status": PolicyCheckStatus.COMPLETED,
-                "policy_result": result,
-                "html_report": html_report,
-                "will_pass_moderation": compliance.get("will_pass_moderation", False),
-                "risk_level": compliance.get("risk_level", "unknown"),
-                "violations_count": len(violations),
-                "updated_at": datetime.utcnow()
-            }}
-        )
-        
-        logger.info(f"✅ Policy check completed for task {task_id}")
-        
-    except Exception as e:
-        logger.error(f"❌ Policy check failed for task {task_id}: {e}")
-        await db.policy_tasks.update_one(
-            {"task_id": task_id},
-            {"$set": {
-                "status": PolicyCheckStatus.FAILED,
-                "error": str(e),
-                "updated_at": datetime.utcnow()
-            }}
-        )
-
@@ -71,11 +71,19 @@ async def view_task_report(task_id: str):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        # Task cancelled
+        if task_status == TaskStatus.CANCELLED:
+            logger.info(f"Task {task_id} was cancelled")
+            return HTMLResponse(
+                content=task_failed_page(task_id, "The task was cancelled.", "task"),
+                status_code=status.HTTP_410_GONE
+            )
+
         # Task still processing
         if task_status in [TaskStatus.PENDING, TaskStatus.PARSING, TaskStatus.PARSED, TaskStatus.ANALYZING]:
             logger.info(f"Task {task_id} still processing: {task_status}")
             return HTMLResponse(
-                content=still_processing_page(task_id, task_status, "task"),
+                content=still_processing_page(task_id, task_status, "task", task.get("progress")),
                 status_code=status.HTTP_202_ACCEPTED
             )
 
@@ -151,6 +159,14 @@ async def view_policy_report(task_id: str):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        # Task cancelled
+        if task_status == PolicyCheckStatus.CANCELLED:
+            logger.info(f"Policy task {task_id} was cancelled")
+            return HTMLResponse(
+                content=task_failed_page(task_id, "The task was cancelled.", "policy"),
+                status_code=status.HTTP_410_GONE
+            )
+
         # Task still processing
         if task_status in [PolicyCheckStatus.PENDING, PolicyCheckStatus.CHECKING]:
             logger.info(f"Policy task {task_id} still processing: {task_status}")
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks, Query
-from src.api.models import ParseAdsRequest, ParseAdsResponse, ErrorResponse
-from src.db import MongoDB, Task, TaskStatus
-from src.services.task_service import parse_ads_task, analyze_creatives_task
+from fastapi import APIRouter, HTTPException, status, Query, Header
+from fastapi.responses import StreamingResponse
+from src.api.models import ParseAdsRequest, ParseAdsBatchRequest, ParseAdsResponse, ErrorResponse
+from src.db import MongoDB, Task, TaskStatus, JobType
+from src.services.job_queue import JobQueue
+from src.services.task_events import TaskEvents, sse_stream
+from src.services.task_coalescing import request_key, create_or_join_task
 from src.utils.url_parser import URLParser
 import logging
 import uuid
@@ -12,6 +15,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+TERMINAL_STATUSES = [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
+
 
 @router.post(
     "/parse-ads",
@@ -20,10 +25,18 @@ router = APIRouter()
         500: {"model": ErrorResponse}
     }
 )
-async def parse_ads(request: ParseAdsRequest, background_tasks: BackgroundTasks):
+async def parse_ads(
+    request: ParseAdsRequest,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+):
     """
     Parse Facebook Ads Library URL - returns task_id for tracking.
-    Background task will extract ads and save to MongoDB.
+    A queued job extracts the ads and saves them to MongoDB.
+
+    Identical requests (same normalized URL, max_results and analysis
+    options) made while a task is still running, and retries with the same
+    Idempotency-Key header, return the existing task_id instead of starting
+    a new run.
     """
     try:
         # Validate URL
@@ -36,24 +49,45 @@ async def parse_ads(request: ParseAdsRequest, background_tasks: BackgroundTasks)
         # Generate task ID
         task_id = str(uuid.uuid4())
         
-        # Create task in MongoDB
+        # Create task in MongoDB (or join an identical in-flight one)
         db = MongoDB.get_db()
+        key = request_key(
+            request.url,
+            request.max_results,
+            request.auto_analyze,
+            request.analysis_budget,
+            request.check_policy
+        )
         task = Task(
             task_id=task_id,
             url=request.url,
-            status=TaskStatus.PENDING
+            status=TaskStatus.PENDING,
+            analysis_budget=request.analysis_budget,
+            check_policy=request.check_policy,
+            request_key=key,
+            idempotency_key=idempotency_key
         )
-        await db.tasks.insert_one(task.model_dump())
-        
-        # Start background parsing (fire-and-forget)
-        import asyncio
-        asyncio.create_task(
-            parse_ads_task(
-                task_id=task_id,
-                url=request.url,
-                max_results=request.max_results,
-                auto_analyze=request.auto_analyze
-            )
+        task_id, created = await create_or_join_task(task, key, idempotency_key)
+        
+        if not created:
+            existing = await db.tasks.find_one({"task_id": task_id}, {"status": 1})
+            return {
+                "success": True,
+                "task_id": task_id,
+                "message": "Identical request already in progress. Use GET /task/{task_id} to check status.",
+                "status": existing["status"] if existing else TaskStatus.PENDING,
+                "deduplicated": True
+            }
+        
+        # Queue background parsing (durable, survives restarts)
+        await JobQueue.enqueue(
+            JobType.PARSE_ADS,
+            {
+                "task_id": task_id,
+                "url": request.url,
+                "max_results": request.max_results,
+                "auto_analyze": request.auto_analyze
+            }
         )
         
         logger.info(f"✅ Created task {task_id} for URL: {request.url}")
@@ -62,7 +96,8 @@ async def parse_ads(request: ParseAdsRequest, background_tasks: BackgroundTasks)
             "success": True,
             "task_id": task_id,
             "message": "Task created. Use GET /task/{task_id} to check status.",
-            "status": TaskStatus.PENDING
+            "status": TaskStatus.PENDING,
+            "deduplicated": False
         }
 
     except HTTPException:
@@ -75,6 +110,70 @@ async def parse_ads(request: ParseAdsRequest, background_tasks: BackgroundTasks)
         )
 
 
+@router.post(
+    "/parse-ads/batch",
+    responses={
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def parse_ads_batch(request: ParseAdsBatchRequest):
+    """
+    Parse several competitors' Ads Library URLs with a single Apify actor run.
+    Creates one task per URL; track each with GET /task/{task_id}.
+    """
+    try:
+        # Validate URLs (duplicates collapse onto one task)
+        urls = list(dict.fromkeys(url.strip() for url in request.urls))
+        invalid = [url for url in urls if not URLParser.validate_url(url)]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid Facebook Ads Library URL(s): {', '.join(invalid)}"
+            )
+        
+        db = MongoDB.get_db()
+        tasks = []
+        for url in urls:
+            task = Task(
+                task_id=str(uuid.uuid4()),
+                url=url,
+                status=TaskStatus.PENDING,
+                analysis_budget=request.analysis_budget,
+                check_policy=request.check_policy
+            )
+            await db.tasks.insert_one(task.model_dump())
+            tasks.append({"task_id": task.task_id, "url": url})
+        
+        # One durable job -> one actor run for all competitors
+        await JobQueue.enqueue(
+            JobType.PARSE_ADS_BATCH,
+            {
+                "tasks": tasks,
+                "max_results": request.max_results,
+                "auto_analyze": request.auto_analyze
+            }
+        )
+        
+        logger.info(f"✅ Created {len(tasks)} tasks for batch parse")
+        
+        return {
+            "success": True,
+            "tasks": tasks,
+            "message": f"{len(tasks)} tasks created. Use GET /task/{{task_id}} to check status.",
+            "status": TaskStatus.PENDING
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating batch tasks: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create tasks: {str(e)}"
+        )
+
+
 @router.post("/debug-parse")
 async def debug_parse_ads(request: ParseAdsRequest):
     """
@@ -229,7 +328,10 @@ async def get_task(task_id: str):
         
         return {
             "success": True,
-            "task": task
+            "task": task,
+            # creatives_analyzed holds results finished so far while ANALYZING
+            "partial": task.get("status") == TaskStatus.ANALYZING,
+            "progress": task.get("progress")
         }
         
     except HTTPException:
@@ -242,8 +344,107 @@ async def get_task(task_id: str):
         )
 
 
+@router.get("/task/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """
+    Server-Sent Events stream of task progress.
+    
+    Sends a "snapshot" event with the current state, then "status" events on
+    every status transition and a "creative" event per finished creative.
+    The stream ends once the task is COMPLETED, FAILED or CANCELLED.
+    """
+    db = MongoDB.get_db()
+    since = datetime.utcnow()  # Events from here on are streamed; older ones are in the snapshot
+    
+    # Large fields are left out; clients fetch them once the task completes
+    task = await db.tasks.find_one(
+        {"task_id": task_id},
+        projection={"_id": 0, "html_report": 0, "creatives_analyzed": 0, "aggregated_analysis": 0}
+    )
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task {task_id} not found"
+        )
+    
+    return StreamingResponse(
+        sse_stream(task_id, "task", task, TERMINAL_STATUSES, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.delete("/task/{task_id}")
+async def cancel_task(task_id: str):
+    """
+    Cancel a task that is still parsing or analyzing.
+    
+    Queued jobs are dropped; a running job is cancelled by its worker, which
+    aborts the Apify run, stops in-flight downloads and Gemini polls and
+    deletes the files already uploaded to Gemini. A batch parse is cancelled
+    once all tasks of the batch are cancelled or finished; until then the
+    cancelled task is just skipped when the batch results are saved.
+    """
+    try:
+        db = MongoDB.get_db()
+        
+        task = await db.tasks.find_one({"task_id": task_id}, {"status": 1})
+        
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Task {task_id} not found"
+            )
+        
+        result = await db.tasks.update_one(
+            {"task_id": task_id, "status": {"$nin": TERMINAL_STATUSES}},
+            {"$set": {"status": TaskStatus.CANCELLED, "updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Task already finished. Current status: {task['status']}"
+            )
+        
+        jobs = await JobQueue.request_cancel(task_id, [JobType.PARSE_ADS, JobType.ANALYZE_CREATIVES])
+        
+        # A batch Apify run is shared with the other competitors of the batch:
+        # stop it once none of them needs it any more
+        for job in await JobQueue.active_batch_jobs(task_id):
+            batch_task_ids = [t["task_id"] for t in job["payload"]["tasks"]]
+            pending = await db.tasks.count_documents(
+                {"task_id": {"$in": batch_task_ids}, "status": {"$nin": TERMINAL_STATUSES}}
+            )
+            if pending == 0:
+                jobs += await JobQueue.cancel_job(job["job_id"])
+        await TaskEvents.publish(task_id, "status", {"status": TaskStatus.CANCELLED})
+        
+        logger.info(f"🛑 Cancelled task {task_id} ({jobs} job(s) affected)")
+        
+        return {
+            "success": True,
+            "message": "Task cancelled",
+            "task_id": task_id,
+            "status": TaskStatus.CANCELLED
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling task {task_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to cancel task: {str(e)}"
+        )
+
+
 @router.post("/analyze-creatives/{task_id}")
-async def analyze_creatives(task_id: str):
+async def analyze_creatives(
+    task_id: str,
+    budget: Optional[int] = Query(None, ge=1, le=100, description="Override how many top-ranked video ads to analyze"),
+    check_policy: Optional[bool] = Query(None, description="Also run the ads-policy check on each analyzed video")
+):
     """
     Start creative analysis for a parsed task.
     Only works if task status is PARSED and has ads to analyze.
@@ -283,18 +484,38 @@ async def analyze_creatives(task_id: str):
                 "task_id": task_id,
                 "status": task["status"]
             }
+
+        if await JobQueue.has_active_job(JobType.ANALYZE_CREATIVES, task_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Analysis for this task is already queued or running"
+            )
+
+        overrides = {}
+        if budget:
+            overrides["analysis_budget"] = budget
+        if check_policy is not None:
+            overrides["check_policy"] = check_policy
+        if overrides:
+            await db.tasks.update_one(
+                {"task_id": task_id},
+                {"$set": {**overrides, "updated_at": datetime.utcnow()}}
+            )
+        analysis_budget = budget or task.get("analysis_budget") or 10
+        check_policy = check_policy if check_policy is not None else bool(task.get("check_policy"))
         
-        # Start analysis in background
-        import asyncio
-        asyncio.create_task(analyze_creatives_task(task_id))
+        # Queue analysis in background
+        await JobQueue.enqueue(JobType.ANALYZE_CREATIVES, {"task_id": task_id})
         
-        logger.info(f"✅ Started analysis for task {task_id} ({total_ads} ads)")
+        logger.info(f"✅ Started analysis for task {task_id} ({total_ads} ads, budget {analysis_budget})")
         
         return {
             "success": True,
-            "message": f"Analysis started for {total_ads} ads. Check task status for progress.",
+            "message": f"Analysis started for up to {min(total_ads, analysis_budget)} of {total_ads} ads. Check task status for progress.",
             "task_id": task_id,
             "total_ads": total_ads,
+            "analysis_budget": analysis_budget,
+            "check_policy": check_policy,
             "status": "analyzing"
         }
         
@@ -308,6 +529,61 @@ async def analyze_creatives(task_id: str):
         )
 
 
+@router.post("/task/{task_id}/resume")
+async def resume_analysis(task_id: str):
+    """
+    Resume an interrupted or failed creative analysis.
+    Creatives that were already analyzed are kept; only the rest are processed.
+    """
+    try:
+        db = MongoDB.get_db()
+        
+        task = await db.tasks.find_one(
+            {"task_id": task_id},
+            {"status": 1, "analysis_selection": 1, "creatives_file": 1, "progress": 1}
+        )
+        
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Task {task_id} not found"
+            )
+        
+        if task["status"] not in (TaskStatus.ANALYZING, TaskStatus.FAILED) or not task.get("creatives_file"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Only interrupted or failed analyses can be resumed. Current status: {task['status']}"
+            )
+        
+        if await JobQueue.has_active_job(JobType.ANALYZE_CREATIVES, task_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Analysis for this task is already queued or running"
+            )
+        
+        await JobQueue.enqueue(JobType.ANALYZE_CREATIVES, {"task_id": task_id, "resume": True})
+        
+        progress = task.get("progress") or {}
+        logger.info(f"⏯️ Resuming analysis for task {task_id} ({progress.get('done', 0)}/{progress.get('total', 0)} done)")
+        
+        return {
+            "success": True,
+            "message": "Analysis resumed. Already analyzed creatives will not be redone.",
+            "task_id": task_id,
+            "progress": progress or None,
+            "status": "analyzing"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming analysis for task {task_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume analysis: {str(e)}"
+        )
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -1,20 +1,21 @@
 """
 Video streaming endpoints for cached videos.
 """
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Header, status
 from fastapi.responses import StreamingResponse, Response
-from pathlib import Path
+from starlette.background import BackgroundTask
+import httpx
 import os
 import logging
 from typing import Optional
 
+from src.services.video_cache import CACHE_DIR
+from src.services.video_downloader import VideoDownloader
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Cache directory
-CACHE_DIR = Path(__file__).parent.parent.parent / ".cache" / "videos"
-
 
 @router.get("/stream/{video_hash}")
 async def stream_video(video_hash: str, range: Optional[str] = None):
@@ -109,30 +110,18 @@ async def stream_video(video_hash: str, range: Optional[str] = None):
 
 
 @router.get("/proxy")
-async def proxy_video(url: str):
+async def proxy_video(url: str, range: Optional[str] = Header(default=None)):
     """
     Proxy video from external URL.
     Useful for videos that require authentication or have CORS issues.
+    Streams through the shared pooled downloader client and forwards Range requests.
     
     Args:
         url: External video URL to proxy
+        range: HTTP Range header for partial content
     """
     try:
-        import httpx
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, follow_redirects=True)
-            response.raise_for_status()
-            
-            return Response(
-                content=response.content,
-                media_type="video/mp4",
-                headers={
-                    "Accept-Ranges": "bytes",
-                    "Content-Length": str(len(response.content))
-                }
-            )
-            
+        upstream = await VideoDownloader.open_stream(url, {"Range": range} if range else None)
     except httpx.HTTPError as e:
         logger.error(f"Error proxying video from {url}: {e}")
         raise HTTPException(
@@ -145,6 +134,19 @@ async def proxy_video(url: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to proxy video: {str(e)}"
         )
+    
+    headers = {"Accept-Ranges": "bytes"}
+    for name in ("Content-Length", "Content-Range", "Content-Encoding"):
+        if name in upstream.headers:
+            headers[name] = upstream.headers[name]
+    
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        headers=headers,
+        media_type=upstream.headers.get("Content-Type", "video/mp4"),
+        background=BackgroundTask(upstream.aclose)
+    )
 
 
 @router.head("/stream/{video_hash}")
@@ -1,13 +1,15 @@
 from src.db.service import MongoDB
 from src.db.models import (
-    Task, TaskStatus, 
+    Task, TaskStatus, TaskProgress,
     CreativeAnalysis, AggregatedAnalysis,
-    PolicyTask, PolicyCheckStatus
+    PolicyTask, PolicyCheckStatus,
+    Job, JobStatus, JobType
 )
 
 __all__ = [
     "MongoDB", 
-    "Task", "TaskStatus", 
+    "Task", "TaskStatus", "TaskProgress",
     "CreativeAnalysis", "AggregatedAnalysis",
-    "PolicyTask", "PolicyCheckStatus"
+    "PolicyTask", "PolicyCheckStatus",
+    "Job", "JobStatus", "JobType"
 ]
@@ -14,6 +14,7 @@ class TaskStatus(str, Enum):
     ANALYZING = "ANALYZING"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
 
 
 class PolicyCheckStatus(str, Enum):
@@ -21,6 +22,7 @@ class PolicyCheckStatus(str, Enum):
     CHECKING = "CHECKING"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
 
 
 class CreativeAnalysis(BaseModel):
@@ -45,9 +47,27 @@ class CreativeAnalysis(BaseModel):
     # Meta
     video_url: Optional[str] = None
     cached_video_path: Optional[str] = None
+    video_hash: Optional[str] = None  # SHA-256 of the video content
+    fingerprint: Optional[List[str]] = None  # Perceptual frame hashes (hex)
+    from_cache: bool = False  # Analysis reused from the cross-task analysis cache
+    duplicate_of: Optional[str] = None  # ad_archive_id whose (near-identical) video analysis was reused
+    timings: Optional[Dict[str, Any]] = None  # Per-stage seconds and byte counts for this creative
+    
+    # Ads-policy check over the same upload (tasks with check_policy)
+    policy_check: Optional[Dict[str, Any]] = None  # check_video_policy result or {"error": ...}
+    policy_risk_level: Optional[str] = None
+    will_pass_moderation: Optional[bool] = None
     analyzed_at: Optional[datetime] = None
 
 
+class TaskProgress(BaseModel):
+    """Per-creative progress of an analysis run."""
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
 class AggregatedAnalysis(BaseModel):
     """Aggregated analysis across all creatives."""
     pain_points: List[str] = Field(default_factory=list)
@@ -87,6 +107,7 @@ class PolicyTask(BaseModel):
     will_pass_moderation: Optional[bool] = None
     risk_level: Optional[str] = None
     violations_count: Optional[int] = None
+    timings: Dict[str, Any] = Field(default_factory=dict)  # {stages: {name: seconds}, bytes: {name: count}}
     
     # Metadata
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -109,11 +130,23 @@ class Task(BaseModel):
     total_ads: Optional[int] = None
     creatives_file: Optional[str] = None
 
+    # Analysis budget: how many top-ranked video ads get the Gemini analysis
+    analysis_budget: int = 10
+    check_policy: bool = False  # Also run the ads-policy check on each analyzed creative (same upload)
+    analysis_selection: List[Dict[str, Any]] = Field(default_factory=list)  # [{ad_archive_id, rank_score}]
+    clusters: List[Dict[str, Any]] = Field(default_factory=list)  # Duplicate videos: [{representative, members, size}]
+
     # Analysis results
-    creatives_analyzed: List[CreativeAnalysis] = Field(default_factory=list)
+    progress: Optional[TaskProgress] = None
+    creatives_analyzed: List[CreativeAnalysis] = Field(default_factory=list)  # Filled incrementally while ANALYZING
     aggregated_analysis: Optional[AggregatedAnalysis] = None
     aggregation_error: Optional[str] = None  # Error during aggregation (task still completed)
     html_report: Optional[str] = None  # HTML report for frontend display
+    timings: Dict[str, Any] = Field(default_factory=dict)  # {stages, bytes, creatives: [per-creative stages]}
+
+    # Request coalescing (inflight_key is set while the task is parsing or its analysis is pending/running)
+    request_key: Optional[str] = None  # Normalized URL parameters + max_results + analysis options
+    idempotency_key: Optional[str] = None  # Client-supplied Idempotency-Key header
 
     # Metadata
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -124,6 +157,53 @@ class Task(BaseModel):
         use_enum_values = True
 
 
+# ============================================================================
+# Job Queue Models
+# ============================================================================
+
+class JobStatus(str, Enum):
+    """Lifecycle of a queued background job."""
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    DEAD = "DEAD"  # Retries exhausted (dead-lettered)
+    CANCELLED = "CANCELLED"
+
+
+class JobType(str, Enum):
+    """Kinds of background work handled by the job queue."""
+    PARSE_ADS = "parse_ads"
+    PARSE_ADS_BATCH = "parse_ads_batch"
+    ANALYZE_CREATIVES = "analyze_creatives"
+    POLICY_CHECK = "policy_check"
+
+
+class Job(BaseModel):
+    """Durable background job stored in the jobs collection."""
+    job_id: str
+    type: JobType
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    status: JobStatus = JobStatus.QUEUED
+
+    # Retry / lease bookkeeping
+    attempts: int = 0
+    max_attempts: int = 3
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    worker_id: Optional[str] = None
+    lease_until: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    cancel_requested: bool = False  # Set by the API; the running worker cancels the handler
+
+    # Metadata
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        use_enum_values = True
+
+
 # ============================================================================
 # Chat MVP Models
 # ============================================================================
@@ -27,6 +27,17 @@ class MongoDB:
         await cls.db.tasks.create_index([("task_id", ASCENDING)], unique=True)
         await cls.db.tasks.create_index([("created_at", DESCENDING)])
         await cls.db.tasks.create_index([("status", ASCENDING)])
+        # Duplicate parse requests collapse onto the in-flight / idempotent task
+        await cls.db.tasks.create_index(
+            [("inflight_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"inflight_key": {"$type": "string"}}
+        )
+        await cls.db.tasks.create_index(
+            [("idempotency_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        )
         
         # Create indexes for policy_tasks
         await cls.db.policy_tasks.create_index([("task_id", ASCENDING)], unique=True)
@@ -34,6 +45,42 @@ class MongoDB:
         await cls.db.policy_tasks.create_index([("status", ASCENDING)])
         await cls.db.policy_tasks.create_index([("platform", ASCENDING)])
         
+        # Create indexes for the job queue
+        await cls.db.jobs.create_index([("job_id", ASCENDING)], unique=True)
+        await cls.db.jobs.create_index([("status", ASCENDING), ("run_at", ASCENDING)])
+        await cls.db.jobs.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+        await cls.db.jobs.create_index([("payload.task_id", ASCENDING)])
+        
+        # Create indexes for the cross-task analysis cache (TTL on expires_at)
+        await cls.db.analysis_cache.create_index(
+            [("ad_archive_id", ASCENDING), ("video_hash", ASCENDING), ("model", ASCENDING), ("prompt_version", ASCENDING)],
+            unique=True
+        )
+        await cls.db.analysis_cache.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        
+        # Content-addressed video cache: URL aliases -> stored blobs
+        await cls.db.video_aliases.create_index([("alias", ASCENDING)], unique=True)
+        await cls.db.video_aliases.create_index([("content_hash", ASCENDING)])
+        await cls.db.video_blobs.create_index([("content_hash", ASCENDING)], unique=True)
+        await cls.db.video_blobs.create_index([("last_accessed_at", ASCENDING)])  # LRU eviction order
+        await cls.db.video_blobs.create_index([("pinned_by", ASCENDING)])
+        
+        # Reusable Gemini File API uploads (by video content hash and upload profile)
+        await cls.db.gemini_files.create_index([("name", ASCENDING)], unique=True)
+        await cls.db.gemini_files.create_index(
+            [("content_hash", ASCENDING), ("profile", ASCENDING), ("expires_at", DESCENDING)]
+        )
+        await cls.db.gemini_files.create_index([("last_used_at", ASCENDING)])
+        
+        # Capped collection for task progress events (tailed for SSE)
+        if "task_events" not in await cls.db.list_collection_names():
+            await cls.db.create_collection(
+                "task_events",
+                capped=True,
+                size=int(os.environ.get("TASK_EVENTS_MAX_BYTES", 16 * 1024 * 1024))
+            )
+        await cls.db.task_events.create_index([("task_id", ASCENDING)])
+        
         logger.info(f"✅ Connected to MongoDB: {db_name}")
     
     @classmethod
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,7 +10,15 @@ from src.api.policy_routes_v2 import router as policy_router
 from src.api.video_routes import router as video_router
 from src.api.report_routes import router as report_router
 from src.api.chat_routes import router as chat_router
+from src.api.admin_routes import router as admin_router
 from src.db import MongoDB
+from src.services.executor_pool import ExecutorPool
+from src.services.gemini_files import GeminiFiles
+from src.services.job_queue import JobQueue, JobWorker
+from src.services.job_handlers import JOB_HANDLERS, handle_dead_letter
+from src.services.video_cache import VideoCache
+from src.services.video_downloader import VideoDownloader
+from src.utils.env import get_int_env, get_bool_env
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +31,12 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Embedded job worker (consumes the durable job queue inside the API process)
+job_worker: JobWorker | None = None
+job_worker_task: asyncio.Task | None = None
+# Deletes expired/unused Gemini uploads (see GeminiFiles)
+gemini_janitor_task: asyncio.Task | None = None
+
 # Create FastAPI app
 app = FastAPI(
     title="Facebook Ads Library Parser API",
@@ -47,6 +62,7 @@ app.include_router(video_router, prefix="/api/v1/video", tags=["video"])
 app.include_router(report_router, prefix="/report", tags=["reports"])
 app.include_router(chat_router, prefix="/api/v1/chat-mvp", tags=["chat"])
 app.include_router(chat_router, prefix="/api/v1/chat", tags=["chat"])  # Alternative path for compatibility
+app.include_router(admin_router, prefix="/api/v1/admin", tags=["admin"])
 
 # Mount static files for chat test UI
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -77,6 +93,38 @@ async def startup_event():
         logger.error(f"❌ Failed to connect to MongoDB: {e}")
         raise
 
+    # Create shared executor pools for blocking work
+    ExecutorPool.start()
+
+    # Reconcile the video cache with its index and enforce the size cap
+    try:
+        await VideoCache.cleanup_orphans()
+        await VideoCache.evict()
+    except Exception as e:
+        logger.warning(f"⚠️ Video cache cleanup failed: {e}")
+
+    # Periodically delete Gemini uploads that expire soon or are no longer used
+    global gemini_janitor_task
+    if get_int_env("GEMINI_FILE_JANITOR_INTERVAL", 1800) > 0:
+        gemini_janitor_task = asyncio.create_task(GeminiFiles.run_janitor())
+
+    # Requeue jobs left running by a crashed or restarted node
+    recovered = await JobQueue.recover_expired_leases(handle_dead_letter)
+    if recovered:
+        logger.info(f"♻️ Recovered {recovered} job(s) with expired leases")
+
+    # Start embedded job worker unless jobs are handled by `python -m src.worker`
+    global job_worker, job_worker_task
+    if get_bool_env("RUN_EMBEDDED_WORKER", True):
+        job_worker = JobWorker(
+            JOB_HANDLERS,
+            on_dead_letter=handle_dead_letter,
+            concurrency=get_int_env("JOB_WORKER_CONCURRENCY", 4)
+        )
+        job_worker_task = asyncio.create_task(job_worker.run())
+    else:
+        logger.info("Embedded job worker disabled - run `python -m src.worker` to process jobs")
+
     # Check for required environment variables
     if not os.environ.get('APIFY_API_KEY'):
         logger.warning("APIFY_API_KEY not set in environment variables")
@@ -90,6 +138,23 @@ async def shutdown_event():
     """Shutdown event handler."""
     logger.info("Shutting down Facebook Ads Library Parser API")
     
+    # Stop job worker and hand in-flight jobs back to the queue
+    if job_worker:
+        await job_worker.stop()
+    if job_worker_task:
+        await job_worker_task
+
+    if gemini_janitor_task:
+        gemini_janitor_task.cancel()
+        try:
+            await gemini_janitor_task
+        except asyncio.CancelledError:
+            pass
+
+    # Close pooled download connections and stop executor pools
+    await VideoDownloader.close()
+    ExecutorPool.shutdown()
+    
     # Close MongoDB connection
     try:
         await MongoDB.close()
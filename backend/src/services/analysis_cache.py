@@ -0,0 +1,105 @@
+"""
+Persistent cache of per-creative Gemini video analyses.
+
+The analysis of a given creative video does not change, so results are
+stored across tasks keyed by ad_archive_id, video content hash, model name
+and prompt version. Entries expire via a TTL index and can be invalidated
+explicitly (e.g. after a prompt change).
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from src.db import MongoDB
+from src.utils.env import get_int_env
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisCache:
+    """Cross-task cache of raw video analysis results."""
+
+    @classmethod
+    async def get(
+        cls,
+        ad_archive_id: str,
+        video_hash: str,
+        model_name: str,
+        prompt_version: str
+    ) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis result, or None on miss/expiry."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        doc = await db.analysis_cache.find_one_and_update(
+            {
+                "ad_archive_id": ad_archive_id,
+                "video_hash": video_hash,
+                "model": model_name,
+                "prompt_version": prompt_version,
+                "expires_at": {"$gt": now}
+            },
+            {"$set": {"last_hit_at": now}, "$inc": {"hits": 1}}
+        )
+        return doc["result"] if doc else None
+
+    @classmethod
+    async def put(
+        cls,
+        ad_archive_id: str,
+        video_hash: str,
+        model_name: str,
+        prompt_version: str,
+        result: Dict[str, Any]
+    ):
+        """Store (or refresh) an analysis result."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        ttl_days = max(1, get_int_env("ANALYSIS_CACHE_TTL_DAYS", 30))
+        await db.analysis_cache.update_one(
+            {
+                "ad_archive_id": ad_archive_id,
+                "video_hash": video_hash,
+                "model": model_name,
+                "prompt_version": prompt_version
+            },
+            {
+                "$set": {
+                    "result": result,
+                    "created_at": now,
+                    "expires_at": now + timedelta(days=ttl_days)
+                },
+                "$setOnInsert": {"hits": 0}
+            },
+            upsert=True
+        )
+
+    @classmethod
+    async def invalidate(
+        cls,
+        ad_archive_id: Optional[str] = None,
+        video_hash: Optional[str] = None,
+        prompt_version: Optional[str] = None
+    ) -> int:
+        """Delete matching entries (all entries if no filter given). Returns the count."""
+        db = MongoDB.get_db()
+        query: Dict[str, Any] = {}
+        if ad_archive_id:
+            query["ad_archive_id"] = ad_archive_id
+        if video_hash:
+            query["video_hash"] = video_hash
+        if prompt_version:
+            query["prompt_version"] = prompt_version
+
+        result = await db.analysis_cache.delete_many(query)
+        logger.info(f"🧹 Invalidated {result.deleted_count} cached analyses ({query or 'all'})")
+        return result.deleted_count
+
+    @classmethod
+    async def stats(cls) -> Dict[str, Any]:
+        """Entry count and total hits."""
+        db = MongoDB.get_db()
+        rows = await db.analysis_cache.aggregate([
+            {"$group": {"_id": None, "entries": {"$sum": 1}, "hits": {"$sum": "$hits"}}}
+        ]).to_list(length=1)
+        row = rows[0] if rows else {}
+        return {"entries": row.get("entries", 0), "hits": row.get("hits", 0)}
@@ -1,12 +1,28 @@
 import os
-import asyncio
+import threading
 from typing import List, Dict, Any, Optional
 from apify_client import ApifyClient
 import logging
-from concurrent.futures import ThreadPoolExecutor
+
+from src.services.executor_pool import ExecutorPool
+from src.utils.url_parser import URLParser
+from src.utils.cancellation import OperationCancelled
 
 logger = logging.getLogger(__name__)
 
+APIFY_TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED"}
+APIFY_WAIT_SECONDS = 5  # Max wait per status poll (lets cancellation abort the run promptly)
+# Runs ending like this were not caused by their input and may succeed when retried
+APIFY_TRANSIENT_STATUSES = {"TIMED-OUT", "ABORTED"}
+
+
+class ApifyRunError(Exception):
+    """An actor run that ended without succeeding; `transient` runs are worth retrying."""
+
+    def __init__(self, message: str, transient: bool):
+        super().__init__(message)
+        self.transient = transient
+
 
 class ApifyService:
     """Service for interacting with Apify Facebook Ads Library scraper."""
@@ -25,32 +41,84 @@ class ApifyService:
         self.client = ApifyClient(self.api_key)
         self.actor_name = os.environ.get('APIFY_ACTOR_NAME', 'curious_coder/facebook-ads-library-scraper')
 
-    def _run_apify_sync(self, url: str, max_results: int, fetch_all_details: bool) -> List[Dict[str, Any]]:
+    def _run_apify_sync(
+        self,
+        url: str,
+        max_results: int,
+        fetch_all_details: bool,
+        cancel_event: Optional[threading.Event] = None
+    ) -> List[Dict[str, Any]]:
         """
         Synchronous method to run Apify actor.
         This will be executed in a thread pool to avoid blocking the event loop.
+        The actor run is aborted if cancel_event is set while it is running.
         """
         # Ensure URL has media_type=video for filtering at Facebook level
         processed_url = self._ensure_video_filter_in_url(url)
         
-        # Ensure minimum count of 10 (actor requirement)
-        actor_count = max(10, max_results * 3)  # Request more to account for filtering
+        raw_results = self._run_actor_sync([processed_url], max_results, cancel_event)
+
+        return self._limit_video_ads(raw_results, max_results)
+
+    def _run_apify_batch_sync(
+        self,
+        urls: List[str],
+        max_results: int,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Run one actor call for several Ads Library URLs and split the dataset per URL.
+
+        Items are matched to their input URL by the item's `url` field, falling
+        back to the page id. Returns {original_url: video_ads} for every input URL.
+        """
+        processed = {self._ensure_video_filter_in_url(url): url for url in urls}
+        raw_results = self._run_actor_sync(list(processed), max_results, cancel_event)
+
+        grouped: Dict[str, List[Dict[str, Any]]] = {url: [] for url in urls}
+        unmatched = 0
+        for item in raw_results:
+            url = self._match_item_to_url(item, processed)
+            if url is None:
+                unmatched += 1
+                continue
+            grouped[url].append(item)
+
+        if unmatched:
+            logger.warning(f"{unmatched} batch result item(s) could not be matched to an input URL")
+
+        return {url: self._limit_video_ads(items, max_results) for url, items in grouped.items()}
+
+    def _run_actor_sync(
+        self,
+        processed_urls: List[str],
+        max_results: int,
+        cancel_event: Optional[threading.Event]
+    ) -> List[Dict[str, Any]]:
+        """Start the actor for the given URLs, wait for it and return the raw dataset items."""
+        # Ensure minimum count of 10 (actor requirement). The count covers the whole
+        # run, so a batch asks for max_results per URL
+        actor_count = max(10, max_results * 3 * len(processed_urls))  # Request more to account for filtering
         
         run_input = {
-            "urls": [{"url": processed_url}],
+            "urls": [{"url": url} for url in processed_urls],
             "count": actor_count,
             "period": "",
             "scrapePageAds.activeStatus": "all",
             "scrapePageAds.countryCode": "ALL",
         }
 
-        logger.info(f"Starting Apify actor for URL: {url} (requested: {max_results}, actor_count: {actor_count})")
+        logger.info(
+            f"Starting Apify actor for {len(processed_urls)} URL(s): {processed_urls} "
+            f"(requested: {max_results}, actor_count: {actor_count})"
+        )
         logger.info(f"Actor input: {run_input}")
 
-        # Run the actor and wait for it to finish
-        run = self.client.actor(self.actor_name).call(run_input=run_input)
+        # Start the actor and wait for it to finish
+        run = self.client.actor(self.actor_name).start(run_input=run_input)
+        run = self._wait_for_run(run, cancel_event)
 
-        logger.info(f"Actor completed. Dataset ID: {run['defaultDatasetId']}")
+        logger.info(f"Actor completed ({run.get('status')}). Dataset ID: {run['defaultDatasetId']}")
 
         # Fetch the results from the dataset
         raw_results = []
@@ -58,7 +126,10 @@ class ApifyService:
             raw_results.append(item)
 
         logger.info(f"Raw results from actor: {len(raw_results)} items")
+        return raw_results
 
+    def _limit_video_ads(self, raw_results: List[Dict[str, Any]], max_results: int) -> List[Dict[str, Any]]:
+        """Keep video ads only and apply the max_results limit."""
         # Filter by video ads only (client-side filtering as backup)
         video_results = self._filter_video_ads(raw_results)
         
@@ -68,6 +139,55 @@ class ApifyService:
         logger.info(f"After filtering: {len(video_results)} video ads, taking {len(limited_results)} max")
         return limited_results
 
+    @staticmethod
+    def _match_item_to_url(item: Dict[str, Any], processed: Dict[str, str]) -> Optional[str]:
+        """Original input URL a dataset item belongs to (processed URL -> original URL map)."""
+        if len(processed) == 1:
+            return next(iter(processed.values()))
+
+        item_url = item.get("url")
+        if item_url in processed:
+            return processed[item_url]
+
+        if item_url:
+            item_params = URLParser.extract_parameters(item_url)
+            for processed_url, original in processed.items():
+                if item_params and item_params == URLParser.extract_parameters(processed_url):
+                    return original
+
+        page_id = str(item.get("page_id") or "")
+        if page_id:
+            for original in processed.values():
+                if URLParser.get_page_id_from_url(original) == page_id:
+                    return original
+        return None
+
+    def _wait_for_run(self, run: Dict[str, Any], cancel_event: Optional[threading.Event]) -> Dict[str, Any]:
+        """
+        Poll an actor run until it finishes; abort it if cancellation is requested.
+        Raises ApifyRunError if the run ended in any status other than SUCCEEDED.
+        """
+        run_client = self.client.run(run["id"])
+        logger.info(f"Actor run started: {run['id']}")
+
+        while run.get("status") not in APIFY_TERMINAL_STATUSES:
+            if cancel_event is not None and cancel_event.is_set():
+                run_client.abort()
+                logger.info(f"🛑 Aborted Apify run {run['id']}")
+                raise OperationCancelled(f"Apify run {run['id']} aborted")
+            run = run_client.wait_for_finish(wait_secs=APIFY_WAIT_SECONDS) or run
+
+        run_status = run.get("status")
+        if run_status != "SUCCEEDED":
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelled(f"Apify run {run['id']} aborted")
+            # Its dataset is partial or empty: don't pass it off as the result
+            raise ApifyRunError(
+                f"Apify run {run['id']} ended with status {run_status}",
+                transient=run_status in APIFY_TRANSIENT_STATUSES
+            )
+        return run
+
     def _filter_video_ads(self, ads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Filter ads to include only those with video content.
@@ -135,17 +255,19 @@ class ApifyService:
         self,
         url: str,
         max_results: int = 15,
-        fetch_all_details: bool = True
+        fetch_all_details: bool = True,
+        cancel_event: Optional[threading.Event] = None
     ) -> List[Dict[str, Any]]:
         """
         Extract ads from Facebook Ads Library URL using Apify.
         
-        Runs blocking Apify calls in a thread pool to avoid blocking the event loop.
+        Runs blocking Apify calls in the shared io pool to avoid blocking the event loop.
 
         Args:
             url: Facebook Ads Library URL
             max_results: Maximum number of ads to extract
             fetch_all_details: Whether to fetch full creative details
+            cancel_event: When set, the running actor is aborted
 
         Returns:
             List of ad data dictionaries
@@ -154,18 +276,50 @@ class ApifyService:
             Exception: If the Apify actor run fails
         """
         try:
-            # Run blocking Apify code in thread pool
-            loop = asyncio.get_event_loop()
-            with ThreadPoolExecutor() as executor:
-                results = await loop.run_in_executor(
-                    executor,
-                    self._run_apify_sync,
-                    url,
-                    max_results,
-                    fetch_all_details
-                )
+            # Run blocking Apify code in the io pool
+            results = await ExecutorPool.run(
+                "io",
+                self._run_apify_sync,
+                url,
+                max_results,
+                fetch_all_details,
+                cancel_event
+            )
             return results
 
         except Exception as e:
             logger.error(f"Error running Apify actor: {str(e)}")
-            raise Exception(f"Failed to extract ads: {str(e)}")
+            raise Exception(f"Failed to extract ads: {str(e)}") from e
+
+    async def extract_ads_from_urls(
+        self,
+        urls: List[str],
+        max_results: int = 15,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract ads for several Ads Library URLs with a single Apify actor run.
+
+        Args:
+            urls: Facebook Ads Library URLs (one per competitor)
+            max_results: Maximum number of ads to extract per URL
+            cancel_event: When set, the running actor is aborted
+
+        Returns:
+            Mapping of each input URL to its list of ad data dictionaries
+
+        Raises:
+            Exception: If the Apify actor run fails
+        """
+        try:
+            return await ExecutorPool.run(
+                "io",
+                self._run_apify_batch_sync,
+                urls,
+                max_results,
+                cancel_event
+            )
+
+        except Exception as e:
+            logger.error(f"Error running batch Apify actor: {str(e)}")
+            raise Exception(f"Failed to extract ads: {str(e)}") from e
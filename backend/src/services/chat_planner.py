@@ -7,7 +7,7 @@ import os
 import logging
 import json
 from typing import Dict, Any, List, Optional
-import google.generativeai as genai
+from src.analysis import llm_gateway
 from src.services.patterns_extractor import (
     extract_patterns_summary,
     format_patterns_for_prompt,
@@ -36,17 +36,14 @@ class ChatPlanner:
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment")
 
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
-            model_name=model_name,
-            generation_config={
-                "temperature": 0.7,
-                "response_mime_type": "application/json"
-            }
-        )
+        self.model_name = model_name
+        self.generation_config = {
+            "temperature": 0.7,
+            "response_mime_type": "application/json"
+        }
         logger.info(f"✅ ChatPlanner initialized with model: {model_name}")
 
-    def plan_next_step(
+    async def plan_next_step(
         self,
         user_message: str,
         known_fields: Dict[str, Any],
@@ -71,12 +68,17 @@ class ChatPlanner:
             prompt = self._build_prompt(user_message, known_fields, conversation_history, patterns)
 
             logger.info(f"📤 Sending request to Gemini (history: {len(conversation_history)} messages, patterns: {bool(patterns)})")
-            response = self.model.generate_content(prompt)
+            response = await llm_gateway.generate(
+                prompt,
+                model_name=self.model_name,
+                generation_config=self.generation_config,
+                label="Chat planning"
+            )
 
             if not response.text:
                 raise ValueError("Empty response from Gemini")
 
-            result = json.loads(response.text)
+            result = llm_gateway.parse_json(response.text)
             logger.info(f"📥 Received response: need_more_info={result.get('need_more_info', 'unknown')}")
 
             # Add policy hints if detected risks
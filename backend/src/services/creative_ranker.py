@@ -0,0 +1,77 @@
+"""
+Ranking of competitor ads for the (expensive) video analysis stage.
+
+Ads that have been delivered for a long time, were scaled into many
+variations, are still active and run on several platforms are the ones a
+competitor keeps paying for, so they get the analysis budget first.
+"""
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Score weights
+WEIGHT_DELIVERY_DAYS = 1.0
+WEIGHT_COLLATION = 0.8
+WEIGHT_ACTIVE = 0.5
+WEIGHT_PLATFORMS = 0.25
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    """Apify returns unix timestamps; tolerate ISO strings too."""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        if isinstance(value, str):
+            if value.isdigit():
+                return datetime.fromtimestamp(int(value), tz=timezone.utc)
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+    return None
+
+
+def delivery_days(ad: Dict[str, Any], now: Optional[datetime] = None) -> float:
+    """Days the ad has been delivered (until end_date, or until now if still running)."""
+    start = _to_datetime(ad.get("start_date"))
+    if not start:
+        return 0.0
+    end = _to_datetime(ad.get("end_date"))
+    if ad.get("is_active") or not end:
+        end = now or datetime.now(timezone.utc)
+    return max(0.0, (end - start).total_seconds() / 86400)
+
+
+def score_ad(ad: Dict[str, Any], now: Optional[datetime] = None) -> float:
+    """Priority score of an ad for video analysis (higher is analyzed first)."""
+    try:
+        collation = max(0, int(ad.get("collation_count") or 0))
+    except (TypeError, ValueError):
+        collation = 0
+    platforms = ad.get("publisher_platform") or []
+    if isinstance(platforms, str):
+        platforms = [platforms]
+
+    return (
+        WEIGHT_DELIVERY_DAYS * math.log1p(delivery_days(ad, now))
+        + WEIGHT_COLLATION * math.log1p(collation)
+        + WEIGHT_ACTIVE * (1.0 if ad.get("is_active") else 0.0)
+        + WEIGHT_PLATFORMS * len(set(platforms))
+    )
+
+
+def rank_ads(ads: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Sort ads by priority score, keeping the original order for ties."""
+    now = now or datetime.now(timezone.utc)
+    return sorted(ads, key=lambda ad: score_ad(ad, now), reverse=True)
+
+
+def select_ads_for_analysis(
+    ads: List[Dict[str, Any]],
+    budget: int,
+    now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Pick the top `budget` ads for video analysis."""
+    return rank_ads(ads, now)[:max(0, budget)]
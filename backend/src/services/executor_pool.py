@@ -0,0 +1,121 @@
+"""
+Process-wide registry of named thread pools for blocking work.
+
+Pools:
+- io:  network/file operations (video downloads, Apify calls, Gemini file uploads/polls/deletes)
+- cpu: local CPU-bound work (HTML rendering, hashing)
+
+Gemini generation is awaited natively (see llm_gateway) and needs no pool.
+"""
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+from src.utils.env import get_int_env
+
+logger = logging.getLogger(__name__)
+
+# Pool name -> (size env var, default size)
+POOL_SIZES = {
+    "io": ("IO_POOL_SIZE", 16),
+    "cpu": ("CPU_POOL_SIZE", os.cpu_count() or 2),
+}
+
+
+class ExecutorPool:
+    """Shared, sized executors created at startup and shut down on shutdown."""
+    _executors: Dict[str, ThreadPoolExecutor] = {}
+    _queued: Dict[str, int] = {}
+    _active: Dict[str, int] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(cls):
+        """Create all configured pools (idempotent)."""
+        for name in POOL_SIZES:
+            cls._create(name)
+        logger.info(f"✅ Executor pools started: {cls.sizes()}")
+
+    @classmethod
+    def shutdown(cls, wait: bool = True):
+        """Shut down all pools."""
+        with cls._lock:
+            executors = dict(cls._executors)
+            cls._executors.clear()
+        for executor in executors.values():
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        if executors:
+            logger.info("🔌 Executor pools shut down")
+
+    @classmethod
+    def get(cls, name: str) -> ThreadPoolExecutor:
+        """Get a pool by name, creating it lazily (e.g. for CLI usage)."""
+        executor = cls._executors.get(name)
+        if executor is None:
+            executor = cls._create(name)
+        return executor
+
+    @classmethod
+    async def run(cls, name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable in the named pool and await its result."""
+        executor = cls.get(name)
+        state = {"started": False, "abandoned": False}
+        with cls._lock:
+            cls._queued[name] = cls._queued.get(name, 0) + 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, partial(cls._tracked, name, state, func, *args, **kwargs))
+        except asyncio.CancelledError:
+            # A cancelled call that never started must not stay counted as queued
+            with cls._lock:
+                if not state["started"]:
+                    state["abandoned"] = True
+                    cls._queued[name] -= 1
+            raise
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, int]]:
+        """Queue depth and active-worker gauges for every pool."""
+        with cls._lock:
+            return {
+                name: {
+                    "max_workers": executor._max_workers,
+                    "active_workers": cls._active.get(name, 0),
+                    "queue_depth": cls._queued.get(name, 0),
+                }
+                for name, executor in cls._executors.items()
+            }
+
+    @classmethod
+    def sizes(cls) -> Dict[str, int]:
+        return {name: executor._max_workers for name, executor in cls._executors.items()}
+
+    @classmethod
+    def _create(cls, name: str) -> ThreadPoolExecutor:
+        if name not in POOL_SIZES:
+            raise ValueError(f"Unknown executor pool '{name}'. Available: {list(POOL_SIZES)}")
+        with cls._lock:
+            if name not in cls._executors:
+                env_name, default = POOL_SIZES[name]
+                size = max(1, get_int_env(env_name, default))
+                cls._executors[name] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"pool-{name}")
+                cls._queued.setdefault(name, 0)
+                cls._active.setdefault(name, 0)
+            return cls._executors[name]
+
+    @classmethod
+    def _tracked(cls, name: str, state: Dict[str, bool], func: Callable[..., Any], *args, **kwargs) -> Any:
+        with cls._lock:
+            state["started"] = True
+            if not state["abandoned"]:
+                cls._queued[name] -= 1
+            cls._active[name] += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with cls._lock:
+                cls._active[name] -= 1
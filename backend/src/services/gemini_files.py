@@ -0,0 +1,236 @@
+"""
+Registry of videos uploaded to the Gemini File API.
+
+Uploading a video and waiting for Gemini to process it dominates the
+latency of an analysis, yet the same cached video is often sent again
+(a re-analysis after a prompt change, a repeated policy check). Uploads are
+recorded in the `gemini_files` collection by content hash and upload
+profile, and callers reuse an ACTIVE file instead of uploading again.
+
+Gemini deletes uploads 48h after creation. A background janitor drops
+records of expired files and deletes files that are about to expire or
+have not been used for GEMINI_FILE_IDLE_SECONDS.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.analysis.gemini_client import delete_uploaded_file, get_active_file, upload_file
+from src.db import MongoDB
+from src.services.executor_pool import ExecutorPool
+from src.services.gemini_poller import GeminiPoller
+from src.utils.cancellation import OperationCancelled, raise_if_cancelled
+from src.utils.env import get_int_env
+
+logger = logging.getLogger(__name__)
+
+FILE_TTL_SECONDS = 48 * 3600  # Gemini File API retention
+REUSE_MARGIN_SECONDS = 3600  # Don't hand out files that expire before an analysis could finish
+IN_USE_GRACE_SECONDS = 1800  # The janitor leaves recently acquired files alone
+
+
+def _expires_at(video_file) -> datetime:
+    """Expiry of an uploaded file as naive UTC (like the rest of the db timestamps)."""
+    expiration = getattr(video_file, "expiration_time", None)
+    if isinstance(expiration, datetime):
+        if expiration.tzinfo is not None:
+            expiration = expiration.astimezone(timezone.utc).replace(tzinfo=None)
+        return expiration
+    return datetime.utcnow() + timedelta(seconds=FILE_TTL_SECONDS)
+
+
+class GeminiFiles:
+    """Mongo-backed registry of reusable Gemini uploads."""
+    _inflight: Dict[str, "asyncio.Future[Any]"] = {}  # content_hash:profile -> upload in progress (this process)
+    _metrics: Dict[str, int] = {"uploads": 0, "reuses": 0}
+
+    @classmethod
+    async def acquire(
+        cls,
+        content_hash: str,
+        profile: str,
+        upload_path: Callable[[], Awaitable[str]],
+        timings: Dict[str, Any] | None = None,
+        cancel_event: threading.Event | None = None,
+        label: str = "Video analysis"
+    ):
+        """
+        ACTIVE Gemini file of the video, uploading it only if no reusable one
+        is registered. upload_path is awaited on a miss to get the file to
+        upload (e.g. the proxy for the profile). Concurrent callers in this
+        process share one lookup/upload. The returned file belongs to the
+        registry: callers must not delete it.
+        """
+        key = f"{content_hash}:{profile}"
+        while True:
+            pending = cls._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                video_file = await asyncio.shield(pending)
+                cls._metrics["reuses"] += 1
+                if timings is not None:
+                    timings["gemini_file_reused"] = True
+                return video_file
+            except OperationCancelled:
+                # The uploading caller was cancelled; retry unless we were too
+                raise_if_cancelled(cancel_event, label)
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # Mark exception as retrieved
+        cls._inflight[key] = future
+        try:
+            video_file = await cls._lookup(content_hash, profile)
+            if video_file is not None:
+                cls._metrics["reuses"] += 1
+                if timings is not None:
+                    timings["gemini_file_reused"] = True
+            else:
+                path = await upload_path()
+                video_file = await ExecutorPool.run("io", upload_file, path, label, timings, cancel_event)
+                try:
+                    video_file = await GeminiPoller.wait_active(video_file, label, timings)
+                except (asyncio.CancelledError, TimeoutError):
+                    # Don't leave an upload behind that nobody will use
+                    ExecutorPool.get("io").submit(delete_uploaded_file, video_file)
+                    raise
+                cls._metrics["uploads"] += 1
+                await cls._register(content_hash, profile, video_file)
+            future.set_result(video_file)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            cls._inflight.pop(key, None)
+            if not future.done():  # Leader task cancelled: waiters retry the upload
+                future.set_exception(OperationCancelled(f"{label} cancelled"))
+        return video_file
+
+    @classmethod
+    async def _lookup(cls, content_hash: str, profile: str):
+        """Registered ACTIVE file that is still valid on Gemini's side, else None."""
+        db = MongoDB.get_db()
+        try:
+            doc = await db.gemini_files.find_one(
+                {
+                    "content_hash": content_hash,
+                    "profile": profile,
+                    "state": "ACTIVE",
+                    "expires_at": {"$gt": datetime.utcnow() + timedelta(seconds=REUSE_MARGIN_SECONDS)}
+                },
+                sort=[("expires_at", -1)]
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Gemini file registry lookup failed: {e}")
+            return None
+        if doc is None:
+            return None
+
+        video_file = await ExecutorPool.run("io", get_active_file, doc["name"])
+        if video_file is None:
+            # Deleted or failed remotely
+            await db.gemini_files.delete_one({"name": doc["name"]})
+            return None
+        touched = await db.gemini_files.update_one(
+            {"name": doc["name"]},
+            {"$set": {"last_used_at": datetime.utcnow()}, "$inc": {"uses": 1}}
+        )
+        if touched.matched_count == 0:
+            return None  # Claimed by the janitor in the meantime
+        logger.info(f"♻️ Reusing Gemini file {doc['name']} for {content_hash[:12]} ({profile})")
+        return video_file
+
+    @classmethod
+    async def _register(cls, content_hash: str, profile: str, video_file):
+        """Record a fresh ACTIVE upload (best effort - it is still used once if this fails)."""
+        now = datetime.utcnow()
+        try:
+            await MongoDB.get_db().gemini_files.update_one(
+                {"name": video_file.name},
+                {"$set": {
+                    "content_hash": content_hash,
+                    "profile": profile,
+                    "state": video_file.state.name,
+                    "uri": getattr(video_file, "uri", None),
+                    "size_bytes": getattr(video_file, "size_bytes", None),
+                    "expires_at": _expires_at(video_file),
+                    "last_used_at": now
+                }, "$setOnInsert": {"created_at": now, "uses": 1}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to register Gemini file {video_file.name}: {e}")
+
+    @classmethod
+    async def cleanup(cls, idle_seconds: Optional[int] = None) -> Dict[str, int]:
+        """
+        Drop records of expired files and delete (remotely and from the registry)
+        files that expire soon or have been idle for idle_seconds
+        (GEMINI_FILE_IDLE_SECONDS). Returns {"expired", "deleted", "failed"}.
+        """
+        if idle_seconds is None:
+            idle_seconds = get_int_env("GEMINI_FILE_IDLE_SECONDS", 6 * 3600)
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        in_use_after = now - timedelta(seconds=IN_USE_GRACE_SECONDS)
+        docs = await db.gemini_files.find(
+            {"$or": [
+                {"expires_at": {"$lte": now}},
+                {"last_used_at": {"$lt": min(in_use_after, now - timedelta(seconds=idle_seconds))}},
+                {
+                    "expires_at": {"$lte": now + timedelta(seconds=REUSE_MARGIN_SECONDS)},
+                    "last_used_at": {"$lt": in_use_after}
+                }
+            ]},
+            {"name": 1, "expires_at": 1, "last_used_at": 1}
+        ).to_list(length=None)
+
+        result = {"expired": 0, "deleted": 0, "failed": 0}
+        for doc in docs:
+            # Claim the record first; it stays if it was reused since it was read
+            claimed = await db.gemini_files.delete_one(
+                {"name": doc["name"], "last_used_at": doc.get("last_used_at")}
+            )
+            if claimed.deleted_count == 0:
+                continue
+            if doc["expires_at"] <= now:
+                result["expired"] += 1  # Already removed by Gemini
+            elif await ExecutorPool.run("io", delete_uploaded_file, doc["name"]):
+                result["deleted"] += 1
+            else:
+                result["failed"] += 1
+
+        if any(result.values()):
+            logger.info(
+                f"🧹 Gemini files: {result['deleted']} deleted, {result['expired']} expired, "
+                f"{result['failed']} failed to delete"
+            )
+        return result
+
+    @classmethod
+    async def run_janitor(cls, interval_seconds: Optional[int] = None):
+        """Run cleanup every GEMINI_FILE_JANITOR_INTERVAL seconds until cancelled."""
+        if interval_seconds is None:
+            interval_seconds = get_int_env("GEMINI_FILE_JANITOR_INTERVAL", 1800)
+        while True:
+            try:
+                await cls.cleanup()
+            except Exception as e:
+                logger.warning(f"⚠️ Gemini file cleanup failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    @classmethod
+    async def stats(cls) -> Dict[str, Any]:
+        """Registered/reusable file counts and upload/reuse counters of this process."""
+        db = MongoDB.get_db()
+        reusable_until = datetime.utcnow() + timedelta(seconds=REUSE_MARGIN_SECONDS)
+        return {
+            "files": await db.gemini_files.count_documents({}),
+            "reusable": await db.gemini_files.count_documents(
+                {"state": "ACTIVE", "expires_at": {"$gt": reusable_until}}
+            ),
+            **cls._metrics,
+            **GeminiPoller.stats()
+        }
@@ -0,0 +1,161 @@
+"""
+Shared asyncio poller for Gemini file processing.
+
+After an upload Gemini needs anywhere from seconds to minutes to process
+a video. Instead of a worker thread sleeping in a poll loop per upload,
+waiters register their file here and one task per event loop polls every
+pending upload, each on its own jittered backoff schedule and deadline.
+Only the short get_file() calls run in the io pool.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+from src.analysis.gemini_client import (
+    delete_uploaded_file, ensure_active, get_file, processing_poll_delays, processing_timeout, upload_file
+)
+from src.services.executor_pool import ExecutorPool
+from src.utils.timings import timed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingFile:
+    name: str
+    future: "asyncio.Future[Any]"
+    deadline: float
+    next_poll_at: float
+    delays: Iterator[float]
+    polls: int = 0
+
+
+class GeminiPoller:
+    """Polls the processing state of all pending uploads in a single loop."""
+    _pending: Dict[str, _PendingFile] = {}
+    _task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    async def wait_active(
+        cls,
+        video_file,
+        label: str = "Video analysis",
+        timings: Dict[str, Any] | None = None,
+        timeout: Optional[float] = None
+    ):
+        """
+        Wait until Gemini has processed video_file and return the ACTIVE file.
+
+        Raises TimeoutError after timeout seconds (GEMINI_PROCESSING_TIMEOUT)
+        and RuntimeError if processing failed (the file is deleted then).
+        Cancelling the waiter stops polling the file; deleting a timed out
+        or abandoned upload is up to the caller.
+        """
+        if video_file.state.name == "PROCESSING":
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            delays = processing_poll_delays()
+            entry = _PendingFile(
+                name=video_file.name,
+                future=loop.create_future(),
+                deadline=now + (timeout if timeout is not None else processing_timeout()),
+                next_poll_at=now + next(delays),
+                delays=delays
+            )
+            cls._pending[entry.name] = entry
+            cls._ensure_running(loop)
+            try:
+                with timed(timings, "processing_wait"):
+                    video_file = await entry.future
+            except TimeoutError:
+                raise TimeoutError(
+                    f"{label}: file {entry.name} still processing after {entry.polls} polls"
+                ) from None
+            finally:
+                if cls._pending.get(entry.name) is entry:
+                    del cls._pending[entry.name]
+        return await ExecutorPool.run("io", ensure_active, video_file)
+
+    @classmethod
+    async def upload(
+        cls,
+        video_path: str,
+        label: str = "Video analysis",
+        timings: Dict[str, Any] | None = None,
+        cancel_event: Optional[threading.Event] = None
+    ):
+        """
+        Upload video_path in the io pool and wait here until it is ACTIVE.
+
+        For one-off uploads outside the file registry (see GeminiFiles).
+        The upload is deleted again if the wait is cancelled or times out.
+        """
+        video_file = await ExecutorPool.run("io", upload_file, video_path, label, timings, cancel_event)
+        try:
+            return await cls.wait_active(video_file, label, timings)
+        except (asyncio.CancelledError, TimeoutError):
+            # Don't leave an upload behind that nobody will use
+            ExecutorPool.get("io").submit(delete_uploaded_file, video_file)
+            raise
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Number of uploads currently waited on."""
+        return {"processing": len(cls._pending)}
+
+    @classmethod
+    def _ensure_running(cls, loop: asyncio.AbstractEventLoop):
+        if cls._task is None or cls._task.done() or cls._loop is not loop:
+            cls._loop = loop
+            cls._wakeup = asyncio.Event()
+            cls._task = loop.create_task(cls._run())
+        else:
+            cls._wakeup.set()  # Re-plan the sleep for the new entry
+
+    @classmethod
+    async def _run(cls):
+        """Poll due files until none are pending."""
+        loop = asyncio.get_running_loop()
+        while cls._pending:
+            now = loop.time()
+            due = [entry for entry in list(cls._pending.values()) if entry.next_poll_at <= now]
+            if due:
+                await asyncio.gather(*(cls._poll(entry) for entry in due))
+                continue
+            next_at = min(entry.next_poll_at for entry in cls._pending.values())
+            cls._wakeup.clear()
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), max(0.0, next_at - now))
+            except asyncio.TimeoutError:
+                pass
+
+    @classmethod
+    async def _poll(cls, entry: _PendingFile):
+        """Refresh one file's state and resolve its waiter or schedule the next poll."""
+        if entry.future.done():  # Waiter cancelled
+            cls._pending.pop(entry.name, None)
+            return
+        loop = asyncio.get_running_loop()
+        entry.polls += 1
+        try:
+            video_file = await ExecutorPool.run("io", get_file, entry.name)
+        except Exception as e:
+            logger.warning(f"⚠️ Polling Gemini file {entry.name} failed: {e}")
+            video_file = None
+
+        now = loop.time()
+        if entry.future.done():
+            return
+        if video_file is not None and video_file.state.name != "PROCESSING":
+            entry.future.set_result(video_file)
+        elif now >= entry.deadline:
+            entry.future.set_exception(TimeoutError(entry.name))
+        else:
+            entry.next_poll_at = min(entry.deadline, now + next(entry.delays))
+            return
+        if cls._pending.get(entry.name) is entry:
+            del cls._pending[entry.name]
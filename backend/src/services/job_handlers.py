@@ -0,0 +1,114 @@
+"""
+Job queue handlers: map job types to the background task functions.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+from src.db import MongoDB, TaskStatus, PolicyCheckStatus, JobType
+from src.services.task_service import parse_ads_task, parse_ads_batch_task, analyze_creatives_task
+from src.services.policy_service import policy_check_task
+from src.services.task_events import TaskEvents
+from src.services.job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+
+async def run_parse_ads_job(job: Dict[str, Any]):
+    payload = job["payload"]
+    await parse_ads_task(
+        task_id=payload["task_id"],
+        url=payload["url"],
+        max_results=payload.get("max_results", 15),
+        auto_analyze=payload.get("auto_analyze", True)
+    )
+
+
+async def run_parse_ads_batch_job(job: Dict[str, Any]):
+    payload = job["payload"]
+    await parse_ads_batch_task(
+        tasks=payload["tasks"],
+        max_results=payload.get("max_results", 15),
+        auto_analyze=payload.get("auto_analyze", True)
+    )
+
+
+async def run_analyze_creatives_job(job: Dict[str, Any]):
+    payload = job["payload"]
+    # An ANALYZING task may still be analyzed by another worker; never run it twice
+    if await JobQueue.has_live_lease(JobType.ANALYZE_CREATIVES, payload["task_id"], exclude_job_id=job.get("job_id")):
+        logger.warning(
+            f"⏭️ Task {payload['task_id']} is already being analyzed by another job, skipping job {job.get('job_id')}"
+        )
+        return
+    # A redelivered job (previous attempt died mid-analysis, or was handed back
+    # on shutdown without counting the attempt) continues from its checkpoints
+    resume = (
+        payload.get("resume", False)
+        or job.get("attempts", 1) > 1
+        or await _analysis_interrupted(payload["task_id"])
+    )
+    await analyze_creatives_task(payload["task_id"], resume=resume)
+
+
+async def _analysis_interrupted(task_id: str) -> bool:
+    """
+    True if the task is ANALYZING with a stored ad selection. Called once no other
+    job holds a live lease on the task, so the earlier run was interrupted.
+    """
+    task = await MongoDB.get_db().tasks.find_one(
+        {"task_id": task_id}, {"status": 1, "analysis_selection": 1}
+    )
+    return bool(task and task.get("status") == TaskStatus.ANALYZING and task.get("analysis_selection"))
+
+
+async def run_policy_check_job(job: Dict[str, Any]):
+    payload = job["payload"]
+    await policy_check_task(
+        task_id=payload["task_id"],
+        video_url=payload["video_url"],
+        platform=payload.get("platform", "facebook")
+    )
+
+
+JOB_HANDLERS = {
+    JobType.PARSE_ADS.value: run_parse_ads_job,
+    JobType.PARSE_ADS_BATCH.value: run_parse_ads_batch_job,
+    JobType.ANALYZE_CREATIVES.value: run_analyze_creatives_job,
+    JobType.POLICY_CHECK.value: run_policy_check_job,
+}
+
+
+async def handle_dead_letter(job: Dict[str, Any], error: str):
+    """Mark the task behind a dead-lettered job as FAILED so clients stop waiting."""
+    db = MongoDB.get_db()
+    payload = job.get("payload", {})
+    message = f"Job failed after {job.get('attempts', 0)} attempts: {error}"
+
+    if job["type"] == JobType.PARSE_ADS_BATCH:
+        # Only competitors whose results were not saved yet
+        for task_id in [t["task_id"] for t in payload.get("tasks", [])]:
+            result = await db.tasks.update_one(
+                {"task_id": task_id, "status": {"$in": [TaskStatus.PENDING, TaskStatus.PARSING]}},
+                {"$set": {"status": TaskStatus.FAILED, "error": message, "updated_at": datetime.utcnow()}}
+            )
+            if result.modified_count:
+                await TaskEvents.publish(task_id, "status", {"status": TaskStatus.FAILED, "error": message})
+        return
+
+    task_id = payload.get("task_id")
+    if not task_id:
+        return
+
+    if job["type"] == JobType.POLICY_CHECK:
+        await db.policy_tasks.update_one(
+            {"task_id": task_id, "status": {"$nin": [PolicyCheckStatus.COMPLETED, PolicyCheckStatus.CANCELLED]}},
+            {"$set": {"status": PolicyCheckStatus.FAILED, "error": message, "updated_at": datetime.utcnow()}}
+        )
+        await TaskEvents.publish(task_id, "status", {"status": PolicyCheckStatus.FAILED, "error": message}, kind="policy")
+    else:
+        await db.tasks.update_one(
+            {"task_id": task_id, "status": {"$nin": [TaskStatus.COMPLETED, TaskStatus.CANCELLED]}},
+            {"$set": {"status": TaskStatus.FAILED, "error": message, "updated_at": datetime.utcnow()}}
+        )
+        await TaskEvents.publish(task_id, "status", {"status": TaskStatus.FAILED, "error": message})
@@ -0,0 +1,474 @@
+"""
+Durable MongoDB-backed job queue.
+
+Jobs are claimed atomically with find_one_and_update and held under a lease
+that the running worker extends with heartbeats. Failed jobs are retried with
+exponential backoff and dead-lettered once their attempts are exhausted.
+Jobs whose lease expired (worker crashed or was restarted) are put back on
+the queue by recover_expired_leases().
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from src.db import MongoDB, Job, JobStatus
+from src.utils.env import get_float_env, get_int_env
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+DeadLetterHandler = Callable[[Dict[str, Any], str], Awaitable[None]]
+
+
+def _lease_seconds() -> int:
+    return max(10, get_int_env("JOB_LEASE_SECONDS", 120))
+
+
+def retry_delay_seconds(attempts: int) -> int:
+    """Exponential backoff delay before the next attempt."""
+    base = max(1, get_int_env("JOB_RETRY_BASE_SECONDS", 30))
+    cap = max(base, get_int_env("JOB_RETRY_MAX_SECONDS", 600))
+    return min(cap, base * 2 ** max(0, attempts - 1))
+
+
+class JobQueue:
+    """Operations on the jobs collection."""
+
+    @classmethod
+    async def enqueue(
+        cls,
+        job_type: str,
+        payload: Dict[str, Any],
+        max_attempts: Optional[int] = None
+    ) -> str:
+        """Persist a new job and return its job_id."""
+        db = MongoDB.get_db()
+        job = Job(
+            job_id=str(uuid.uuid4()),
+            type=job_type,
+            payload=payload,
+            max_attempts=max_attempts or max(1, get_int_env("JOB_MAX_ATTEMPTS", 3))
+        )
+        await db.jobs.insert_one(job.model_dump())
+        logger.info(f"📥 Enqueued {job.type} job {job.job_id}")
+        return job.job_id
+
+    @classmethod
+    async def has_active_job(cls, job_type: str, task_id: str) -> bool:
+        """True if a job for the task is queued or running under a live lease."""
+        db = MongoDB.get_db()
+        job = await db.jobs.find_one({
+            "type": job_type,
+            "payload.task_id": task_id,
+            "$or": [
+                {"status": JobStatus.QUEUED},
+                {"status": JobStatus.RUNNING, "lease_until": {"$gte": datetime.utcnow()}}
+            ]
+        })
+        return job is not None
+
+    @classmethod
+    async def has_live_lease(cls, job_type: str, task_id: str, exclude_job_id: Optional[str] = None) -> bool:
+        """True if another job for the task is running under a live lease."""
+        db = MongoDB.get_db()
+        job = await db.jobs.find_one({
+            "type": job_type,
+            "payload.task_id": task_id,
+            "job_id": {"$ne": exclude_job_id},
+            "status": JobStatus.RUNNING,
+            "lease_until": {"$gte": datetime.utcnow()}
+        })
+        return job is not None
+
+    @classmethod
+    async def claim(
+        cls,
+        worker_id: str,
+        job_types: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Atomically claim the next due job and take a lease on it."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        query: Dict[str, Any] = {
+            "status": JobStatus.QUEUED,
+            "run_at": {"$lte": now},
+            "cancel_requested": {"$ne": True}
+        }
+        if job_types:
+            query["type"] = {"$in": list(job_types)}
+
+        return await db.jobs.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING,
+                    "worker_id": worker_id,
+                    "lease_until": now + timedelta(seconds=_lease_seconds()),
+                    "heartbeat_at": now,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @classmethod
+    async def heartbeat(cls, job_id: str, worker_id: str) -> bool:
+        """Extend the lease. Returns False if the lease was lost."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        result = await db.jobs.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": JobStatus.RUNNING},
+            {"$set": {
+                "lease_until": now + timedelta(seconds=_lease_seconds()),
+                "heartbeat_at": now,
+                "updated_at": now
+            }}
+        )
+        return result.matched_count == 1
+
+    @classmethod
+    async def complete(cls, job_id: str, worker_id: str):
+        """Mark a running job as completed."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        await db.jobs.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": JobStatus.RUNNING},
+            {"$set": {
+                "status": JobStatus.COMPLETED,
+                "lease_until": None,
+                "completed_at": now,
+                "updated_at": now
+            }}
+        )
+
+    @classmethod
+    async def fail(cls, job: Dict[str, Any], worker_id: str, error: str) -> bool:
+        """
+        Record a failed attempt.
+
+        Schedules a retry with backoff, or dead-letters the job when its
+        attempts are exhausted. Returns True if the job was dead-lettered.
+        """
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        attempts = job.get("attempts", 1)
+        dead = attempts >= job.get("max_attempts", 1)
+
+        update: Dict[str, Any] = {
+            "lease_until": None,
+            "last_error": error,
+            "updated_at": now
+        }
+        if dead:
+            update["status"] = JobStatus.DEAD
+            update["completed_at"] = now
+        else:
+            update["status"] = JobStatus.QUEUED
+            update["run_at"] = now + timedelta(seconds=retry_delay_seconds(attempts))
+
+        await db.jobs.update_one(
+            {"job_id": job["job_id"], "worker_id": worker_id, "status": JobStatus.RUNNING},
+            {"$set": update}
+        )
+        if dead:
+            logger.error(f"☠️ Job {job['job_id']} dead-lettered after {attempts} attempts: {error}")
+        else:
+            logger.warning(f"🔁 Job {job['job_id']} attempt {attempts} failed, retrying: {error}")
+        return dead
+
+    @classmethod
+    async def release(cls, job_id: str, worker_id: str):
+        """Return a running job to the queue without counting the attempt (graceful shutdown)."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        await db.jobs.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": JobStatus.RUNNING},
+            {
+                "$set": {
+                    "status": JobStatus.QUEUED,
+                    "run_at": now,
+                    "lease_until": None,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": -1}
+            }
+        )
+
+    @classmethod
+    async def request_cancel(cls, task_id: str, job_types: Optional[List[str]] = None) -> int:
+        """
+        Cancel the jobs of a task.
+
+        Queued jobs are cancelled right away; running jobs are flagged and
+        their worker cancels the handler on its next cancel check.
+        Returns the number of affected jobs.
+        """
+        query: Dict[str, Any] = {"payload.task_id": task_id}
+        if job_types:
+            query["type"] = {"$in": list(job_types)}
+        return await cls._cancel_matching(query)
+
+    @classmethod
+    async def cancel_job(cls, job_id: str) -> int:
+        """Cancel one job (see request_cancel). Returns 1 if it was still queued or running."""
+        return await cls._cancel_matching({"job_id": job_id})
+
+    @classmethod
+    async def active_batch_jobs(cls, task_id: str) -> List[Dict[str, Any]]:
+        """Queued or running batch jobs whose payload.tasks include the task."""
+        db = MongoDB.get_db()
+        return await db.jobs.find(
+            {"payload.tasks.task_id": task_id, "status": {"$in": [JobStatus.QUEUED, JobStatus.RUNNING]}},
+            {"job_id": 1, "payload.tasks": 1}
+        ).to_list(length=None)
+
+    @classmethod
+    async def _cancel_matching(cls, query: Dict[str, Any]) -> int:
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        queued = await db.jobs.update_many(
+            {**query, "status": JobStatus.QUEUED},
+            {"$set": {"status": JobStatus.CANCELLED, "completed_at": now, "updated_at": now}}
+        )
+        running = await db.jobs.update_many(
+            {**query, "status": JobStatus.RUNNING},
+            {"$set": {"cancel_requested": True, "updated_at": now}}
+        )
+        return queued.modified_count + running.modified_count
+
+    @classmethod
+    async def is_cancel_requested(cls, job_id: str) -> bool:
+        db = MongoDB.get_db()
+        job = await db.jobs.find_one({"job_id": job_id}, {"cancel_requested": 1})
+        return bool(job and job.get("cancel_requested"))
+
+    @classmethod
+    async def mark_cancelled(cls, job_id: str, worker_id: str):
+        """Mark a running job whose handler was cancelled on request."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        await db.jobs.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": JobStatus.RUNNING},
+            {"$set": {
+                "status": JobStatus.CANCELLED,
+                "lease_until": None,
+                "completed_at": now,
+                "updated_at": now
+            }}
+        )
+
+    @classmethod
+    async def recover_expired_leases(
+        cls,
+        on_dead_letter: Optional[DeadLetterHandler] = None
+    ) -> int:
+        """
+        Requeue running jobs whose lease expired (their worker died).
+
+        Jobs that already used all attempts are dead-lettered instead.
+        Returns the number of recovered jobs.
+        """
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        expired = {"status": JobStatus.RUNNING, "lease_until": {"$lt": now}}
+        error = "Lease expired (worker stopped)"
+        recovered = 0
+
+        # Jobs cancelled while their worker was gone are not retried
+        await db.jobs.update_many(
+            {**expired, "cancel_requested": True},
+            {"$set": {
+                "status": JobStatus.CANCELLED,
+                "lease_until": None,
+                "completed_at": now,
+                "updated_at": now
+            }}
+        )
+
+        # Dead-letter expired jobs that have no attempts left
+        while True:
+            job = await db.jobs.find_one_and_update(
+                {**expired, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+                {"$set": {
+                    "status": JobStatus.DEAD,
+                    "lease_until": None,
+                    "last_error": error,
+                    "completed_at": now,
+                    "updated_at": now
+                }},
+                return_document=ReturnDocument.AFTER
+            )
+            if not job:
+                break
+            recovered += 1
+            logger.error(f"☠️ Job {job['job_id']} dead-lettered after lease expiry")
+            if on_dead_letter:
+                await on_dead_letter(job, error)
+
+        # Requeue the rest for immediate retry
+        result = await db.jobs.update_many(
+            expired,
+            {"$set": {
+                "status": JobStatus.QUEUED,
+                "run_at": now,
+                "lease_until": None,
+                "last_error": error,
+                "updated_at": now
+            }}
+        )
+        if result.modified_count:
+            logger.warning(f"♻️ Requeued {result.modified_count} job(s) with expired leases")
+        recovered += result.modified_count
+
+        return recovered
+
+
+class JobWorker:
+    """
+    Claims jobs from the queue and runs them with bounded concurrency.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, JobHandler],
+        on_dead_letter: Optional[DeadLetterHandler] = None,
+        concurrency: int = 1,
+        job_types: Optional[List[str]] = None,
+        poll_interval: float = 1.0,
+        worker_id: Optional[str] = None
+    ):
+        self.handlers = handlers
+        self.on_dead_letter = on_dead_letter
+        self.concurrency = max(1, concurrency)
+        self.job_types = job_types or list(handlers.keys())
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: set = set()
+
+    async def run(self):
+        """Claim and execute jobs until stop() is called."""
+        logger.info(f"👷 Job worker {self.worker_id} started (concurrency={self.concurrency}, types={self.job_types})")
+        slots = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        next_recovery = loop.time()
+
+        while not self._stopping.is_set():
+            # Periodically requeue jobs abandoned by crashed workers
+            if loop.time() >= next_recovery:
+                try:
+                    await JobQueue.recover_expired_leases(self.on_dead_letter)
+                except Exception as e:
+                    logger.error(f"❌ Lease recovery failed: {e}")
+                next_recovery = loop.time() + _lease_seconds()
+
+            await slots.acquire()
+            if self._stopping.is_set():
+                slots.release()
+                break
+            try:
+                job = await JobQueue.claim(self.worker_id, self.job_types)
+            except Exception as e:
+                logger.error(f"❌ Failed to claim job: {e}")
+                job = None
+
+            if not job:
+                slots.release()
+                await self._sleep(self.poll_interval)
+                continue
+
+            task = asyncio.create_task(self._execute(job))
+            self._running[job["job_id"]] = task
+            task.add_done_callback(lambda _t, job_id=job["job_id"]: self._on_done(job_id, slots))
+
+        logger.info(f"👷 Job worker {self.worker_id} stopped claiming jobs")
+
+    async def stop(self):
+        """Stop claiming new jobs and hand in-flight jobs back to the queue."""
+        self._stopping.set()
+        running = list(self._running.items())
+        for job_id, task in running:
+            task.cancel()
+        for job_id, task in running:
+            try:
+                await task
+            except BaseException:
+                pass
+            try:
+                await JobQueue.release(job_id, self.worker_id)
+            except Exception as e:
+                logger.error(f"❌ Failed to release job {job_id}: {e}")
+
+    def _on_done(self, job_id: str, slots: asyncio.Semaphore):
+        self._running.pop(job_id, None)
+        self._cancel_requested.discard(job_id)
+        slots.release()
+
+    async def _execute(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        handler = self.handlers.get(job["type"])
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job type '{job['type']}'")
+            logger.info(f"▶️ Running {job['type']} job {job_id} (attempt {job['attempts']}/{job['max_attempts']})")
+            await handler(job)
+            await JobQueue.complete(job_id, self.worker_id)
+            logger.info(f"✅ Job {job_id} completed")
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                raise  # Worker shutdown: stop() hands the job back to the queue
+            logger.info(f"🛑 Job {job_id} cancelled on request")
+            try:
+                await JobQueue.mark_cancelled(job_id, self.worker_id)
+            except Exception as e:
+                logger.error(f"❌ Failed to mark job {job_id} cancelled: {e}")
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {e}")
+            try:
+                dead = await JobQueue.fail(job, self.worker_id, str(e))
+                if dead and self.on_dead_letter:
+                    await self.on_dead_letter(job, str(e))
+            except Exception as inner:
+                logger.error(f"❌ Failed to record failure of job {job_id}: {inner}")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str):
+        """Extend the lease periodically and cancel the job when cancellation is requested."""
+        loop = asyncio.get_running_loop()
+        interval = _lease_seconds() / 3
+        cancel_poll = max(0.5, get_float_env("JOB_CANCEL_POLL_SECONDS", 2.0))
+        next_heartbeat = loop.time() + interval
+        while True:
+            await asyncio.sleep(min(cancel_poll, interval))
+            try:
+                if await JobQueue.is_cancel_requested(job_id):
+                    task = self._running.get(job_id)
+                    if task is not None:
+                        self._cancel_requested.add(job_id)
+                        task.cancel()
+                    return
+                if loop.time() >= next_heartbeat:
+                    next_heartbeat = loop.time() + interval
+                    if not await JobQueue.heartbeat(job_id, self.worker_id):
+                        logger.warning(f"⚠️ Lost lease on job {job_id}")
+                        return
+            except Exception as e:
+                logger.error(f"❌ Heartbeat failed for job {job_id}: {e}")
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
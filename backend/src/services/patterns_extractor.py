@@ -258,7 +258,9 @@ def format_patterns_for_prompt(patterns: Dict[str, Any]) -> str:
     if patterns.get("structures"):
         struct_text = "POPULAR STRUCTURES:\n"
         for struct in patterns["structures"][:3]:
-            struct_text += f"- {struct['type']} (used in {struct['count']} ads)\n"
+            # Default patterns carry no usage count
+            usage = f"used in {struct['count']} ads" if "count" in struct else "best practice"
+            struct_text += f"- {struct['type']} ({usage})\n"
         sections.append(struct_text)
 
     # Styles
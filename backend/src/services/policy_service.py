@@ -0,0 +1,147 @@
+"""
+Background task service for video policy compliance checks.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+from src.db import MongoDB, PolicyCheckStatus
+from src.services.executor_pool import ExecutorPool
+from src.services.gemini_files import GeminiFiles
+from src.services.task_events import TaskEvents
+from src.services.video_downloader import VideoDownloader
+from src.services.video_proxy import upload_copy
+from src.utils.timings import StageTimer
+from src.utils.transient_errors import is_transient_error
+
+logger = logging.getLogger(__name__)
+
+
+def _not_cancelled(task_id: str) -> Dict[str, Any]:
+    """Filter for status updates: a cancelled check must stay CANCELLED."""
+    return {"task_id": task_id, "status": {"$ne": PolicyCheckStatus.CANCELLED}}
+
+
+async def policy_check_task(task_id: str, video_url: str, platform: str):
+    """
+    Background task for policy checking.
+    """
+    from src.analysis.policy_checker import check_video_policy, format_policy_report
+    from src.utils.policy_html_report import generate_comprehensive_policy_html
+    
+    db = MongoDB.get_db()
+    timer = StageTimer()
+    cancel_event = threading.Event()
+    
+    try:
+        # Update status to CHECKING
+        await db.policy_tasks.update_one(
+            _not_cancelled(task_id),
+            {"$set": {
+                "status": PolicyCheckStatus.CHECKING,
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        await TaskEvents.publish(task_id, "status", {"status": PolicyCheckStatus.CHECKING}, kind="policy")
+        
+        logger.info(f"🔍 Starting policy check for task {task_id}")
+        
+        with timer.stage("total"):
+            # Download through the shared pooled client, then check the local copy with Gemini
+            fd, tmp_path = tempfile.mkstemp(prefix="policy_", suffix=".mp4")
+            os.close(fd)
+            proxy_tmp_path = tmp_path.replace(".mp4", "_policy.mp4")
+            try:
+                content_hash, size = await VideoDownloader.download(
+                    video_url, Path(tmp_path), cancel_event, timer.stages
+                )
+                timer.add_bytes("download", size)
+                # Reuse an earlier upload of the same video; otherwise upload a
+                # policy-profile proxy (keeps on-screen text legible at a fraction of the size)
+                video_file = await GeminiFiles.acquire(
+                    content_hash,
+                    "policy",
+                    lambda: upload_copy(tmp_path, "policy", timer.stages, proxy_tmp_path),
+                    timer.stages,  # receives transcode/upload/processing_wait
+                    cancel_event,
+                    "Policy check"
+                )
+                result = await check_video_policy(
+                    tmp_path,
+                    platform,
+                    None,  # model_name
+                    None,  # video_url
+                    timer.stages,  # receives generate
+                    cancel_event,
+                    video_file
+                )
+                timer.add_bytes("upload", timer.stages.pop("upload_bytes", 0))
+            finally:
+                os.unlink(tmp_path)
+                Path(proxy_tmp_path).unlink(missing_ok=True)
+            
+            # Generate comprehensive HTML report with all new fields
+            with timer.stage("html_report"):
+                html_report = await ExecutorPool.run(
+                    "cpu",
+                    generate_comprehensive_policy_html,
+                    result,
+                    video_url,
+                    platform
+                )
+        
+        # Extract key metrics
+        compliance = result.get("compliance_summary", {})
+        violations = result.get("facebook_policy_violations", [])
+        
+        # Update task with results
+        completed = await db.policy_tasks.update_one(
+            _not_cancelled(task_id),
+            {"$set": {
+                "status": PolicyCheckStatus.COMPLETED,
+                "policy_result": result,
+                "html_report": html_report,
+                "will_pass_moderation": compliance.get("will_pass_moderation", False),
+                "risk_level": compliance.get("risk_level", "unknown"),
+                "violations_count": len(violations),
+                **timer.as_update(),
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        if completed.matched_count == 0:
+            logger.info(f"🛑 Policy check {task_id} was cancelled, discarding results")
+            return
+        await TaskEvents.publish(task_id, "status", {
+            "status": PolicyCheckStatus.COMPLETED,
+            "will_pass_moderation": compliance.get("will_pass_moderation", False),
+            "risk_level": compliance.get("risk_level", "unknown"),
+            "violations_count": len(violations)
+        }, kind="policy")
+        
+        logger.info(f"✅ Policy check completed for task {task_id}")
+        
+    except asyncio.CancelledError:
+        # Stop the Gemini upload still running in the io pool
+        cancel_event.set()
+        logger.info(f"🛑 Policy check {task_id} cancelled")
+        raise
+    except Exception as e:
+        if is_transient_error(e):
+            logger.warning(f"⚠️ Policy check {task_id} hit a transient error, leaving it to the job retry: {e}")
+            raise
+        logger.error(f"❌ Policy check failed for task {task_id}: {e}")
+        await db.policy_tasks.update_one(
+            _not_cancelled(task_id),
+            {"$set": {
+                "status": PolicyCheckStatus.FAILED,
+                "error": str(e),
+                **timer.as_update(),
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        await TaskEvents.publish(task_id, "status", {"status": PolicyCheckStatus.FAILED, "error": str(e)}, kind="policy")
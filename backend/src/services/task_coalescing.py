@@ -0,0 +1,115 @@
+"""
+Coalescing of duplicate parse requests.
+
+Double-clicks and client retries must not start a second Apify run and
+Gemini analysis for the same competitor. Identical requests (same
+normalized Ads Library parameters, max_results and analysis options)
+collapse onto the task
+that is still in flight, and requests carrying an Idempotency-Key always
+get the task created for that key back.
+
+Both are enforced by unique partial indexes on the tasks collection, so
+concurrent requests (also from other API processes) cannot race past the
+lookup. `inflight_key` is released when a task is parsed without a queued
+analysis (auto_analyze=false), and otherwise lazily: a terminal task, or a
+PARSED one without a pending analysis job, still holding it is unset when
+the next identical request arrives.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from src.db import JobType, MongoDB, Task, TaskStatus
+from src.services.job_queue import JobQueue
+from src.utils.url_parser import URLParser
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
+
+
+def request_key(
+    url: str,
+    max_results: int,
+    auto_analyze: bool = True,
+    analysis_budget: int = 10,
+    check_policy: bool = False
+) -> str:
+    """
+    Stable key of a parse request: normalized URL parameters, max_results and
+    the analysis options, so a request is never joined to a task that would
+    not honour them.
+    """
+    params = {key: value for key, value in URLParser.extract_parameters(url).items() if value is not None}
+    params["media_type"] = "video"  # Always forced by the Apify service
+    params = {key: sorted(value) if isinstance(value, list) else value for key, value in params.items()}
+    raw = json.dumps({
+        "params": params,
+        "max_results": max_results,
+        "auto_analyze": auto_analyze,
+        "analysis_budget": analysis_budget,
+        "check_policy": check_policy
+    }, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def create_or_join_task(task: Task, key: str, idempotency_key: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Insert the task unless an equivalent one exists.
+
+    Returns (task_id, created). When created is False the caller must not
+    queue any work: the returned task already owns it.
+    """
+    db = MongoDB.get_db()
+
+    if idempotency_key:
+        existing = await db.tasks.find_one({"idempotency_key": idempotency_key}, {"task_id": 1})
+        if existing:
+            logger.info(f"♻️ Idempotency-Key matched task {existing['task_id']}")
+            return existing["task_id"], False
+
+    doc = task.model_dump()
+    doc["request_key"] = key
+    doc["inflight_key"] = key
+    if idempotency_key:
+        doc["idempotency_key"] = idempotency_key
+
+    # Second attempt after releasing a stale inflight_key held by a finished task
+    for _ in range(2):
+        try:
+            await db.tasks.insert_one(doc)
+            return task.task_id, True
+        except DuplicateKeyError:
+            doc.pop("_id", None)
+
+            if idempotency_key:
+                existing = await db.tasks.find_one({"idempotency_key": idempotency_key}, {"task_id": 1})
+                if existing:
+                    return existing["task_id"], False
+
+            existing = await db.tasks.find_one({"inflight_key": key}, {"task_id": 1, "status": 1})
+            if existing is None:
+                continue
+            if await _still_in_flight(existing):
+                logger.info(f"♻️ Coalesced duplicate parse request onto task {existing['task_id']}")
+                return existing["task_id"], False
+
+            await db.tasks.update_one(
+                {"task_id": existing["task_id"], "inflight_key": key},
+                {"$unset": {"inflight_key": ""}}
+            )
+
+    raise RuntimeError("Could not create task: conflicting in-flight task")
+
+
+async def _still_in_flight(task: Dict[str, Any]) -> bool:
+    """Running, or PARSED with its analysis still queued/running (else the key is stale)."""
+    status = task.get("status")
+    if status in TERMINAL_STATUSES:
+        return False
+    if status == TaskStatus.PARSED:
+        return await JobQueue.has_active_job(JobType.ANALYZE_CREATIVES, task["task_id"])
+    return True
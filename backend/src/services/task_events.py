@@ -0,0 +1,126 @@
+"""
+Task progress events.
+
+Pipelines publish status transitions and per-creative completions into the
+capped task_events collection. API nodes tail it with a tailable cursor and
+push the events to clients as Server-Sent Events, so progress reaches the
+client no matter which process (API or worker) is running the task.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from pymongo import CursorType
+
+from src.db import MongoDB
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15
+
+
+class TaskEvents:
+    """Publish/subscribe for task progress events."""
+
+    @classmethod
+    async def publish(
+        cls,
+        task_id: str,
+        event: str,
+        data: Optional[Dict[str, Any]] = None,
+        kind: str = "task"
+    ):
+        """Publish an event. Never raises: progress events are best effort."""
+        try:
+            db = MongoDB.get_db()
+            await db.task_events.insert_one({
+                "task_id": task_id,
+                "kind": kind,
+                "event": event,
+                "data": data or {},
+                "ts": datetime.utcnow()
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish {event} event for {kind} {task_id}: {e}")
+
+    @classmethod
+    async def subscribe(
+        cls,
+        task_id: str,
+        kind: str = "task",
+        since: Optional[datetime] = None
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Tail events for a task, starting with those published at or after
+        `since` (default: all events still in the capped collection).
+
+        Yields event documents as they arrive, or None when no event arrived
+        within the await window (lets callers send keepalives).
+        """
+        db = MongoDB.get_db()
+        last_id = None
+
+        while True:
+            query: Dict[str, Any] = {"task_id": task_id, "kind": kind}
+            if since is not None:
+                query["ts"] = {"$gte": since}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+
+            cursor = db.task_events.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                received = False
+                async for doc in cursor:
+                    received = True
+                    last_id = doc["_id"]
+                    yield doc
+                if not received:
+                    yield None
+
+            # Cursor died (e.g. collection was empty) - back off and re-open
+            yield None
+            await asyncio.sleep(1)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def sse_stream(
+    task_id: str,
+    kind: str,
+    snapshot: Dict[str, Any],
+    terminal_statuses: Iterable[str],
+    since: Optional[datetime] = None
+) -> AsyncIterator[str]:
+    """
+    SSE body for a task: current snapshot first, then live events until the
+    task reaches a terminal status.
+
+    `since` is when the snapshot was read: older events are already part of
+    it and are not replayed (an earlier run's terminal status event would
+    otherwise end the stream of a resumed task right away).
+    """
+    terminal = set(terminal_statuses)
+    yield format_sse("snapshot", snapshot)
+    if snapshot.get("status") in terminal:
+        return
+
+    loop = asyncio.get_running_loop()
+    last_sent = loop.time()
+
+    async for doc in TaskEvents.subscribe(task_id, kind, since):
+        if doc is None:
+            if loop.time() - last_sent >= KEEPALIVE_SECONDS:
+                last_sent = loop.time()
+                yield ": keepalive\n\n"
+            continue
+
+        last_sent = loop.time()
+        yield format_sse(doc["event"], {**doc.get("data", {}), "ts": doc.get("ts")})
+
+        if doc["event"] == "status" and doc.get("data", {}).get("status") in terminal:
+            return
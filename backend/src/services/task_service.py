@@ -4,20 +4,40 @@ Background task service for parsing and analyzing competitor ads.
 import json
 import logging
 import asyncio
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from pathlib import Path
 
-from src.db import MongoDB, Task, TaskStatus, CreativeAnalysis, AggregatedAnalysis
+from src.db import MongoDB, Task, TaskStatus, TaskProgress, CreativeAnalysis, AggregatedAnalysis, JobType
+from src.services.analysis_cache import AnalysisCache
 from src.services.apify_service import ApifyService
-from src.analysis.video_analyzer import analyze_video_file
-import httpx
+from src.services.creative_ranker import select_ads_for_analysis, score_ad
+from src.services.executor_pool import ExecutorPool
+from src.services.gemini_files import GeminiFiles
+from src.services.job_queue import JobQueue
+from src.services.task_events import TaskEvents
+from src.services.video_cache import VideoCache
+from src.services.video_prefetch import prefetch_videos
+from src.services.video_proxy import upload_copy
+from src.services.video_fingerprint import CreativeClusters, decode_fingerprint, encode_fingerprint, fingerprint_video
+from src.analysis.policy_checker import POLICY_PROMPT_VERSION, check_video_policy
+from src.analysis.video_analyzer import analyze_video_file, resolve_model_name, PROMPT_VERSION
+from src.utils.env import get_bool_env, get_int_env
+from src.utils.timings import StageTimer, timed
+from src.utils.transient_errors import is_transient_error
+from pymongo import ReturnDocument
 
 logger = logging.getLogger(__name__)
 
-# Cache directory
-CACHE_DIR = Path(__file__).parent.parent.parent / ".cache" / "videos"
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# Statuses from which an analysis can be resumed
+RESUMABLE_STATUSES = (TaskStatus.PARSED, TaskStatus.ANALYZING, TaskStatus.FAILED)
+
+
+def _not_cancelled(task_id: str) -> Dict[str, Any]:
+    """Filter for status updates: a cancelled task must stay CANCELLED."""
+    return {"task_id": task_id, "status": {"$ne": TaskStatus.CANCELLED}}
 
 
 async def parse_ads_task(task_id: str, url: str, max_results: int = 15, auto_analyze: bool = True):
@@ -25,111 +45,289 @@ async def parse_ads_task(task_id: str, url: str, max_results: int = 15, auto_ana
     Background task: Parse ads from Facebook Ads Library.
     """
     db = MongoDB.get_db()
+    timer = StageTimer()
+    cancel_event = threading.Event()
     
     try:
         # Update status
         await db.tasks.update_one(
-            {"task_id": task_id},
+            _not_cancelled(task_id),
             {"$set": {"status": TaskStatus.PARSING, "updated_at": datetime.utcnow()}}
         )
+        await TaskEvents.publish(task_id, "status", {"status": TaskStatus.PARSING})
         
         # Extract ads
         apify_service = ApifyService()
-        raw_ads = await apify_service.extract_ads_from_url(url, max_results, True)
+        with timer.stage("apify"):
+            raw_ads = await apify_service.extract_ads_from_url(url, max_results, True, cancel_event=cancel_event)
         
-        if not raw_ads:
-            await db.tasks.update_one(
-                {"task_id": task_id},
-                {"$set": {
-                    "status": TaskStatus.FAILED,
-                    "error": "No video ads found after filtering",
-                    "updated_at": datetime.utcnow()
-                }}
-            )
-            logger.warning(f"⚠️ Task {task_id}: No video ads found after filtering")
-            return
+        prefetch = await _finalize_parsed_ads(task_id, url, raw_ads, auto_analyze, timer, cancel_event)
+        await _await_prefetch(task_id, prefetch)
         
-        # Count video ads
-        video_count = 0
-        for ad in raw_ads:
-            snapshot = ad.get('snapshot', {})
-            if (snapshot.get('videos') and len(snapshot.get('videos', [])) > 0) or \
-               any(card.get('video_hd_url') or card.get('video_sd_url') 
-                   for card in snapshot.get('cards', [])):
-                video_count += 1
-        
-        logger.info(f"🎥 Found {video_count}/{len(raw_ads)} video ads after filtering")
-        
-        # Save to creatives file
-        page_name = raw_ads[0].get("page_name", "unknown") if raw_ads else "unknown"
-        page_id = raw_ads[0].get("page_id", "unknown") if raw_ads else "unknown"
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{page_name}_{page_id}_{timestamp}.json"
-        filepath = Path("creatives") / filename
-        filepath.parent.mkdir(exist_ok=True)
-        
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump({
-                "extraction_metadata": {
-                    "url": url,
-                    "extracted_at": datetime.now().isoformat(),
-                    "total_ads": len(raw_ads),
-                    "page_name": page_name,
-                    "page_id": page_id
-                },
-                "ads": raw_ads
-            }, f, indent=2, ensure_ascii=False)
-        
-        # Update task
-        await db.tasks.update_one(
-            {"task_id": task_id},
-            {"$set": {
-                "status": TaskStatus.PARSED,
-                "page_name": page_name,
-                "page_id": page_id,
-                "total_ads": len(raw_ads),
-                "creatives_file": str(filepath),
-                "updated_at": datetime.utcnow()
-            }}
+    except asyncio.CancelledError:
+        # Stop the Apify run / video prefetch still executing
+        cancel_event.set()
+        logger.info(f"🛑 Task {task_id}: parsing cancelled")
+        raise
+    except Exception as e:
+        if is_transient_error(e):
+            logger.warning(f"⚠️ Task {task_id}: parsing hit a transient error, leaving it to the job retry: {e}")
+            raise
+        await _fail_parse(task_id, e, timer)
+
+
+async def parse_ads_batch_task(tasks: List[Dict[str, str]], max_results: int = 15, auto_analyze: bool = True):
+    """
+    Background task: Parse several competitors with a single Apify actor run.
+    
+    `tasks` is a list of {"task_id", "url"}; the dataset is split back per URL
+    and each competitor's task is finalized on its own.
+    """
+    db = MongoDB.get_db()
+    timer = StageTimer()
+    cancel_event = threading.Event()
+    task_ids = [t["task_id"] for t in tasks]
+    
+    try:
+        await db.tasks.update_many(
+            {"task_id": {"$in": task_ids}, "status": {"$ne": TaskStatus.CANCELLED}},
+            {"$set": {"status": TaskStatus.PARSING, "updated_at": datetime.utcnow()}}
         )
+        for task_id in task_ids:
+            await TaskEvents.publish(task_id, "status", {"status": TaskStatus.PARSING})
         
-        logger.info(f"✅ Task {task_id}: Parsed {len(raw_ads)} ads")
+        # One actor run for all competitors
+        apify_service = ApifyService()
+        with timer.stage("apify"):
+            ads_by_url = await apify_service.extract_ads_from_urls(
+                [t["url"] for t in tasks], max_results, cancel_event=cancel_event
+            )
         
-        # Auto-trigger analysis if enabled
-        if auto_analyze and len(raw_ads) > 0:
-            logger.info(f"🚀 Auto-starting analysis for task {task_id}")
-            import asyncio
-            asyncio.create_task(analyze_creatives_task(task_id))
+    except asyncio.CancelledError:
+        cancel_event.set()
+        logger.info(f"🛑 Batch parse of {len(tasks)} competitors cancelled")
+        raise
+    except Exception as e:
+        if is_transient_error(e):
+            logger.warning(f"⚠️ Batch parse hit a transient error, leaving it to the job retry: {e}")
+            raise
+        for task_id in task_ids:
+            await _fail_parse(task_id, e, timer)
+        return
+    
+    prefetches = {}
+    try:
+        for t in tasks:
+            task_timer = StageTimer()
+            task_timer.stages.update(timer.stages)
+            try:
+                prefetches[t["task_id"]] = await _finalize_parsed_ads(
+                    t["task_id"], t["url"], ads_by_url.get(t["url"], []), auto_analyze, task_timer, cancel_event
+                )
+            except Exception as e:
+                await _fail_parse(t["task_id"], e, task_timer)
         
+        await asyncio.gather(*(_await_prefetch(task_id, prefetch) for task_id, prefetch in prefetches.items()))
+    except asyncio.CancelledError:
+        cancel_event.set()
+        for prefetch in prefetches.values():
+            if prefetch:
+                prefetch.cancel()
+        raise
+
+
+async def _fail_parse(task_id: str, error: Exception, timer: StageTimer):
+    """Mark a parse task FAILED."""
+    db = MongoDB.get_db()
+    logger.error(f"❌ Task {task_id} failed: {error}")
+    await db.tasks.update_one(
+        _not_cancelled(task_id),
+        {"$set": {
+            "status": TaskStatus.FAILED,
+            "error": str(error),
+            **timer.as_update(),
+            "updated_at": datetime.utcnow()
+        }}
+    )
+    await TaskEvents.publish(task_id, "status", {"status": TaskStatus.FAILED, "error": str(error)})
+
+
+async def _finalize_parsed_ads(
+    task_id: str,
+    url: str,
+    raw_ads: List[Dict[str, Any]],
+    auto_analyze: bool,
+    timer: StageTimer,
+    cancel_event: threading.Event | None = None
+) -> asyncio.Task | None:
+    """
+    Save a competitor's extracted ads, mark the task PARSED and queue its analysis.
+    
+    With auto_analyze, the videos of the ads selected for analysis start
+    prefetching right away, overlapping the file write and status updates.
+    Returns the running prefetch (to be awaited by the caller) or None.
+    """
+    prefetch = await _start_prefetch(task_id, raw_ads, cancel_event) if auto_analyze and raw_ads else None
+    try:
+        parsed = await _save_parsed_ads(task_id, url, raw_ads, timer)
+    except BaseException:
+        if prefetch:
+            prefetch.cancel()
+        raise
+    if not parsed:
+        if prefetch:
+            prefetch.cancel()
+        return None
+    
+    # Auto-trigger analysis if enabled
+    if auto_analyze:
+        logger.info(f"🚀 Auto-starting analysis for task {task_id}")
+        await JobQueue.enqueue(JobType.ANALYZE_CREATIVES, {"task_id": task_id})
+    else:
+        # Nothing more runs for this task: identical requests get a fresh parse
+        await MongoDB.get_db().tasks.update_one(
+            {"task_id": task_id},
+            {"$unset": {"inflight_key": ""}}
+        )
+    return prefetch
+
+
+async def _start_prefetch(
+    task_id: str,
+    raw_ads: List[Dict[str, Any]],
+    cancel_event: threading.Event | None
+) -> asyncio.Task | None:
+    """Start fetching the videos of the ads the analysis will select (PREFETCH_VIDEOS), unless the task was cancelled."""
+    if not get_bool_env("PREFETCH_VIDEOS", True):
+        return None
+    db = MongoDB.get_db()
+    task_doc = await db.tasks.find_one({"task_id": task_id}, {"analysis_budget": 1, "status": 1}) or {}
+    if task_doc.get("status") == TaskStatus.CANCELLED:
+        return None
+    budget = task_doc.get("analysis_budget") or get_int_env("DEFAULT_ANALYSIS_BUDGET", 10)
+    
+    video_ads = [ad for ad in raw_ads if _pick_video_url(ad)]
+    videos = [
+        (ad.get("ad_archive_id"), _pick_video_url(ad))
+        for ad in select_ads_for_analysis(video_ads, budget)
+    ]
+    if not videos:
+        return None
+    logger.info(f"📥 Task {task_id}: prefetching {len(videos)} videos")
+    return asyncio.create_task(prefetch_videos(task_id, videos, cancel_event))
+
+
+async def _await_prefetch(task_id: str, prefetch: asyncio.Task | None):
+    """Wait for a task's prefetch and record its duration; failures are left to the analysis."""
+    if prefetch is None:
+        return
+    try:
+        stats = await prefetch
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # The parse itself was cancelled
+        logger.info(f"🛑 Task {task_id}: video prefetch cancelled")
+        return
     except Exception as e:
-        logger.error(f"❌ Task {task_id} failed: {e}")
+        logger.warning(f"⚠️ Task {task_id}: video prefetch stopped: {e}")
+        return
+    db = MongoDB.get_db()
+    await db.tasks.update_one(
+        {"task_id": task_id},
+        {"$set": {"timings.stages.prefetch": stats["seconds"], "timings.bytes.prefetched_videos": stats["fetched"]}}
+    )
+
+
+async def _save_parsed_ads(
+    task_id: str,
+    url: str,
+    raw_ads: List[Dict[str, Any]],
+    timer: StageTimer
+) -> bool:
+    """Write the creatives file and mark the task PARSED (False if it failed or was cancelled)."""
+    db = MongoDB.get_db()
+    
+    if not raw_ads:
         await db.tasks.update_one(
-            {"task_id": task_id},
+            _not_cancelled(task_id),
             {"$set": {
                 "status": TaskStatus.FAILED,
-                "error": str(e),
+                "error": "No video ads found after filtering",
+                **timer.as_update(),
                 "updated_at": datetime.utcnow()
             }}
         )
-
-
-def _cache_video(url: str) -> str:
-    """Download and cache video."""
-    import hashlib
-    fname = hashlib.sha256(url.encode()).hexdigest()[:16] + ".mp4"
-    path = CACHE_DIR / fname
+        await TaskEvents.publish(task_id, "status", {"status": TaskStatus.FAILED, "error": "No video ads found after filtering"})
+        logger.warning(f"⚠️ Task {task_id}: No video ads found after filtering")
+        return False
+    
+    # Count video ads
+    video_count = 0
+    for ad in raw_ads:
+        snapshot = ad.get('snapshot', {})
+        if (snapshot.get('videos') and len(snapshot.get('videos', [])) > 0) or \
+           any(card.get('video_hd_url') or card.get('video_sd_url') 
+               for card in snapshot.get('cards', [])):
+            video_count += 1
+    
+    logger.info(f"🎥 Found {video_count}/{len(raw_ads)} video ads after filtering")
     
-    if path.exists():
-        return str(path)
+    # Save to creatives file
+    page_name = raw_ads[0].get("page_name", "unknown") if raw_ads else "unknown"
+    page_id = raw_ads[0].get("page_id", "unknown") if raw_ads else "unknown"
     
-    with httpx.stream("GET", url, timeout=30.0, follow_redirects=True) as r:
-        r.raise_for_status()
-        with open(path, "wb") as f:
-            for chunk in r.iter_bytes():
-                if chunk:
-                    f.write(chunk)
-    return str(path)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{page_name}_{page_id}_{timestamp}.json"
+    filepath = Path("creatives") / filename
+    filepath.parent.mkdir(exist_ok=True)
+    if filepath.exists():
+        # Same page parsed twice within a second (e.g. two URLs of one batch)
+        filepath = filepath.with_name(f"{page_name}_{page_id}_{timestamp}_{task_id[:8]}.json")
+    
+    # Written in the io pool so the video prefetch keeps running meanwhile
+    with timer.stage("save_creatives"):
+        await ExecutorPool.run("io", _write_creatives_file, filepath, {
+            "extraction_metadata": {
+                "url": url,
+                "extracted_at": datetime.now().isoformat(),
+                "total_ads": len(raw_ads),
+                "page_name": page_name,
+                "page_id": page_id
+            },
+            "ads": raw_ads
+        })
+    timer.add_bytes("creatives_file", filepath.stat().st_size)
+    
+    # Update task
+    parsed = await db.tasks.update_one(
+        _not_cancelled(task_id),
+        {"$set": {
+            "status": TaskStatus.PARSED,
+            "page_name": page_name,
+            "page_id": page_id,
+            "total_ads": len(raw_ads),
+            "creatives_file": str(filepath),
+            **timer.as_update(),
+            "updated_at": datetime.utcnow()
+        }}
+    )
+    if parsed.matched_count == 0:
+        logger.info(f"🛑 Task {task_id} was cancelled during parsing")
+        return False
+    await TaskEvents.publish(task_id, "status", {
+        "status": TaskStatus.PARSED,
+        "page_name": page_name,
+        "total_ads": len(raw_ads)
+    })
+    
+    logger.info(f"✅ Task {task_id}: Parsed {len(raw_ads)} ads")
+    return True
+
+
+def _write_creatives_file(filepath: Path, data: Dict[str, Any]):
+    """Write the extracted ads JSON. Blocking - run in the io pool."""
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
 
 
 def _pick_video_url(raw_item: Dict[str, Any]) -> str | None:
@@ -147,11 +345,355 @@ def _pick_video_url(raw_item: Dict[str, Any]) -> str | None:
     return None
 
 
-async def analyze_creatives_task(task_id: str):
+async def _analyze_single_creative(
+    idx: int,
+    total: int,
+    ad: Dict[str, Any],
+    download_sem: asyncio.Semaphore,
+    analysis_sem: asyncio.Semaphore,
+    clusters: CreativeClusters,
+    timings: Dict[str, Any] | None = None,
+    cancel_event: threading.Event | None = None,
+    task_id: str | None = None,
+    check_policy: bool = False
+) -> CreativeAnalysis | None:
+    """
+    Download and analyze one creative.
+    
+    Downloads and Gemini calls are bounded by separate semaphores, so while
+    one creative is being analyzed the next ones are already downloading.
+    Near-identical videos are clustered after download: only the first ad of
+    a cluster is analyzed and the others reuse its result.
+    With check_policy the ads-policy check runs alongside the analysis.
+    Per-stage seconds and byte counts are recorded into `timings`.
+    Returns None for non-video ads; raises on failure.
+    """
+    ad_id = ad.get('ad_archive_id', f'unknown_{idx}')
+    
+    video_url = _pick_video_url(ad)
+    if not video_url:
+        logger.info(f"⏭️ Skipping non-video ad {ad_id} (no video URL found)")
+        return None
+    
+    # Cache video (blocking operation - run in io pool)
+    with timed(timings, "download_queue"):
+        await download_sem.acquire()
+    try:
+        logger.info(f"⬇️ Downloading creative {idx}/{total}: {ad_id}")
+        cached_path, video_hash = await VideoCache.fetch(video_url, ad_id, timings, cancel_event, task_id=task_id)
+    finally:
+        download_sem.release()
+    
+    # Perceptual fingerprint (blocking - run in cpu pool); the content hash comes from the cache
+    with timed(timings, "fingerprint"):
+        fingerprint = await ExecutorPool.run("cpu", fingerprint_video, cached_path)
+    cluster, is_representative = await clusters.join(ad_id, video_hash, fingerprint)
+    
+    if not is_representative:
+        logger.info(f"🔗 Creative {ad_id} duplicates {cluster.representative}, waiting for its analysis")
+        with timed(timings, "duplicate_wait"):
+            result = await cluster.wait()
+        if result is not None:
+            analysis = _build_creative_analysis(ad, result, video_url, cached_path)
+            analysis.video_hash = video_hash
+            analysis.fingerprint = encode_fingerprint(fingerprint)
+            analysis.duplicate_of = cluster.representative
+            analysis.timings = timings
+            return analysis
+        # Representative failed - analyze this copy on its own
+        logger.info(f"↩️ Representative {cluster.representative} failed, analyzing {ad_id} itself")
+    
+    try:
+        result, from_cache = await _analyze_video(
+            idx, total, ad, cached_path, video_hash, analysis_sem, timings, cancel_event, check_policy
+        )
+    except BaseException:
+        if is_representative:
+            cluster.resolve(None)
+        raise
+    if is_representative:
+        cluster.resolve(result)
+    
+    analysis = _build_creative_analysis(ad, result, video_url, cached_path)
+    analysis.video_hash = video_hash
+    analysis.fingerprint = encode_fingerprint(fingerprint)
+    analysis.from_cache = from_cache
+    analysis.timings = timings
+    logger.info(f"✅ Successfully analyzed creative {ad_id}")
+    return analysis
+
+
+async def _analyze_video(
+    idx: int,
+    total: int,
+    ad: Dict[str, Any],
+    cached_path: str,
+    video_hash: str,
+    analysis_sem: asyncio.Semaphore,
+    timings: Dict[str, Any] | None = None,
+    cancel_event: threading.Event | None = None,
+    check_policy: bool = False
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Gemini analysis of a cached video, via the analysis cache. Returns (result, from_cache).
+    
+    With check_policy the ads-policy check runs concurrently over the same
+    uploaded file; its result (or {"error": ...}) is returned under
+    result["policy_check"].
+    """
+    ad_id = ad.get('ad_archive_id', f'unknown_{idx}')
+    
+    # Same creative + same video content + same model/prompt => reuse earlier analysis
+    model_name = resolve_model_name()
+    policy = None
+    with timed(timings, "cache_lookup"):
+        result = await AnalysisCache.get(ad_id, video_hash, model_name, PROMPT_VERSION)
+        if check_policy:
+            policy = await AnalysisCache.get(ad_id, video_hash, model_name, POLICY_PROMPT_VERSION)
+    need_analysis = result is None
+    need_policy = check_policy and policy is None
+    if not need_analysis:
+        logger.info(f"♻️ Reusing cached analysis for creative {idx}/{total}: {ad_id}")
+    
+    if need_analysis or need_policy:
+        # Reuse an earlier upload of this video; otherwise upload a smaller copy
+        # (the original stays cached for streaming). One upload serves both
+        # checks: the policy profile keeps on-screen text legible.
+        profile = "policy" if need_policy else "analysis"
+        video_file = await GeminiFiles.acquire(
+            video_hash,
+            profile,
+            lambda: upload_copy(cached_path, profile, timings),
+            timings,
+            cancel_event
+        )
+        
+        # Analyze with Gemini (async generate - bounded by the analysis semaphore)
+        with timed(timings, "analysis_queue"):
+            await analysis_sem.acquire()
+        try:
+            logger.info(f"Analyzing creative {idx}/{total}: {ad_id}" + (" (+ policy check)" if need_policy else ""))
+            calls = []
+            if need_analysis:
+                calls.append(analyze_video_file(
+                    cached_path,
+                    {
+                        "page_name": ad.get("page_name"),
+                        "ad_archive_id": ad.get("ad_archive_id"),
+                        "publisher_platform": ad.get("publisher_platform"),
+                        "product_context": ad.get("title") or (ad.get("body", {}) or {}).get("text"),
+                    },
+                    model_name,
+                    timings,
+                    cancel_event,
+                    video_file
+                ))
+            if need_policy:
+                calls.append(_check_creative_policy(ad_id, cached_path, video_file, model_name, timings))
+            outputs = await asyncio.gather(*calls)
+        finally:
+            analysis_sem.release()
+        
+        # Don't cache unparseable responses or failed checks
+        if need_analysis:
+            result = outputs[0]
+            if "error" not in result:
+                await AnalysisCache.put(ad_id, video_hash, model_name, PROMPT_VERSION, result)
+        if need_policy:
+            policy = outputs[-1]
+            if "error" not in policy:
+                await AnalysisCache.put(ad_id, video_hash, model_name, POLICY_PROMPT_VERSION, policy)
+    
+    if check_policy:
+        result = {**result, "policy_check": policy}
+    return result, not need_analysis
+
+
+async def _check_creative_policy(
+    ad_id: str,
+    cached_path: str,
+    video_file,
+    model_name: str,
+    timings: Dict[str, Any] | None = None
+) -> Dict[str, Any]:
+    """
+    Ads-policy check of an uploaded creative. A failed check doesn't fail the
+    creative: it is returned as {"error": ...}. Generation seconds are
+    recorded as policy_generate.
+    """
+    policy_timings: Dict[str, Any] = {}
+    try:
+        return await check_video_policy(
+            cached_path, "facebook", model_name, None, policy_timings, None, video_file
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Policy check of creative {ad_id} failed: {e}")
+        return {"error": str(e)}
+    finally:
+        if timings is not None and "generate" in policy_timings:
+            timings["policy_generate"] = policy_timings["generate"]
+
+
+def _build_creative_analysis(
+    ad: Dict[str, Any],
+    result: Dict[str, Any],
+    video_url: str,
+    cached_path: str
+) -> CreativeAnalysis:
+    """Map Gemini video analysis output to a CreativeAnalysis."""
+    # Map new Performance Marketing schema to CreativeAnalysis fields
+    # New prompt returns: visual_style, messaging, emotional_journey, key_insights
+    visuals = result.get("visual_style")
+    
+    # CTA normalization
+    cta_raw = result.get("cta")
+    if isinstance(cta_raw, dict):
+        cta_list = [cta_raw]
+    elif isinstance(cta_raw, list):
+        cta_list = cta_raw
+    else:
+        cta_list = []
+    
+    # Messaging: extract pains and value_props from new structure
+    messaging = result.get("messaging", {}) or {}
+    pains_list = messaging.get("pains") or []
+    pains_norm = [{"text": p.get("text") if isinstance(p, dict) else p} if not isinstance(p, dict) or "text" in p else p for p in pains_list]
+    vprops_list = messaging.get("value_props") or []
+    vprops_norm = [{"text": v.get("text") if isinstance(v, dict) else v} if not isinstance(v, dict) or "text" in v else v for v in vprops_list]
+    
+    # Storyboard: map emotional_journey to storyboard format
+    storyboard = result.get("emotional_journey") or result.get("storyboard", [])
+    
+    # Scores remain the same
+    scores = result.get("scores")
+    
+    # Summary: use key_insights for richer summary, fallback to summary field
+    key_insights_data = result.get("key_insights") or {}
+    if key_insights_data:
+        # Create enriched summary from key_insights
+        main_strat = key_insights_data.get("main_strategy", "")
+        insights_list = key_insights_data.get("key_insights", [])
+        hypotheses = key_insights_data.get("hypotheses_to_test", [])
+        
+        summary_parts = []
+        if main_strat:
+            summary_parts.append(f"**Стратегія:** {main_strat}")
+        if insights_list:
+            summary_parts.append("**Інсайти:** " + "; ".join(insights_list[:2]))
+        if hypotheses:
+            summary_parts.append("**Гіпотези:** " + "; ".join(hypotheses[:2]))
+        
+        summary = " | ".join(summary_parts) if summary_parts else result.get("summary")
+    else:
+        summary = result.get("summary")
+    
+    # Combined mode: ads-policy verdict over the same upload
+    policy = result.get("policy_check")
+    compliance = (policy or {}).get("compliance_summary") or {}
+    
+    return CreativeAnalysis(
+        creative_id=ad.get("ad_archive_id"),
+        ad_archive_id=ad.get("ad_archive_id"),
+        page_name=ad.get("page_name"),
+        hook=result.get("hook"),
+        visual_style=visuals,
+        on_screen_text=result.get("on_screen_text", []),
+        product_showcase=result.get("product_showcase"),
+        cta=cta_list,
+        pains=pains_norm,
+        value_props=vprops_norm,
+        audio=result.get("audio"),
+        storyboard=storyboard,
+        scores=scores,
+        summary=summary,
+        video_url=video_url,
+        cached_video_path=cached_path,
+        policy_check=policy,
+        policy_risk_level=compliance.get("risk_level"),
+        will_pass_moderation=compliance.get("will_pass_moderation"),
+        analyzed_at=datetime.utcnow()
+    )
+
+
+async def _record_creative_progress(
+    task_id: str,
+    ad_archive_id: str | None,
+    counter: str,
+    analysis: CreativeAnalysis | None = None
+):
+    """Persist one finished creative right away so clients can show partial results."""
+    db = MongoDB.get_db()
+    update: Dict[str, Any] = {
+        "$inc": {f"progress.{counter}": 1},
+        "$set": {"updated_at": datetime.utcnow()}
+    }
+    if analysis:
+        update["$push"] = {"creatives_analyzed": analysis.model_dump()}
+    task_doc = await db.tasks.find_one_and_update(
+        {"task_id": task_id},
+        update,
+        projection={"progress": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    event_data: Dict[str, Any] = {
+        "ad_archive_id": ad_archive_id,
+        "outcome": counter,
+        "progress": (task_doc or {}).get("progress")
+    }
+    if analysis:
+        event_data["analysis"] = analysis.model_dump(mode="json")
+    await TaskEvents.publish(task_id, "creative", event_data)
+
+
+async def _seed_clusters(
+    clusters: CreativeClusters,
+    completed: List[CreativeAnalysis],
+    check_policy: bool = False
+):
+    """
+    Register already analyzed creatives so remaining duplicates reuse them on resume.
+    In combined mode the seeded result carries the representative's policy check too.
+    """
+    model_name = resolve_model_name()
+    duplicates: Dict[str, List[str]] = {}
+    for analysis in completed:
+        if analysis.duplicate_of:
+            duplicates.setdefault(analysis.duplicate_of, []).append(analysis.ad_archive_id)
+    
+    for analysis in completed:
+        if analysis.duplicate_of or not analysis.video_hash:
+            continue
+        result = await AnalysisCache.get(analysis.ad_archive_id, analysis.video_hash, model_name, PROMPT_VERSION)
+        if result is not None and check_policy:
+            policy = analysis.policy_check or await AnalysisCache.get(
+                analysis.ad_archive_id, analysis.video_hash, model_name, POLICY_PROMPT_VERSION
+            )
+            if policy is None:
+                continue  # Duplicates run their own check rather than go without one
+            result = {**result, "policy_check": policy}
+        if result is not None:
+            await clusters.seed(
+                analysis.ad_archive_id,
+                analysis.video_hash,
+                decode_fingerprint(analysis.fingerprint),
+                result,
+                duplicates.get(analysis.ad_archive_id)
+            )
+
+
+async def analyze_creatives_task(task_id: str, resume: bool = False):
     """
     Background task: Analyze creatives with video analysis + LLM aggregation.
+    
+    Every finished creative is checkpointed on the task. With resume=True an
+    interrupted (ANALYZING) or FAILED analysis continues with the same ad
+    selection and only the creatives that have no analysis yet are processed.
     """
     db = MongoDB.get_db()
+    timer = StageTimer()
+    started = time.perf_counter()
+    cancel_event = threading.Event()
     
     try:
         # Get task
@@ -159,14 +701,19 @@ async def analyze_creatives_task(task_id: str):
         if not task_doc:
             raise ValueError(f"Task {task_id} not found")
         
-        if task_doc["status"] != TaskStatus.PARSED:
-            raise ValueError(f"Task must be in PARSED status, got {task_doc['status']}")
+        allowed = RESUMABLE_STATUSES if resume else (TaskStatus.PARSED,)
+        if task_doc["status"] not in allowed:
+            raise ValueError(f"Task must be in {'/'.join(allowed)} status, got {task_doc['status']}")
         
         # Update status
         await db.tasks.update_one(
-            {"task_id": task_id},
-            {"$set": {"status": TaskStatus.ANALYZING, "updated_at": datetime.utcnow()}}
+            _not_cancelled(task_id),
+            {
+                "$set": {"status": TaskStatus.ANALYZING, "updated_at": datetime.utcnow()},
+                "$unset": {"error": ""}
+            }
         )
+        await TaskEvents.publish(task_id, "status", {"status": TaskStatus.ANALYZING})
         
         # Load creatives
         creatives_file = task_doc.get("creatives_file")
@@ -176,134 +723,120 @@ async def analyze_creatives_task(task_id: str):
         with open(creatives_file, "r", encoding="utf-8") as f:
             data = json.load(f)
         
-        raw_ads = data.get("ads", [])[:10]  # Limit to 10 for now
+        all_ads = data.get("ads", [])
         
-        # Analyze each creative
-        analyses: List[CreativeAnalysis] = []
-        failed_count = 0
-        skipped_non_video = 0
-        loop = asyncio.get_event_loop()
+        completed: List[CreativeAnalysis] = []
+        if resume and task_doc.get("analysis_selection"):
+            # Continue with the original selection, skipping checkpointed creatives
+            ads_by_id = {ad.get("ad_archive_id"): ad for ad in all_ads}
+            raw_ads = [
+                ads_by_id[item["ad_archive_id"]]
+                for item in task_doc["analysis_selection"]
+                if item.get("ad_archive_id") in ads_by_id
+            ]
+            completed = [CreativeAnalysis(**doc) for doc in task_doc.get("creatives_analyzed") or []]
+            done_ids = {a.ad_archive_id for a in completed}
+            pending_ads = [ad for ad in raw_ads if ad.get("ad_archive_id") not in done_ids]
+            logger.info(
+                f"⏯️ Resuming task {task_id}: {len(completed)}/{len(raw_ads)} creatives already analyzed, "
+                f"{len(pending_ads)} remaining"
+            )
+            
+            await db.tasks.update_one(
+                _not_cancelled(task_id),
+                {"$set": {
+                    "progress": TaskProgress(total=len(raw_ads), done=len(completed)).model_dump(),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+        else:
+            # Spend the analysis budget on the highest-priority video ads
+            video_ads = [ad for ad in all_ads if _pick_video_url(ad)]
+            budget = task_doc.get("analysis_budget") or get_int_env("DEFAULT_ANALYSIS_BUDGET", 10)
+            raw_ads = select_ads_for_analysis(video_ads, budget)
+            pending_ads = raw_ads
+            logger.info(
+                f"🎯 Selected {len(raw_ads)}/{len(video_ads)} video ads for analysis "
+                f"(budget={budget}, non-video={len(all_ads) - len(video_ads)})"
+            )
+            
+            # Reset partial results and progress counters
+            await db.tasks.update_one(
+                _not_cancelled(task_id),
+                {"$set": {
+                    "analysis_selection": [
+                        {"ad_archive_id": ad.get("ad_archive_id"), "rank_score": round(score_ad(ad), 4)}
+                        for ad in raw_ads
+                    ],
+                    "creatives_analyzed": [],
+                    "progress": TaskProgress(total=len(raw_ads)).model_dump(),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+        
+        # Combined mode: policy check over the same upload as the analysis
+        check_policy = bool(task_doc.get("check_policy"))
         
-        for idx, ad in enumerate(raw_ads, 1):
-            ad_id = ad.get('ad_archive_id', f'unknown_{idx}')
+        # Analyze creatives as an overlapping download -> analysis pipeline
+        download_sem = asyncio.Semaphore(max(1, get_int_env("DOWNLOAD_CONCURRENCY", 4)))
+        analysis_sem = asyncio.Semaphore(max(1, get_int_env("ANALYSIS_CONCURRENCY", 3)))
+        clusters = CreativeClusters()
+        await _seed_clusters(clusters, completed, check_policy)
+        
+        failed_timings: List[Dict[str, Any]] = []
+        
+        async def _run_creative(idx: int, ad: Dict[str, Any]) -> CreativeAnalysis | None:
+            creative_timings: Dict[str, Any] = {}
             try:
-                logger.info(f"Analyzing creative {idx}/{len(raw_ads)}: {ad_id}")
-                
-                video_url = _pick_video_url(ad)
-                if not video_url:
-                    logger.info(f"⏭️ Skipping non-video ad {ad_id} (no video URL found)")
-                    skipped_non_video += 1
-                    continue
-                
-                # Cache video (blocking operation - run in executor)
-                from concurrent.futures import ThreadPoolExecutor
-                with ThreadPoolExecutor() as executor:
-                    cached_path = await loop.run_in_executor(
-                        executor,
-                        _cache_video,
-                        video_url
-                    )
-                
-                # Analyze with Gemini (blocking operation - run in executor)
-                with ThreadPoolExecutor() as executor:
-                    result = await loop.run_in_executor(
-                        executor,
-                        analyze_video_file,
-                        cached_path,
-                        {
-                            "page_name": ad.get("page_name"),
-                            "ad_archive_id": ad.get("ad_archive_id"),
-                            "publisher_platform": ad.get("publisher_platform"),
-                            "product_context": ad.get("title") or (ad.get("body", {}) or {}).get("text"),
-                        }
-                    )
-                
-                # Map new Performance Marketing schema to CreativeAnalysis fields
-                # New prompt returns: visual_style, messaging, emotional_journey, key_insights
-                visuals = result.get("visual_style")
-                
-                # CTA normalization
-                cta_raw = result.get("cta")
-                if isinstance(cta_raw, dict):
-                    cta_list = [cta_raw]
-                elif isinstance(cta_raw, list):
-                    cta_list = cta_raw
-                else:
-                    cta_list = []
-                
-                # Messaging: extract pains and value_props from new structure
-                messaging = result.get("messaging", {}) or {}
-                pains_list = messaging.get("pains") or []
-                pains_norm = [{"text": p.get("text") if isinstance(p, dict) else p} if not isinstance(p, dict) or "text" in p else p for p in pains_list]
-                vprops_list = messaging.get("value_props") or []
-                vprops_norm = [{"text": v.get("text") if isinstance(v, dict) else v} if not isinstance(v, dict) or "text" in v else v for v in vprops_list]
-                
-                # Storyboard: map emotional_journey to storyboard format
-                storyboard = result.get("emotional_journey") or result.get("storyboard", [])
-                
-                # Scores remain the same
-                scores = result.get("scores")
-                
-                # Summary: use key_insights for richer summary, fallback to summary field
-                key_insights_data = result.get("key_insights") or {}
-                if key_insights_data:
-                    # Create enriched summary from key_insights
-                    main_strat = key_insights_data.get("main_strategy", "")
-                    insights_list = key_insights_data.get("key_insights", [])
-                    hypotheses = key_insights_data.get("hypotheses_to_test", [])
-                    
-                    summary_parts = []
-                    if main_strat:
-                        summary_parts.append(f"**Стратегія:** {main_strat}")
-                    if insights_list:
-                        summary_parts.append("**Інсайти:** " + "; ".join(insights_list[:2]))
-                    if hypotheses:
-                        summary_parts.append("**Гіпотези:** " + "; ".join(hypotheses[:2]))
-                    
-                    summary = " | ".join(summary_parts) if summary_parts else result.get("summary")
-                else:
-                    summary = result.get("summary")
-                
-                # Create analysis object
-                analysis = CreativeAnalysis(
-                    creative_id=ad.get("ad_archive_id"),
-                    ad_archive_id=ad.get("ad_archive_id"),
-                    page_name=ad.get("page_name"),
-                    hook=result.get("hook"),
-                    visual_style=visuals,
-                    on_screen_text=result.get("on_screen_text", []),
-                    product_showcase=result.get("product_showcase"),
-                    cta=cta_list,
-                    pains=pains_norm,
-                    value_props=vprops_norm,
-                    audio=result.get("audio"),
-                    storyboard=storyboard,
-                    scores=scores,
-                    summary=summary,
-                    video_url=video_url,
-                    cached_video_path=cached_path,
-                    analyzed_at=datetime.utcnow()
+                analysis = await _analyze_single_creative(
+                    idx, len(raw_ads), ad, download_sem, analysis_sem, clusters, creative_timings, cancel_event, task_id,
+                    check_policy
                 )
-                
-                analyses.append(analysis)
-                logger.info(f"✅ Successfully analyzed creative {ad_id}")
-                
             except Exception as e:
-                logger.error(f"❌ Error analyzing {ad_id}: {e}")
-                failed_count += 1
-                # Continue with other creatives
-                continue
+                logger.error(f"❌ Error analyzing {ad.get('ad_archive_id', f'unknown_{idx}')}: {e}")
+                failed_timings.append({"ad_archive_id": ad.get("ad_archive_id"), "failed": True, **creative_timings})
+                await _record_creative_progress(task_id, ad.get("ad_archive_id"), "failed")
+                raise
+            await _record_creative_progress(task_id, ad.get("ad_archive_id"), "done" if analysis else "skipped", analysis)
+            return analysis
         
-        logger.info(f"📊 Analysis summary: {len(analyses)} successful, {failed_count} failed, {skipped_non_video} skipped (non-video)")
+        positions = {ad.get("ad_archive_id"): idx for idx, ad in enumerate(raw_ads, 1)}
+        with timer.stage("creatives"):
+            outcomes = await asyncio.gather(
+                *[_run_creative(positions[ad.get("ad_archive_id")], ad) for ad in pending_ads],
+                return_exceptions=True
+            )
+        
+        analyses: List[CreativeAnalysis] = list(completed)
+        failures: List[BaseException] = []
+        skipped_non_video = 0
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                failures.append(outcome)
+            elif outcome is None:
+                skipped_non_video += 1
+            else:
+                analyses.append(outcome)
+        analyses.sort(key=lambda a: positions.get(a.ad_archive_id, len(positions)))
+        
+        duplicates = sum(1 for a in analyses if a.duplicate_of)
+        logger.info(
+            f"📊 Analysis summary: {len(analyses)} successful ({duplicates} duplicates), "
+            f"{len(failures)} failed, {skipped_non_video} skipped (non-video)"
+        )
         
         if not analyses:
-            raise ValueError(f"No creatives could be analyzed. All {len(raw_ads)} attempts failed.")
+            error = ValueError(f"No creatives could be analyzed. All {len(raw_ads)} attempts failed.")
+            if failures and all(is_transient_error(f) for f in failures):
+                raise error from failures[0]  # E.g. Gemini rate limits: worth another attempt
+            raise error
         
         # Aggregate analysis with LLM (with fallback)
         aggregated = None
         aggregation_error = None
         try:
-            aggregated = await _aggregate_analysis(analyses)
+            with timer.stage("aggregation"):
+                aggregated = await _aggregate_analysis(analyses)
             logger.info(f"✅ Aggregation completed successfully")
         except Exception as e:
             logger.warning(f"⚠️ Aggregation failed, but saving individual analyses: {e}")
@@ -324,20 +857,35 @@ async def analyze_creatives_task(task_id: str):
             creatives_data = [a.model_dump() for a in analyses]
             aggregated_data = aggregated.model_dump() if aggregated else None
             
-            html_report = generate_html_report(
-                task_data=task_data,
-                creatives=creatives_data,
-                aggregated=aggregated_data,
-                aggregation_error=aggregation_error
-            )
+            with timer.stage("html_report"):
+                html_report = await ExecutorPool.run(
+                    "cpu",
+                    generate_html_report,
+                    task_data=task_data,
+                    creatives=creatives_data,
+                    aggregated=aggregated_data,
+                    aggregation_error=aggregation_error
+                )
             logger.info(f"✅ Generated HTML report")
         except Exception as e:
             logger.error(f"❌ Failed to generate HTML report: {e}")
         
+        # Per-creative timings (checkpointed ones included) and byte totals
+        creative_timings = [
+            {"ad_archive_id": a.ad_archive_id, **a.timings} for a in analyses if a.timings
+        ] + failed_timings
+        for entry in creative_timings:
+            timer.add_bytes("download", entry.get("download_bytes", 0))
+            timer.add_bytes("upload", entry.get("upload_bytes", 0))
+        timer.stages["analysis_total"] = round(time.perf_counter() - started, 3)
+        
         # Update task with results (even if aggregation failed)
         update_data = {
             "status": TaskStatus.COMPLETED,
             "creatives_analyzed": [a.model_dump() for a in analyses],
+            "clusters": clusters.duplicate_groups(),
+            **timer.as_update(),
+            "timings.creatives": creative_timings,
             "updated_at": datetime.utcnow()
         }
         
@@ -350,35 +898,74 @@ async def analyze_creatives_task(task_id: str):
         if html_report:
             update_data["html_report"] = html_report
         
-        await db.tasks.update_one(
-            {"task_id": task_id},
+        completed_update = await db.tasks.update_one(
+            _not_cancelled(task_id),
             {"$set": update_data}
         )
+        if completed_update.matched_count == 0:
+            logger.info(f"🛑 Task {task_id} was cancelled, discarding analysis results")
+            return
+        await TaskEvents.publish(task_id, "status", {
+            "status": TaskStatus.COMPLETED,
+            "creatives_analyzed": len(analyses),
+            "has_html_report": bool(html_report)
+        })
         
         logger.info(f"✅ Task {task_id}: Analysis completed, {len(analyses)} creatives")
         
+    except asyncio.CancelledError:
+        # Stop downloads and Gemini upload/poll loops still running in the pools
+        cancel_event.set()
+        logger.info(f"🛑 Task {task_id}: analysis cancelled")
+        raise
     except Exception as e:
+        if is_transient_error(e):
+            # Stays ANALYZING; the retried job resumes from the checkpoints
+            logger.warning(f"⚠️ Task {task_id}: analysis hit a transient error, leaving it to the job retry: {e}")
+            raise
         logger.error(f"❌ Task {task_id} analysis failed: {e}")
+        timer.stages["analysis_total"] = round(time.perf_counter() - started, 3)
         await db.tasks.update_one(
-            {"task_id": task_id},
+            _not_cancelled(task_id),
             {"$set": {
                 "status": TaskStatus.FAILED,
                 "error": str(e),
+                **timer.as_update(),
                 "updated_at": datetime.utcnow()
             }}
         )
+        await TaskEvents.publish(task_id, "status", {"status": TaskStatus.FAILED, "error": str(e)})
+    finally:
+        # The task's videos become evictable again
+        try:
+            await VideoCache.unpin_task(task_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Task {task_id}: failed to unpin cached videos: {e}")
 
 
 async def _aggregate_analysis(analyses: List[CreativeAnalysis]) -> AggregatedAnalysis:
-    """Aggregate analysis across all creatives using LLM."""
+    """
+    Aggregate analysis across all creatives using LLM.
+    
+    Duplicates (same video under another ad_archive_id) are folded into their
+    representative with a variant count, so one heavily re-posted video does
+    not read as several independent creatives.
+    """
     from src.analysis.gemini_client import generate_analysis
-    from concurrent.futures import ThreadPoolExecutor
     
-    # Build summary of all analyses
+    variants: Dict[str, int] = {}
+    for a in analyses:
+        if a.duplicate_of:
+            variants[a.duplicate_of] = variants.get(a.duplicate_of, 0) + 1
+    
+    # Build summary of all unique analyses
     summaries = []
     for a in analyses:
+        if a.duplicate_of:
+            continue
         summaries.append({
             "id": a.creative_id,
+            "ad_variants": 1 + variants.get(a.ad_archive_id, 0),
             "hook": a.hook,
             "visual_style": a.visual_style,
             "pains": a.pains,
@@ -390,19 +977,16 @@ async def _aggregate_analysis(analyses: List[CreativeAnalysis]) -> AggregatedAna
     
     prompt_context = json.dumps(summaries, ensure_ascii=False)
     
-    # LLM aggregation prompt (blocking operation - run in executor)
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as executor:
-        result = await loop.run_in_executor(
-            executor,
-            generate_analysis,
-            {
-                "task": "aggregate_competitor_analysis",
-                "creatives_count": len(analyses),
-                "analyses_summary": prompt_context
-            },
-            None  # schema parameter
-        )
+    # LLM aggregation prompt
+    result = await generate_analysis(
+        {
+            "task": "aggregate_competitor_analysis",
+            "creatives_count": len(summaries),
+            "ads_count": len(analyses),
+            "analyses_summary": prompt_context
+        },
+        None  # schema parameter
+    )
     
     # Validate and clean result
     def _safe_get_list(key, default=None):
@@ -0,0 +1,483 @@
+"""
+Content-addressed cache of downloaded creative videos.
+
+Facebook CDN URLs carry expiring signature parameters (oh=, oe=, _nc_*),
+so the same creative gets a new URL on every re-scrape. Videos are
+therefore stored once per content hash (`<sha256>.mp4`) and looked up
+through an alias index (video_aliases) keyed by ad_archive_id plus the
+URL path, which stays stable across re-signing. The blob name doubles as
+the video content hash used by the analysis cache and /video/stream.
+
+The store, proxies included, is size-capped with LRU eviction
+(video_blobs.last_accessed_at); blobs in use by in-progress tasks are
+pinned and never evicted.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows: single-flight stays per process
+    fcntl = None
+
+from src.db import MongoDB, TaskStatus
+from src.services.executor_pool import ExecutorPool
+from src.services.video_downloader import VideoDownloader
+from src.utils.cancellation import OperationCancelled, raise_if_cancelled
+from src.utils.env import get_int_env
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent.parent / ".cache" / "videos"
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+LOCK_DIRNAME = ".locks"
+PROXY_DIRNAME = "proxies"  # Downscaled analysis/policy copies (see video_proxy)
+LOCK_POLL_SECONDS = 0.2
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3  # 10 GiB
+ORPHAN_GRACE_SECONDS = 3600  # Leave files this young alone (downloads in progress)
+ACTIVE_TASK_STATUSES = [TaskStatus.PENDING, TaskStatus.PARSING, TaskStatus.PARSED, TaskStatus.ANALYZING]
+UNPINNED = {"$or": [{"pinned_by": {"$exists": False}}, {"pinned_by": {"$size": 0}}]}
+
+
+def video_alias_key(url: str, ad_archive_id: Optional[str] = None) -> str:
+    """Stable identity of a video URL: ad_archive_id + URL path (host and query ignored)."""
+    path = urlparse(url).path
+    return hashlib.sha256(f"{ad_archive_id or ''}|{path}".encode()).hexdigest()
+
+
+def blob_path(content_hash: str) -> Path:
+    """Location of the stored video with the given content hash."""
+    return CACHE_DIR / f"{content_hash}.mp4"
+
+
+@asynccontextmanager
+async def _alias_file_lock(alias: Optional[str], cancel_event: threading.Event | None = None) -> AsyncIterator[Optional[IO[str]]]:
+    """
+    Exclusive cross-process lock for one alias (flock on .locks/<alias>.lock),
+    polled without blocking the event loop. The lock file holds the content
+    hash of the last finished download, so a process that waited for another
+    one can reuse its result. Yields None where flock is unavailable.
+    """
+    if alias is None or fcntl is None:
+        yield None
+        return
+
+    lock_dir = CACHE_DIR / LOCK_DIRNAME
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    with open(lock_dir / f"{alias}.lock", "a+") as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                raise_if_cancelled(cancel_event, "Waiting for video download")
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+        try:
+            yield lock_file
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _fsync_dir(path: Path):
+    """Persist a rename in the directory (best effort; not supported everywhere)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _commit_blob(tmp_path: Path, content_hash: str):
+    """Move a finished download into place. Blocking - run in the io pool."""
+    final_path = blob_path(content_hash)
+    if final_path.exists():
+        tmp_path.unlink()  # Same video already stored under another URL
+    else:
+        os.replace(tmp_path, final_path)
+        _fsync_dir(CACHE_DIR)
+
+
+async def download_to_blob(
+    url: str,
+    timings: Dict[str, Any] | None = None,
+    cancel_event: threading.Event | None = None,
+    alias: Optional[str] = None
+) -> Tuple[str, int]:
+    """
+    Download a video into the cache through the shared downloader.
+    Returns (content_hash, size).
+
+    The video is written to a private temp file, fsynced and renamed into
+    place, so readers never see a partial blob. With an alias, concurrent
+    downloads of it from other processes are serialized and reused.
+    """
+    async with _alias_file_lock(alias, cancel_event) as lock_file:
+        if lock_file is not None:
+            lock_file.seek(0)
+            known_hash = lock_file.read().strip()
+            if known_hash and blob_path(known_hash).exists():
+                # Another process downloaded it while we waited
+                if timings is not None:
+                    timings["download_cached"] = True
+                return known_hash, blob_path(known_hash).stat().st_size
+
+        tmp_path = CACHE_DIR / f".{uuid.uuid4().hex}.part"
+        try:
+            content_hash, size = await VideoDownloader.download(url, tmp_path, cancel_event, timings)
+            await ExecutorPool.run("io", _commit_blob, tmp_path, content_hash)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)  # Don't leave a truncated file in the cache
+            raise
+
+        if lock_file is not None:
+            lock_file.seek(0)
+            lock_file.truncate()
+            lock_file.write(content_hash)
+            lock_file.flush()
+
+    if timings is not None:
+        timings["download_bytes"] = size
+    return content_hash, size
+
+
+def _scan_cache_dir(known_hashes: Set[str], grace_seconds: float) -> Tuple[int, int]:
+    """
+    Delete files that no blob document refers to (legacy url-hash names,
+    abandoned .part downloads, proxies of evicted blobs) and stale alias lock
+    files. Files younger than grace_seconds are kept, since a finished
+    download is renamed before its blob is recorded.
+    Blocking - run in the io pool. Returns (files_removed, bytes_freed).
+    """
+    removed, freed = 0, 0
+    cutoff = time.time() - grace_seconds
+    proxy_dir = CACHE_DIR / PROXY_DIRNAME
+    candidates = [(path, path.stem) for path in CACHE_DIR.iterdir()]
+    if proxy_dir.is_dir():
+        # Proxies (and their no-gain markers) are named <content_hash>_<profile>.*
+        candidates += [(path, path.stem.split("_")[0]) for path in proxy_dir.iterdir()]
+    for path, owner in candidates:
+        if not path.is_file() or owner in known_hashes:
+            continue
+        try:
+            stat = path.stat()
+            if stat.st_mtime > cutoff:
+                continue
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += stat.st_size
+
+    # Stale per-alias lock files (skipped while someone holds the lock)
+    lock_dir = CACHE_DIR / LOCK_DIRNAME
+    if fcntl is not None and lock_dir.is_dir():
+        for path in lock_dir.iterdir():
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                with open(path, "a") as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    path.unlink()
+            except (BlockingIOError, FileNotFoundError):
+                continue
+    return removed, freed
+
+
+def _proxy_bytes() -> Dict[str, int]:
+    """Bytes of the stored proxies per source content hash. Blocking - run in the io pool."""
+    sizes: Dict[str, int] = {}
+    proxy_dir = CACHE_DIR / PROXY_DIRNAME
+    if not proxy_dir.is_dir():
+        return sizes
+    for path in proxy_dir.iterdir():
+        if path.name.startswith("."):  # Transcode in progress
+            continue
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        owner = path.stem.split("_")[0]
+        sizes[owner] = sizes.get(owner, 0) + size
+    return sizes
+
+
+def _unlink_blobs(content_hashes: List[str]):
+    """Remove stored blobs and their analysis proxies from disk. Blocking - run in the io pool."""
+    proxy_dir = CACHE_DIR / PROXY_DIRNAME
+    for content_hash in content_hashes:
+        blob_path(content_hash).unlink(missing_ok=True)
+        for proxy in proxy_dir.glob(f"{content_hash}_*"):
+            proxy.unlink(missing_ok=True)
+
+
+class VideoCache:
+    """
+    Alias index over the content-addressed video store.
+
+    The store (blobs plus their proxies) is capped at VIDEO_CACHE_MAX_BYTES
+    (0 disables the cap) and evicts least recently used blobs first, each
+    together with its proxies. Blobs fetched for a task are
+    pinned until that task is no longer in progress.
+    """
+
+    _inflight: Dict[str, "asyncio.Future[str]"] = {}  # alias -> download in progress (this process)
+
+    @classmethod
+    async def lookup(cls, url: str, ad_archive_id: Optional[str] = None) -> Optional[str]:
+        """Content hash of an already stored video for this URL alias, or None."""
+        db = MongoDB.get_db()
+        doc = await db.video_aliases.find_one({"alias": video_alias_key(url, ad_archive_id)})
+        if doc and blob_path(doc["content_hash"]).exists():
+            return doc["content_hash"]
+        return None
+
+    @classmethod
+    async def fetch(
+        cls,
+        url: str,
+        ad_archive_id: Optional[str] = None,
+        timings: Dict[str, Any] | None = None,
+        cancel_event: threading.Event | None = None,
+        task_id: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Return (path, content_hash) of the video, downloading it on a miss.
+        With task_id the blob is pinned against eviction for that task.
+        Raises OperationCancelled if cancel_event is set during the download.
+        """
+        db = MongoDB.get_db()
+        alias = video_alias_key(url, ad_archive_id)
+        now = datetime.utcnow()
+        pin = {"$addToSet": {"pinned_by": task_id}} if task_id else {}
+
+        content_hash = await cls.lookup(url, ad_archive_id)
+        if content_hash:
+            touched = await db.video_blobs.update_one(
+                {"content_hash": content_hash},
+                {"$set": {"last_accessed_at": now}, "$inc": {"hits": 1}, **pin}
+            )
+            # matched_count == 0: evicted between lookup and pin -> download again
+            if touched.matched_count:
+                if timings is not None:
+                    timings["download_cached"] = True
+                await cls._count(hits=1)
+                return str(blob_path(content_hash)), content_hash
+
+        await cls._count(misses=1)
+        content_hash, downloaded = await cls._download_single_flight(alias, url, ad_archive_id, timings, cancel_event)
+        if pin:
+            await db.video_blobs.update_one({"content_hash": content_hash}, pin)
+
+        if downloaded:
+            try:
+                await cls.evict()
+            except Exception as e:
+                logger.warning(f"⚠️ Video cache eviction failed: {e}")
+        return str(blob_path(content_hash)), content_hash
+
+    @classmethod
+    async def _download_single_flight(
+        cls,
+        alias: str,
+        url: str,
+        ad_archive_id: Optional[str],
+        timings: Dict[str, Any] | None,
+        cancel_event: threading.Event | None
+    ) -> Tuple[str, bool]:
+        """
+        Download and record the video once per alias: concurrent callers in this
+        process await the same download (other processes wait on the alias file
+        lock). Returns (content_hash, downloaded_by_this_call).
+        """
+        while True:
+            pending = cls._inflight.get(alias)
+            if pending is None:
+                break
+            try:
+                content_hash = await asyncio.shield(pending)
+                if timings is not None:
+                    timings["download_shared"] = True
+                return content_hash, False
+            except OperationCancelled:
+                # The downloading caller was cancelled; retry unless we were too
+                raise_if_cancelled(cancel_event, "Video download")
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # Mark exception as retrieved
+        cls._inflight[alias] = future
+        try:
+            content_hash, size = await download_to_blob(url, timings, cancel_event, alias)
+            await cls._record(alias, url, ad_archive_id, content_hash, size)
+            future.set_result(content_hash)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            cls._inflight.pop(alias, None)
+            if not future.done():  # Leader task cancelled: waiters retry the download
+                future.set_exception(OperationCancelled("Video download cancelled"))
+        return content_hash, True
+
+    @classmethod
+    async def _record(cls, alias: str, url: str, ad_archive_id: Optional[str], content_hash: str, size: int):
+        """Register a stored blob and point the alias at it."""
+        db = MongoDB.get_db()
+        now = datetime.utcnow()
+        await db.video_blobs.update_one(
+            {"content_hash": content_hash},
+            {
+                "$set": {"size": size, "last_accessed_at": now},
+                "$setOnInsert": {"created_at": now, "hits": 0}
+            },
+            upsert=True
+        )
+        await db.video_aliases.update_one(
+            {"alias": alias},
+            {
+                "$set": {
+                    "content_hash": content_hash,
+                    "ad_archive_id": ad_archive_id,
+                    "url_path": urlparse(url).path,
+                    "updated_at": now
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+        logger.info(f"💾 Cached video {content_hash[:12]} ({size} bytes) for ad {ad_archive_id}")
+
+    @classmethod
+    async def unpin_task(cls, task_id: str):
+        """Release every blob pinned by the task."""
+        db = MongoDB.get_db()
+        await db.video_blobs.update_many({"pinned_by": task_id}, {"$pull": {"pinned_by": task_id}})
+
+    @classmethod
+    async def evict(cls, max_bytes: Optional[int] = None) -> Dict[str, int]:
+        """
+        Delete least recently used, unpinned blobs and their proxies until the
+        store fits max_bytes (default VIDEO_CACHE_MAX_BYTES).
+        Returns {"evicted", "freed_bytes"}.
+        """
+        if max_bytes is None:
+            max_bytes = get_int_env("VIDEO_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+        if max_bytes <= 0:
+            return {"evicted": 0, "freed_bytes": 0}
+
+        proxy_sizes = await ExecutorPool.run("io", _proxy_bytes)
+        total = await cls._total_bytes(proxy_sizes)
+        if total <= max_bytes:
+            return {"evicted": 0, "freed_bytes": 0}
+
+        db = MongoDB.get_db()
+        await cls._release_stale_pins()
+
+        evicted: List[str] = []
+        freed = 0
+        cursor = db.video_blobs.find(UNPINNED, {"content_hash": 1, "size": 1}).sort("last_accessed_at", 1)
+        async for doc in cursor:
+            if total - freed <= max_bytes:
+                break
+            # Re-check the pin atomically: a task may have picked the blob up meanwhile
+            deleted = await db.video_blobs.find_one_and_delete({"content_hash": doc["content_hash"], **UNPINNED})
+            if deleted is None:
+                continue
+            evicted.append(doc["content_hash"])
+            freed += doc.get("size", 0) + proxy_sizes.get(doc["content_hash"], 0)
+
+        if evicted:
+            await db.video_aliases.delete_many({"content_hash": {"$in": evicted}})
+            await ExecutorPool.run("io", _unlink_blobs, evicted)
+            await cls._count(evictions=len(evicted), evicted_bytes=freed)
+            logger.info(f"🧹 Evicted {len(evicted)} cached video(s), freed {freed} bytes")
+
+        return {"evicted": len(evicted), "freed_bytes": freed}
+
+    @classmethod
+    async def cleanup_orphans(cls, grace_seconds: float = ORPHAN_GRACE_SECONDS) -> Dict[str, int]:
+        """
+        Reconcile disk and index: delete files without a blob record and blob
+        records (with their aliases) whose file is gone.
+        """
+        db = MongoDB.get_db()
+        known = set(await db.video_blobs.distinct("content_hash"))
+        files_removed, bytes_freed = await ExecutorPool.run("io", _scan_cache_dir, known, grace_seconds)
+
+        missing = [content_hash for content_hash in known if not blob_path(content_hash).exists()]
+        if missing:
+            await db.video_blobs.delete_many({"content_hash": {"$in": missing}})
+            await db.video_aliases.delete_many({"content_hash": {"$in": missing}})
+
+        if files_removed or missing:
+            logger.info(f"🧹 Video cache cleanup: {files_removed} orphan file(s), {len(missing)} missing blob(s)")
+        return {"files_removed": files_removed, "bytes_freed": bytes_freed, "records_removed": len(missing)}
+
+    @classmethod
+    async def stats(cls) -> Dict[str, Any]:
+        """Size, entry counts and hit/miss/eviction counters."""
+        db = MongoDB.get_db()
+        rows = await db.video_blobs.aggregate([
+            {"$group": {
+                "_id": None,
+                "blobs": {"$sum": 1},
+                "total_bytes": {"$sum": "$size"},
+                "pinned": {"$sum": {"$cond": [{"$gt": [{"$size": {"$ifNull": ["$pinned_by", []]}}, 0]}, 1, 0]}}
+            }}
+        ]).to_list(length=1)
+        row = rows[0] if rows else {}
+        proxy_bytes = sum((await ExecutorPool.run("io", _proxy_bytes)).values())
+        counters = await db.video_cache_stats.find_one({"_id": "counters"}) or {}
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "max_bytes": get_int_env("VIDEO_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+            "total_bytes": row.get("total_bytes", 0) + proxy_bytes,
+            "proxy_bytes": proxy_bytes,
+            "blobs": row.get("blobs", 0),
+            "pinned_blobs": row.get("pinned", 0),
+            "aliases": await db.video_aliases.count_documents({}),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "evictions": counters.get("evictions", 0),
+            "evicted_bytes": counters.get("evicted_bytes", 0)
+        }
+
+    @classmethod
+    async def _total_bytes(cls, proxy_sizes: Dict[str, int]) -> int:
+        """Size of all stored blobs plus their proxies (see _proxy_bytes)."""
+        db = MongoDB.get_db()
+        rows = await db.video_blobs.aggregate([
+            {"$group": {"_id": None, "total": {"$sum": "$size"}}}
+        ]).to_list(length=1)
+        return (rows[0]["total"] if rows else 0) + sum(proxy_sizes.values())
+
+    @classmethod
+    async def _release_stale_pins(cls):
+        """Drop pins of tasks that are no longer in progress (finished, failed or crashed)."""
+        db = MongoDB.get_db()
+        active = await db.tasks.distinct("task_id", {"status": {"$in": ACTIVE_TASK_STATUSES}})
+        await db.video_blobs.update_many(
+            {"pinned_by": {"$exists": True, "$ne": []}},
+            {"$pull": {"pinned_by": {"$nin": active}}}
+        )
+
+    @classmethod
+    async def _count(cls, **counters: int):
+        db = MongoDB.get_db()
+        await db.video_cache_stats.update_one({"_id": "counters"}, {"$inc": counters}, upsert=True)
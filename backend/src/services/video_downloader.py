@@ -0,0 +1,193 @@
+"""
+Shared asyncio downloader for creative videos.
+
+One process-wide httpx.AsyncClient keeps connections to the Facebook CDN
+pooled (HTTP/2 when the optional `h2` package is installed), a semaphore
+per host bounds concurrent transfers, and interrupted transfers are
+retried with a Range request that resumes the partial file. Throughput
+counters are exposed for the admin endpoints.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiofiles
+import httpx
+
+from src.services.executor_pool import ExecutorPool
+from src.utils.cancellation import raise_if_cancelled
+from src.utils.env import get_bool_env, get_float_env, get_int_env
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 0.5
+
+
+def _fsync_file(path: Path):
+    """Flush a finished download to disk. Blocking - run in the io pool."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class VideoDownloader:
+    """Process-wide pooled HTTP client for video downloads and proxying."""
+    _client: Optional[httpx.AsyncClient] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _http2 = False
+    _host_limits: Dict[str, asyncio.Semaphore] = {}
+    _in_flight: Dict[str, int] = {}
+    _metrics: Dict[str, float] = {
+        "downloads": 0,
+        "failures": 0,
+        "retries": 0,
+        "resumed": 0,
+        "bytes": 0,
+        "seconds": 0.0,
+    }
+    _lock = threading.Lock()
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        """Shared AsyncClient of the running event loop (created lazily)."""
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._loop is not loop or cls._client.is_closed:
+            http2 = get_bool_env("DOWNLOAD_HTTP2", True) and importlib.util.find_spec("h2") is not None
+            cls._client = httpx.AsyncClient(
+                http2=http2,
+                follow_redirects=True,
+                timeout=httpx.Timeout(get_float_env("DOWNLOAD_READ_TIMEOUT", 30.0), connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=get_int_env("DOWNLOAD_MAX_CONNECTIONS", 32),
+                    max_keepalive_connections=get_int_env("DOWNLOAD_MAX_CONNECTIONS", 32)
+                )
+            )
+            cls._loop = loop
+            cls._http2 = http2
+            cls._host_limits = {}
+            logger.info(f"✅ Video downloader client started (http2={http2})")
+        return cls._client
+
+    @classmethod
+    async def close(cls):
+        """Close the shared client (on shutdown)."""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+            cls._loop = None
+            cls._host_limits = {}
+
+    @classmethod
+    def _host_limit(cls, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        semaphore = cls._host_limits.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, get_int_env("DOWNLOAD_PER_HOST_LIMIT", 6)))
+            cls._host_limits[host] = semaphore
+        return semaphore
+
+    @classmethod
+    async def download(
+        cls,
+        url: str,
+        path: Path,
+        cancel_event: threading.Event | None = None,
+        timings: Dict[str, Any] | None = None
+    ) -> Tuple[str, int]:
+        """
+        Download url into path (fsynced), hashing while writing.
+        Returns (content_sha256, size). Transport errors and 5xx responses are
+        retried up to DOWNLOAD_RETRIES times, resuming from the bytes on disk.
+        """
+        client = cls.client()
+        retries = max(0, get_int_env("DOWNLOAD_RETRIES", 3))
+        host = urlparse(url).netloc
+        digest = hashlib.sha256()
+        size = 0
+
+        async with cls._host_limit(url):
+            started = time.perf_counter()
+            cls._in_flight[host] = cls._in_flight.get(host, 0) + 1
+            try:
+                for attempt in range(retries + 1):
+                    headers = {"Range": f"bytes={size}-"} if size else {}
+                    try:
+                        async with client.stream("GET", url, headers=headers) as response:
+                            response.raise_for_status()
+                            if size and response.status_code == 206:
+                                cls._count(resumed=1)
+                                mode = "ab"
+                            else:
+                                # Fresh download (or the server ignored the Range header)
+                                digest, size, mode = hashlib.sha256(), 0, "wb"
+                            async with aiofiles.open(path, mode) as f:
+                                async for chunk in response.aiter_bytes():
+                                    raise_if_cancelled(cancel_event, "Video download")
+                                    await f.write(chunk)
+                                    digest.update(chunk)
+                                    size += len(chunk)
+                        break
+                    except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                        retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500
+                        if not retryable or attempt == retries:
+                            cls._count(failures=1)
+                            raise
+                        cls._count(retries=1)
+                        delay = RETRY_BASE_SECONDS * 2 ** attempt
+                        logger.warning(f"⚠️ Download interrupted at {size} bytes ({e}), retrying in {delay}s")
+                        await asyncio.sleep(delay)
+            finally:
+                cls._in_flight[host] -= 1
+
+        await ExecutorPool.run("io", _fsync_file, path)
+
+        elapsed = time.perf_counter() - started
+        cls._count(downloads=1, bytes=size, seconds=elapsed)
+        if timings is not None:
+            timings["download"] = round(timings.get("download", 0.0) + elapsed, 3)
+        return digest.hexdigest(), size
+
+    @classmethod
+    async def open_stream(cls, url: str, headers: Dict[str, str] | None = None) -> httpx.Response:
+        """
+        Start a streamed GET through the shared client (for proxying).
+        The caller must close the returned response.
+        """
+        client = cls.client()
+        request = client.build_request("GET", url, headers=headers or {})
+        response = await client.send(request, stream=True)
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            await response.aclose()
+            raise
+        return response
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Download counters and average throughput."""
+        with cls._lock:
+            metrics = dict(cls._metrics)
+        seconds = metrics.pop("seconds")
+        return {
+            **{key: int(value) for key, value in metrics.items()},
+            "seconds": round(seconds, 3),
+            "throughput_mbps": round(metrics["bytes"] * 8 / seconds / 1e6, 2) if seconds else None,
+            "http2": cls._http2,
+            "in_flight": {host: count for host, count in cls._in_flight.items() if count}
+        }
+
+    @classmethod
+    def _count(cls, **counters: float):
+        with cls._lock:
+            for key, value in counters.items():
+                cls._metrics[key] += value
@@ -0,0 +1,167 @@
+"""
+Perceptual fingerprints of creative videos and duplicate clustering.
+
+Competitors run the same video under many ad_archive_ids, often re-encoded
+or with different copy. A fingerprint is a list of 64-bit difference hashes
+(dHash) of evenly spaced frames; two videos whose frame hashes are within a
+small Hamming distance are treated as the same creative, so only one of them
+is sent to Gemini.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.env import get_int_env
+from src.utils.ffmpeg import ffmpeg_available, sample_gray_frames
+
+logger = logging.getLogger(__name__)
+
+HASH_WIDTH = 9  # dHash compares horizontally adjacent pixels -> 8 bits per row
+HASH_HEIGHT = 8
+DEFAULT_FRAME_COUNT = 8
+DEFAULT_MAX_DISTANCE = 10  # mean Hamming distance per 64-bit frame hash
+
+
+def dhash(frame: bytes, width: int = HASH_WIDTH, height: int = HASH_HEIGHT) -> int:
+    """64-bit difference hash of a width x height grayscale frame."""
+    value = 0
+    for y in range(height):
+        row = frame[y * width:(y + 1) * width]
+        for x in range(width - 1):
+            value = (value << 1) | (1 if row[x] > row[x + 1] else 0)
+    return value
+
+
+def fingerprint_video(video_path: str, frame_count: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Perceptual fingerprint of a video (blocking: runs ffmpeg).
+
+    Returns None when ffmpeg is unavailable, the video cannot be decoded or
+    it yields fewer than the requested frames: hashes are compared by index,
+    so they must come from the same relative positions in both videos.
+    """
+    if not ffmpeg_available():
+        return None
+    count = frame_count or max(2, get_int_env("FINGERPRINT_FRAMES", DEFAULT_FRAME_COUNT))
+    frames = sample_gray_frames(video_path, count, HASH_WIDTH, HASH_HEIGHT)
+    if len(frames) < count:
+        return None
+    return [dhash(frame) for frame in frames]
+
+
+def fingerprint_distance(a: List[int], b: List[int]) -> float:
+    """
+    Mean Hamming distance between aligned frame hashes. Fingerprints of
+    different lengths were sampled at different positions and never match.
+    """
+    if not a or len(a) != len(b):
+        return float("inf")
+    pairs = list(zip(a, b))
+    return sum(bin(x ^ y).count("1") for x, y in pairs) / len(pairs)
+
+
+def encode_fingerprint(fingerprint: Optional[List[int]]) -> Optional[List[str]]:
+    """Hex-encode frame hashes for storage (64-bit unsigned values overflow BSON int64)."""
+    return [format(h, "016x") for h in fingerprint] if fingerprint else None
+
+
+def decode_fingerprint(encoded: Optional[List[str]]) -> Optional[List[int]]:
+    """Inverse of encode_fingerprint."""
+    try:
+        return [int(h, 16) for h in encoded] if encoded else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CreativeCluster:
+    """A group of ads running the same video; the first member is analyzed for all."""
+
+    def __init__(self, representative: str, video_hash: Optional[str], fingerprint: Optional[List[int]]):
+        self.representative = representative
+        self.video_hashes = {video_hash} if video_hash else set()
+        self.fingerprint = fingerprint
+        self.members: List[str] = [representative]
+        self._result: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def resolve(self, result: Optional[Dict[str, Any]]):
+        """Publish the representative's analysis (None if it failed)."""
+        if not self._result.done():
+            self._result.set_result(result)
+
+    async def wait(self) -> Optional[Dict[str, Any]]:
+        """Wait for the representative's analysis result."""
+        return await asyncio.shield(self._result)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "representative": self.representative,
+            "members": list(self.members),
+            "size": len(self.members)
+        }
+
+
+class CreativeClusters:
+    """Per-task registry that assigns each downloaded creative to a duplicate cluster."""
+
+    def __init__(self, max_distance: Optional[float] = None):
+        self.max_distance = (
+            max_distance if max_distance is not None
+            else get_int_env("FINGERPRINT_MAX_DISTANCE", DEFAULT_MAX_DISTANCE)
+        )
+        self._clusters: List[CreativeCluster] = []
+        self._lock = asyncio.Lock()
+
+    async def join(
+        self,
+        ad_id: str,
+        video_hash: Optional[str],
+        fingerprint: Optional[List[int]]
+    ) -> Tuple[CreativeCluster, bool]:
+        """
+        Add an ad to a matching cluster, or start a new one.
+
+        Identical content always matches; otherwise the perceptual fingerprint
+        must be within max_distance. Returns (cluster, is_representative).
+        """
+        async with self._lock:
+            for cluster in self._clusters:
+                if self._matches(cluster, video_hash, fingerprint):
+                    cluster.members.append(ad_id)
+                    if video_hash:
+                        cluster.video_hashes.add(video_hash)
+                    return cluster, False
+
+            cluster = CreativeCluster(ad_id, video_hash, fingerprint)
+            self._clusters.append(cluster)
+            return cluster, True
+
+    async def seed(
+        self,
+        ad_id: str,
+        video_hash: Optional[str],
+        fingerprint: Optional[List[int]],
+        result: Dict[str, Any],
+        duplicates: Optional[List[str]] = None
+    ):
+        """Register an already analyzed creative (e.g. when resuming) as a resolved cluster."""
+        async with self._lock:
+            cluster = CreativeCluster(ad_id, video_hash, fingerprint)
+            cluster.members.extend(duplicates or [])
+            cluster.resolve(result)
+            self._clusters.append(cluster)
+
+    def _matches(
+        self,
+        cluster: CreativeCluster,
+        video_hash: Optional[str],
+        fingerprint: Optional[List[int]]
+    ) -> bool:
+        if video_hash and video_hash in cluster.video_hashes:
+            return True
+        if fingerprint and cluster.fingerprint:
+            return fingerprint_distance(fingerprint, cluster.fingerprint) <= self.max_distance
+        return False
+
+    def duplicate_groups(self) -> List[Dict[str, Any]]:
+        """Clusters with more than one member, for recording on the task."""
+        return [c.to_dict() for c in self._clusters if len(c.members) > 1]
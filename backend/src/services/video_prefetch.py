@@ -0,0 +1,71 @@
+"""
+Prefetch of creative videos while a task is still being parsed.
+
+Facebook CDN links from Apify expire, and downloading only once the
+analysis starts adds the whole transfer time to its latency. Parsing
+therefore starts fetching the videos of the ads selected for analysis
+into the video cache right after the Apify results arrive; the analysis
+later finds them cached (or joins the download still in flight).
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.services.video_cache import VideoCache
+from src.utils.cancellation import OperationCancelled
+from src.utils.env import get_int_env
+
+logger = logging.getLogger(__name__)
+
+
+async def prefetch_videos(
+    task_id: str,
+    videos: List[Tuple[str, str]],
+    cancel_event: Optional[threading.Event] = None
+) -> Dict[str, float]:
+    """
+    Fetch (ad_archive_id, video_url) pairs into the video cache, pinned for the task.
+
+    A producer feeds a bounded queue (PREFETCH_QUEUE_SIZE) consumed by
+    PREFETCH_CONCURRENCY workers. Failed downloads are only logged: the
+    analysis retries them itself. Returns {"fetched", "failed", "seconds"}.
+    """
+    concurrency = max(1, get_int_env("PREFETCH_CONCURRENCY", get_int_env("DOWNLOAD_CONCURRENCY", 4)))
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, get_int_env("PREFETCH_QUEUE_SIZE", 8)))
+    stats = {"fetched": 0, "failed": 0}
+    started = time.perf_counter()
+
+    async def produce():
+        for item in videos:
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(None)  # One stop marker per worker
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            ad_id, url = item
+            try:
+                await VideoCache.fetch(url, ad_id, cancel_event=cancel_event, task_id=task_id)
+                stats["fetched"] += 1
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                stats["failed"] += 1
+                logger.warning(f"⚠️ Task {task_id}: prefetch of {ad_id} failed: {e}")
+
+    workers = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # On cancellation, stop the producer blocked on a full queue and the other consumers
+        for worker in workers:
+            worker.cancel()
+
+    result = {**stats, "seconds": round(time.perf_counter() - started, 3)}
+    logger.info(f"📥 Task {task_id}: prefetched {stats['fetched']}/{len(videos)} videos in {result['seconds']}s")
+    return result
@@ -0,0 +1,95 @@
+"""
+Downscaled copies of creative videos for Gemini uploads.
+
+Gemini samples videos at a low frame rate, so uploading the original HD
+file mostly costs upload bytes and server-side processing time. When
+ffmpeg is available the pipeline uploads a smaller "analysis proxy"
+instead; the original stays in the video cache for streaming. Policy
+checks use a sharper profile so on-screen text and claims stay legible.
+Any failure falls back to the original file.
+"""
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.services.executor_pool import ExecutorPool
+from src.services.video_cache import CACHE_DIR, PROXY_DIRNAME
+from src.utils.env import get_bool_env
+from src.utils.ffmpeg import ffmpeg_available, transcode
+from src.utils.timings import timed
+
+logger = logging.getLogger(__name__)
+
+# short_side: cap of the shorter frame side in pixels (never upscaled)
+PROXY_PROFILES: Dict[str, Dict[str, Any]] = {
+    "analysis": {"short_side": 480, "fps": 12, "crf": 30, "audio_bitrate": "64k"},
+    "policy": {"short_side": 720, "fps": 15, "crf": 28, "audio_bitrate": "64k"},
+}
+
+
+def proxy_path(video_path: str, profile: str) -> Path:
+    """Cache location of a video's proxy (<content_hash>_<profile>.mp4 for cached blobs)."""
+    return CACHE_DIR / PROXY_DIRNAME / f"{Path(video_path).stem}_{profile}.mp4"
+
+
+def no_gain_marker(target: Path) -> Path:
+    """
+    Marker recording that a proxy would not be smaller than its original
+    (<content_hash>_<profile>.nogain next to the proxy, evicted with the blob).
+    """
+    return target.with_suffix(".nogain")
+
+
+def make_proxy(video_path: str, profile: str, dst_path: Optional[str] = None) -> str:
+    """
+    Path of a downscaled copy of video_path for the given profile, creating it if needed.
+
+    Returns video_path itself when proxies are disabled (VIDEO_PROXY_ENABLED),
+    ffmpeg is missing, transcoding fails or the proxy would not be smaller.
+    For cached videos the "not smaller" outcome is remembered, so ffmpeg
+    doesn't run again on every upload of the same video.
+    Blocking - run in the cpu pool.
+    """
+    if not get_bool_env("VIDEO_PROXY_ENABLED", True) or not ffmpeg_available():
+        return video_path
+
+    target = Path(dst_path) if dst_path else proxy_path(video_path, profile)
+    if target.exists():
+        return str(target)
+    if dst_path is None and no_gain_marker(target).exists():
+        return video_path
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{uuid.uuid4().hex}.part.mp4")
+    try:
+        if not transcode(video_path, str(tmp_path), **PROXY_PROFILES[profile]):
+            return video_path
+        original_size = os.path.getsize(video_path)
+        proxy_size = tmp_path.stat().st_size
+        if proxy_size >= original_size:
+            # Already small (e.g. SD source): keep uploading the original
+            if dst_path is None:
+                no_gain_marker(target).touch()
+            return video_path
+        os.replace(tmp_path, target)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    logger.info(
+        f"🎞️ {profile} proxy of {Path(video_path).name}: "
+        f"{original_size} -> {proxy_size} bytes ({proxy_size / original_size:.0%})"
+    )
+    return str(target)
+
+
+async def upload_copy(
+    video_path: str,
+    profile: str,
+    timings: Dict[str, Any] | None = None,
+    dst_path: Optional[str] = None
+) -> str:
+    """Proxy (or original) to upload to Gemini, transcoded in the cpu pool."""
+    with timed(timings, "transcode"):
+        return await ExecutorPool.run("cpu", make_proxy, video_path, profile, dst_path)
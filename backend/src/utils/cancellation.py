@@ -0,0 +1,30 @@
+"""
+Cooperative cancellation for blocking work running in executor threads.
+
+Cancelling an asyncio task does not stop a thread that is already running a
+blocking call. Background tasks therefore hand a threading.Event to blocking
+helpers (downloads, Apify runs, Gemini upload/poll loops) and set it when
+they are cancelled; the helpers check it between steps and stop early.
+"""
+import threading
+from typing import Optional
+
+
+class OperationCancelled(Exception):
+    """Raised by blocking helpers when their cancel event is set."""
+
+
+def raise_if_cancelled(cancel_event: Optional[threading.Event], what: str = "Operation"):
+    """Raise OperationCancelled if cancellation was requested."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise OperationCancelled(f"{what} cancelled")
+
+
+def sleep_or_cancel(cancel_event: Optional[threading.Event], seconds: float, what: str = "Operation"):
+    """time.sleep() that wakes up (and raises) as soon as cancellation is requested."""
+    if cancel_event is None:
+        import time
+        time.sleep(seconds)
+        return
+    if cancel_event.wait(seconds):
+        raise OperationCancelled(f"{what} cancelled")
@@ -0,0 +1,34 @@
+"""
+Helpers for reading typed settings from environment variables.
+"""
+import os
+
+
+def get_int_env(name: str, default: int) -> int:
+    """Read an integer from the environment, falling back to default on missing/invalid values."""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def get_float_env(name: str, default: float) -> float:
+    """Read a float from the environment, falling back to default on missing/invalid values."""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def get_bool_env(name: str, default: bool) -> bool:
+    """Read a boolean flag (1/true/yes/on) from the environment."""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -2,6 +2,7 @@
 HTML templates for error and status pages.
 """
 from datetime import datetime
+from typing import Any, Dict, Optional
 
 
 def not_found_page(task_id: str, task_type: str = "task") -> str:
@@ -99,7 +100,7 @@ def not_found_page(task_id: str, task_type: str = "task") -> str:
 """
 
 
-def still_processing_page(task_id: str, status: str, task_type: str = "task") -> str:
+def still_processing_page(task_id: str, status: str, task_type: str = "task", progress: Optional[Dict[str, Any]] = None) -> str:
     """
     Generate HTML page for task still processing with auto-refresh.
 
@@ -107,6 +108,7 @@ def still_processing_page(task_id: str, status: str, task_type: str = "task") ->
         task_id: The task ID
         status: Current task status
         task_type: Type of task (task, policy)
+        progress: Optional per-creative progress counters (done/failed/skipped/total)
     """
     status_messages = {
         "PENDING": "Задача в черзі на виконання",
@@ -117,6 +119,12 @@ def still_processing_page(task_id: str, status: str, task_type: str = "task") ->
     }
 
     message = status_messages.get(status, "Обробка...")
+    events_url = f"/api/v1/policy/task/{task_id}/events" if task_type == "policy" else f"/api/v1/task/{task_id}/events"
+
+    progress_html = ""
+    if progress and progress.get("total"):
+        finished = progress.get("done", 0) + progress.get("failed", 0) + progress.get("skipped", 0)
+        progress_html = f'<p style="margin-top: 10px;">Проаналізовано креативів: <strong>{finished}/{progress["total"]}</strong></p>'
 
     return f"""
 <!DOCTYPE html>
@@ -124,7 +132,6 @@ def still_processing_page(task_id: str, status: str, task_type: str = "task") ->
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta http-equiv="refresh" content="5">
     <title>Processing...</title>
     <style>
         * {{ margin: 0; padding: 0; box-sizing: border-box; }}
@@ -216,12 +223,29 @@ def still_processing_page(task_id: str, status: str, task_type: str = "task") ->
         <div class="task-id">{task_id}</div>
         <div class="info">
             <p>Статус: <strong>{status}</strong></p>
-            <p style="margin-top: 10px;">Сторінка автоматично оновиться через 5 секунд...</p>
+            {progress_html}
+            <p style="margin-top: 10px;">Сторінка автоматично оновиться, щойно обробка завершиться...</p>
         </div>
         <div class="progress-bar">
             <div class="progress-fill"></div>
         </div>
     </div>
+    <script>
+        // Reload when the task finishes (pushed via SSE); fall back to periodic reload
+        (function () {{
+            var fallback = function () {{ setTimeout(function () {{ location.reload(); }}, 5000); }};
+            if (!window.EventSource) {{ fallback(); return; }}
+            var source = new EventSource("{events_url}");
+            source.addEventListener("status", function (e) {{
+                var data = JSON.parse(e.data);
+                if (["COMPLETED", "FAILED", "CANCELLED"].indexOf(data.status) !== -1) {{
+                    source.close();
+                    location.reload();
+                }}
+            }});
+            source.onerror = function () {{ source.close(); fallback(); }};
+        }})();
+    </script>
 </body>
 </html>
 """
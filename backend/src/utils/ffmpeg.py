@@ -0,0 +1,117 @@
+"""
+Thin wrappers around the ffmpeg/ffprobe command-line tools.
+
+ffmpeg is an optional system dependency: callers must check
+ffmpeg_available() and degrade gracefully when it is missing.
+"""
+import json
+import logging
+import shutil
+import subprocess
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_TIMEOUT_SECONDS = 60
+TRANSCODE_TIMEOUT_SECONDS = 300
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_available() -> bool:
+    """True if both ffmpeg and ffprobe are on PATH."""
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def probe_duration(video_path: str) -> Optional[float]:
+    """Duration of a video in seconds, or None if it cannot be determined."""
+    try:
+        proc = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "json",
+                video_path
+            ],
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT_SECONDS,
+            check=True
+        )
+        duration = float(json.loads(proc.stdout)["format"]["duration"])
+        return duration if duration > 0 else None
+    except (subprocess.SubprocessError, OSError, KeyError, ValueError) as e:
+        logger.warning(f"⚠️ ffprobe failed for {video_path}: {e}")
+        return None
+
+
+def sample_gray_frames(video_path: str, count: int, width: int, height: int) -> List[bytes]:
+    """
+    Sample `count` evenly spaced frames, downscaled to width x height 8-bit grayscale.
+
+    Returns the raw frames (width * height bytes each); fewer frames than
+    requested for very short videos, an empty list on failure.
+    """
+    duration = probe_duration(video_path)
+    if not duration:
+        return []
+
+    fps = count / duration
+    try:
+        proc = subprocess.run(
+            [
+                "ffmpeg", "-v", "error",
+                "-i", video_path,
+                "-vf", f"fps={fps:.6f},scale={width}:{height}:flags=area",
+                "-frames:v", str(count),
+                "-pix_fmt", "gray",
+                "-f", "rawvideo",
+                "-"
+            ],
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT_SECONDS,
+            check=True
+        )
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"⚠️ ffmpeg frame sampling failed for {video_path}: {e}")
+        return []
+
+    frame_size = width * height
+    data = proc.stdout
+    return [data[i:i + frame_size] for i in range(0, len(data) - frame_size + 1, frame_size)]
+
+
+def transcode(
+    src_path: str,
+    dst_path: str,
+    short_side: int,
+    fps: int,
+    crf: int,
+    audio_bitrate: str,
+    timeout: float = TRANSCODE_TIMEOUT_SECONDS
+) -> bool:
+    """
+    Re-encode a video to H.264/AAC with its shorter side capped at short_side
+    (never upscaled), the given frame rate and quality. Returns False on failure.
+    """
+    scale = (
+        f"scale='if(gt(iw,ih),-2,min(iw,{short_side}))':'if(gt(iw,ih),min(ih,{short_side}),-2)'"
+    )
+    try:
+        subprocess.run(
+            [
+                "ffmpeg", "-v", "error", "-y",
+                "-i", src_path,
+                "-vf", f"{scale},fps={fps}",
+                "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf),
+                "-c:a", "aac", "-b:a", audio_bitrate, "-ac", "1",
+                "-movflags", "+faststart",
+                dst_path
+            ],
+            capture_output=True,
+            timeout=timeout,
+            check=True
+        )
+        return True
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"⚠️ ffmpeg transcode failed for {src_path}: {e}")
+        return False
@@ -1,5 +1,6 @@
 import os
 import json
+import hashlib
 from datetime import datetime
 from typing import List, Optional
 from pathlib import Path
@@ -9,6 +10,15 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class FileManager:
     """Manage file operations for saving ad data."""
 
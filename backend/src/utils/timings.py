@@ -0,0 +1,111 @@
+"""
+Wall-clock timing helpers for pipeline instrumentation.
+
+Timings are plain dicts of stage name -> seconds (plus byte counters), so
+blocking helpers running in executor threads can fill them in without
+depending on any service code.
+"""
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, Any]], stage: str):
+    """Add the wall-clock duration of the block to timings[stage] (no-op if timings is None)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + time.perf_counter() - start, 3)
+
+
+class StageTimer:
+    """Per-task stage durations and byte counts, persisted as the task's timings sub-document."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.bytes: Dict[str, int] = {}
+
+    def stage(self, name: str):
+        """Context manager timing one stage."""
+        return timed(self.stages, name)
+
+    def add_bytes(self, name: str, count: int):
+        self.bytes[name] = self.bytes.get(name, 0) + int(count or 0)
+
+    def as_update(self, prefix: str = "timings") -> Dict[str, Any]:
+        """
+        Dotted $set fields, so stages recorded by different tasks don't overwrite each other.
+        Boolean flags helpers put into the stages dict (e.g. gemini_file_reused) are
+        stored under flags, so only durations end up in stages.
+        """
+        update: Dict[str, Any] = {}
+        for name, value in self.stages.items():
+            if isinstance(value, bool):
+                update[f"{prefix}.flags.{name}"] = value
+            elif isinstance(value, (int, float)):
+                update[f"{prefix}.stages.{name}"] = value
+        update.update({f"{prefix}.bytes.{k}": v for k, v in self.bytes.items()})
+        return update
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of values (None for an empty list)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: Dict[str, Iterable[float]], percentiles: Iterable[int] = (50, 90, 99)) -> Dict[str, Dict[str, Any]]:
+    """Count, percentiles and max per stage."""
+    summary: Dict[str, Dict[str, Any]] = {}
+    for stage, values in samples.items():
+        values = [float(v) for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        if not values:
+            continue
+        stats: Dict[str, Any] = {"count": len(values)}
+        for pct in percentiles:
+            stats[f"p{pct}"] = round(percentile(values, pct), 3)
+        stats["max"] = round(max(values), 3)
+        summary[stage] = stats
+    return summary
+
+
+def timing_report(timings_docs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Percentiles across many tasks' timings sub-documents.
+
+    Task-level stages, per-creative stages and byte counts are summarized
+    separately; boolean flags (e.g. download_cached) are ignored.
+    """
+    stages: Dict[str, List[float]] = {}
+    creative_stages: Dict[str, List[float]] = {}
+    byte_counts: Dict[str, List[float]] = {}
+    tasks = 0
+
+    for timings in timings_docs:
+        if not timings:
+            continue
+        tasks += 1
+        for name, value in (timings.get("stages") or {}).items():
+            stages.setdefault(name, []).append(value)
+        for name, value in (timings.get("bytes") or {}).items():
+            byte_counts.setdefault(name, []).append(value)
+        for creative in timings.get("creatives") or []:
+            for name, value in creative.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                target = byte_counts if name.endswith("_bytes") else creative_stages
+                target.setdefault(name if target is creative_stages else f"creative_{name}", []).append(value)
+
+    return {
+        "tasks": tasks,
+        "stages": summarize(stages),
+        "creative_stages": summarize(creative_stages),
+        "bytes": summarize(byte_counts)
+    }
@@ -0,0 +1,41 @@
+"""
+Classification of errors worth retrying.
+
+Background tasks let transient errors (rate limits, 5xx responses, timeouts,
+dropped connections) propagate to the job worker, which retries the job
+with backoff and dead-letters it once its attempts are used up. Any other
+error fails the task right away. Errors carrying a boolean `transient`
+attribute were classified where they were raised.
+"""
+from typing import Optional
+
+import httpx
+
+# HTTP statuses of Apify, Gemini (google.api_core exceptions carry them as
+# `code`) and video CDNs that are expected to go away on a later attempt
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    value = getattr(getattr(error, "response", None), "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_transient_error(error: Optional[BaseException]) -> bool:
+    """True if error, or an exception it was raised from, is worth retrying later."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        transient = getattr(error, "transient", None)
+        if isinstance(transient, bool):  # Classified where it was raised (e.g. ApifyRunError)
+            return transient
+        if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+            return True
+        if _status_code(error) in TRANSIENT_STATUS_CODES:
+            return True
+        error = error.__cause__ or (None if error.__suppress_context__ else error.__context__)
+    return False
@@ -0,0 +1,127 @@
+"""
+Standalone job worker: consumes parse, analysis and policy-check jobs from the
+durable job queue so API nodes only serve HTTP traffic.
+
+Usage:
+    python -m src.worker --workers 2 --concurrency 4
+    python -m src.worker --types analyze_creatives,policy_check
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+import sys
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from src.db import MongoDB, JobType
+from src.services.executor_pool import ExecutorPool
+from src.services.job_queue import JobQueue, JobWorker
+from src.services.job_handlers import JOB_HANDLERS, handle_dead_letter
+from src.services.video_downloader import VideoDownloader
+
+logger = logging.getLogger("src.worker")
+
+
+async def run_worker(concurrency: int, job_types: Optional[List[str]] = None):
+    """Run one worker until SIGINT/SIGTERM."""
+    await MongoDB.connect()
+    ExecutorPool.start()
+
+    worker = JobWorker(
+        JOB_HANDLERS,
+        on_dead_letter=handle_dead_letter,
+        concurrency=concurrency,
+        job_types=job_types
+    )
+
+    loop = asyncio.get_running_loop()
+    stop_requested = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_requested.set)
+
+    try:
+        recovered = await JobQueue.recover_expired_leases(handle_dead_letter)
+        if recovered:
+            logger.info(f"♻️ Recovered {recovered} job(s) with expired leases")
+
+        run_task = asyncio.create_task(worker.run())
+        await stop_requested.wait()
+        logger.info("🛑 Stop requested, handing in-flight jobs back to the queue")
+        await worker.stop()
+        await run_task
+    finally:
+        await VideoDownloader.close()
+        ExecutorPool.shutdown()
+        await MongoDB.close()
+
+
+def _worker_process(concurrency: int, job_types: Optional[List[str]]):
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(run_worker(concurrency, job_types))
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Background job worker for ads parsing and analysis")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes (default: 1)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4,
+        help="Concurrent jobs per worker process (default: 4)"
+    )
+    parser.add_argument(
+        "--types", type=str, default=None,
+        help="Comma-separated job types to consume "
+             f"(default: all of {', '.join(t.value for t in JobType)})"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+
+    job_types = None
+    if args.types:
+        job_types = [t.strip() for t in args.types.split(",") if t.strip()]
+        unknown = set(job_types) - set(JOB_HANDLERS)
+        if unknown:
+            print(f"Unknown job types: {', '.join(sorted(unknown))}", file=sys.stderr)
+            sys.exit(2)
+
+    if args.workers <= 1:
+        _worker_process(args.concurrency, job_types)
+        return
+
+    processes = [
+        multiprocessing.Process(
+            target=_worker_process,
+            args=(args.concurrency, job_types),
+            name=f"worker-{i + 1}"
+        )
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def _forward(signum, _frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Children receive Ctrl+C directly
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
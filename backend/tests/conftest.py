@@ -24,4 +24,19 @@ def sample_env_vars(monkeypatch):
     monkeypatch.setenv('FB_APP_SECRET', 'test_app_secret')
     monkeypatch.setenv('FB_API_VERSION', 'v21.0')
     monkeypatch.setenv('FB_BASE_URL', 'https://graph.facebook.com')
-    monkeypatch.setenv('REQUEST_TIMEOUT', '30')
\ No newline at end of file
+    monkeypatch.setenv('REQUEST_TIMEOUT', '30')
+
+
+@pytest.fixture
+def start_patches():
+    """Start unittest.mock patchers for the test; they are stopped again afterwards."""
+    started = []
+
+    def start(*patchers):
+        for patcher in patchers:
+            patcher.start()
+            started.append(patcher)
+
+    yield start
+    for patcher in reversed(started):
+        patcher.stop()
@@ -0,0 +1,70 @@
+"""
+Unit tests for the cross-task creative analysis cache.
+Uses mocks in place of the Motor database.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.analysis_cache import AnalysisCache
+from src.utils.file_manager import file_sha256
+
+
+class TestAnalysisCache:
+    """Tests for AnalysisCache lookups and invalidation"""
+
+    def setup_method(self):
+        self.db = MagicMock()
+        self.db.analysis_cache.find_one_and_update = AsyncMock()
+        self.db.analysis_cache.update_one = AsyncMock()
+        self.db.analysis_cache.delete_many = AsyncMock(return_value=MagicMock(deleted_count=2))
+        self.patcher = patch("src.services.analysis_cache.MongoDB.get_db", return_value=self.db)
+        self.patcher.start()
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_get_matches_full_key_and_skips_expired(self):
+        self.db.analysis_cache.find_one_and_update.return_value = {"result": {"hook": {}}}
+
+        result = await AnalysisCache.get("ad1", "abc", "models/m", "v1")
+
+        assert result == {"hook": {}}
+        query = self.db.analysis_cache.find_one_and_update.call_args.args[0]
+        assert query["ad_archive_id"] == "ad1"
+        assert query["video_hash"] == "abc"
+        assert query["model"] == "models/m"
+        assert query["prompt_version"] == "v1"
+        assert "$gt" in query["expires_at"]
+
+    @pytest.mark.asyncio
+    async def test_get_miss_returns_none(self):
+        self.db.analysis_cache.find_one_and_update.return_value = None
+
+        assert await AnalysisCache.get("ad1", "abc", "models/m", "v1") is None
+
+    @pytest.mark.asyncio
+    async def test_put_upserts_with_expiry(self, monkeypatch):
+        monkeypatch.setenv("ANALYSIS_CACHE_TTL_DAYS", "7")
+
+        await AnalysisCache.put("ad1", "abc", "models/m", "v1", {"hook": {}})
+
+        args = self.db.analysis_cache.update_one.call_args
+        update = args.args[1]["$set"]
+        assert args.kwargs["upsert"] is True
+        assert (update["expires_at"] - update["created_at"]).days == 7
+
+    @pytest.mark.asyncio
+    async def test_invalidate_by_prompt_version(self):
+        deleted = await AnalysisCache.invalidate(prompt_version="v1")
+
+        assert deleted == 2
+        self.db.analysis_cache.delete_many.assert_awaited_once_with({"prompt_version": "v1"})
+
+
+def test_file_sha256(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"hello")
+
+    assert file_sha256(str(path)) == "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
@@ -0,0 +1,90 @@
+"""
+Unit tests for the concurrent download -> analysis pipeline.
+Uses mocks in place of the Motor database, the video cache and Gemini.
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.db import TaskStatus
+from src.services import task_service
+
+AD_IDS = [f"ad{i}" for i in range(8)]
+
+
+class _Gauge:
+    """Counts concurrently running calls and remembers the peak."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def hold(self, seconds):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.active -= 1
+
+
+class TestAnalysisPipeline:
+    """Tests for the semaphore-bounded creative pipeline of analyze_creatives_task()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.downloads = _Gauge()
+        self.analyses = _Gauge()
+
+        async def fetch(url, ad_id, *args, **kwargs):
+            await self.downloads.hold(0.02)
+            if ad_id == "ad3":
+                raise RuntimeError("CDN returned 404")
+            return f"/cache/{ad_id}.mp4", f"hash-{ad_id}"
+
+        async def analyze(video_path, *args):
+            await self.analyses.hold(0.05)
+            return {}
+
+        self.db = MagicMock()
+        self.db.tasks.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        self.db.tasks.find_one_and_update = AsyncMock(return_value={"progress": {}})
+        start_patches(
+            patch.dict("os.environ", {"DOWNLOAD_CONCURRENCY": "2", "ANALYSIS_CONCURRENCY": "3"}),
+            patch("src.services.task_service.MongoDB.get_db", return_value=self.db),
+            patch("src.services.task_service.TaskEvents.publish", new=AsyncMock()),
+            patch("src.services.task_service.VideoCache.fetch", new=fetch),
+            patch("src.services.task_service.VideoCache.unpin_task", new=AsyncMock()),
+            patch("src.services.task_service.ExecutorPool.run", new=AsyncMock(return_value=None)),
+            patch("src.services.task_service.AnalysisCache.get", new=AsyncMock(return_value=None)),
+            patch("src.services.task_service.AnalysisCache.put", new=AsyncMock()),
+            patch("src.services.task_service.GeminiFiles.acquire", new=AsyncMock(return_value="files/abc")),
+            patch("src.services.task_service.analyze_video_file", new=analyze),
+            patch("src.services.task_service.resolve_model_name", return_value="models/gemini-x"),
+            patch("src.services.task_service._aggregate_analysis", new=AsyncMock(side_effect=RuntimeError("skip"))),
+        )
+
+    @pytest.mark.asyncio
+    async def test_limits_hold_and_failed_download_is_isolated(self, tmp_path):
+        creatives_file = tmp_path / "ads.json"
+        creatives_file.write_text(json.dumps({"ads": [
+            {"ad_archive_id": ad_id, "snapshot": {"videos": [{"video_hd_url": f"https://x/{ad_id}.mp4"}]}}
+            for ad_id in AD_IDS
+        ]}))
+        self.db.tasks.find_one = AsyncMock(return_value={
+            "task_id": "t1", "status": TaskStatus.PARSED, "creatives_file": str(creatives_file), "analysis_budget": 8
+        })
+
+        await task_service.analyze_creatives_task("t1")
+
+        assert 1 < self.downloads.peak <= 2
+        assert 1 < self.analyses.peak <= 3
+        final = self.db.tasks.update_one.call_args_list[-1].args[1]["$set"]
+        assert final["status"] == TaskStatus.COMPLETED
+        analyzed = sorted(c["ad_archive_id"] for c in final["creatives_analyzed"])
+        assert analyzed == [ad_id for ad_id in AD_IDS if ad_id != "ad3"]
+        outcomes = [c.args[1]["$inc"] for c in self.db.tasks.find_one_and_update.call_args_list]
+        assert outcomes.count({"progress.failed": 1}) == 1
@@ -0,0 +1,90 @@
+"""
+Tests for splitting one batched Apify run back into per-URL results.
+"""
+import threading
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.services.apify_service import ApifyRunError, ApifyService
+from src.utils.cancellation import OperationCancelled
+from src.utils.transient_errors import is_transient_error
+
+
+URL_A = "https://www.facebook.com/ads/library/?active_status=all&ad_type=all&country=ALL&view_all_page_id=111"
+URL_B = "https://www.facebook.com/ads/library/?active_status=all&ad_type=all&country=ALL&view_all_page_id=222"
+
+
+def _video_ad(ad_id, **fields):
+    return {"ad_archive_id": ad_id, "snapshot": {"videos": [{"video_hd_url": "https://v/x.mp4"}]}, **fields}
+
+
+class TestApifyBatch:
+    """Test batch runs of the Ads Library actor."""
+
+    def setup_method(self):
+        with patch("src.services.apify_service.ApifyClient"):
+            self.service = ApifyService(api_key="test")
+
+    def test_items_are_split_by_url_and_page_id(self):
+        processed_a = self.service._ensure_video_filter_in_url(URL_A)
+        items = [
+            _video_ad("1", url=processed_a),
+            _video_ad("2", page_id="222"),
+            _video_ad("3", page_id="999"),  # Matches neither input
+            {"ad_archive_id": "4", "page_id": "111", "snapshot": {}},  # Not a video
+        ]
+        self.service._run_actor_sync = MagicMock(return_value=items)
+
+        grouped = self.service._run_apify_batch_sync([URL_A, URL_B], max_results=5)
+
+        assert [ad["ad_archive_id"] for ad in grouped[URL_A]] == ["1"]
+        assert [ad["ad_archive_id"] for ad in grouped[URL_B]] == ["2"]
+        urls = self.service._run_actor_sync.call_args[0][0]
+        assert len(urls) == 2 and all("media_type=video" in url for url in urls)
+
+    def test_max_results_is_applied_per_url(self):
+        items = [_video_ad(str(i), page_id="111") for i in range(4)] + [_video_ad("b", page_id="222")]
+        self.service._run_actor_sync = MagicMock(return_value=items)
+
+        grouped = self.service._run_apify_batch_sync([URL_A, URL_B], max_results=2)
+
+        assert len(grouped[URL_A]) == 2
+        assert len(grouped[URL_B]) == 1
+
+    def test_actor_count_scales_with_urls(self):
+        self.service.client.run.return_value.wait_for_finish.return_value = {
+            "id": "r1", "status": "SUCCEEDED", "defaultDatasetId": "d1"
+        }
+        self.service.client.dataset.return_value.iterate_items.return_value = []
+
+        self.service._run_actor_sync(["a", "b", "c"], max_results=5, cancel_event=None)
+
+        run_input = self.service.client.actor.return_value.start.call_args.kwargs["run_input"]
+        assert run_input["count"] == 45
+
+
+class TestWaitForRun:
+    """Test how finished actor runs are classified."""
+
+    def setup_method(self):
+        with patch("src.services.apify_service.ApifyClient"):
+            self.service = ApifyService(api_key="test")
+
+    def test_succeeded_run_is_returned(self):
+        run = {"id": "r1", "status": "SUCCEEDED"}
+        assert self.service._wait_for_run(run, None) is run
+
+    @pytest.mark.parametrize("status,transient", [("FAILED", False), ("TIMED-OUT", True), ("ABORTED", True)])
+    def test_unsuccessful_run_raises(self, status, transient):
+        with pytest.raises(ApifyRunError, match=status) as exc_info:
+            self.service._wait_for_run({"id": "r1", "status": status}, None)
+
+        assert is_transient_error(exc_info.value) is transient
+
+    def test_run_aborted_on_cancel_is_cancelled(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+
+        with pytest.raises(OperationCancelled):
+            self.service._wait_for_run({"id": "r1", "status": "ABORTED"}, cancel_event)
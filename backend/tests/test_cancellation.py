@@ -0,0 +1,33 @@
+"""
+Unit tests for cooperative cancellation of blocking work.
+"""
+
+import threading
+
+import pytest
+
+from src.utils.cancellation import OperationCancelled, raise_if_cancelled, sleep_or_cancel
+
+
+class TestCancellation:
+    """Tests for cancel-event helpers"""
+
+    def test_raise_if_cancelled(self):
+        event = threading.Event()
+        raise_if_cancelled(event)
+        raise_if_cancelled(None)
+
+        event.set()
+        with pytest.raises(OperationCancelled, match="Upload cancelled"):
+            raise_if_cancelled(event, "Upload")
+
+    def test_sleep_wakes_up_on_cancel(self):
+        event = threading.Event()
+        threading.Timer(0.05, event.set).start()
+
+        with pytest.raises(OperationCancelled):
+            sleep_or_cancel(event, 10)
+
+    def test_sleep_without_cancel_completes(self):
+        sleep_or_cancel(threading.Event(), 0.01)
+        sleep_or_cancel(None, 0.01)
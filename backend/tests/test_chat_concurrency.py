@@ -0,0 +1,73 @@
+"""
+Regression benchmark: a slow chat planning call must not stall the event loop.
+Runs the real app over ASGI with mocks in place of MongoDB and Gemini.
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.api import chat_routes
+from src.main import app
+
+LLM_SECONDS = 0.5
+
+
+def _slow_model():
+    """Gemini model whose generation takes LLM_SECONDS (awaited, like the real async SDK call)."""
+    async def generate_content_async(*args, **kwargs):
+        await asyncio.sleep(LLM_SECONDS)
+        text = json.dumps({"need_more_info": True, "question": "Що рекламуємо?", "updates": {}})
+        return SimpleNamespace(text=text, prompt_feedback=None)
+    return MagicMock(generate_content_async=generate_content_async)
+
+
+class TestChatConcurrency:
+    """Concurrent /chat/message and /health requests"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.chat_sessions.find_one = AsyncMock(return_value={"session_id": "s1"})
+        self.db.chat_sessions.update_one = AsyncMock()
+        self.db.chat_messages.insert_one = AsyncMock()
+        self.db.chat_messages.find.return_value.sort.return_value.to_list = AsyncMock(return_value=[])
+        start_patches(
+            patch.dict("os.environ", {"GOOGLE_API_KEY": "test-key"}),
+            patch("src.api.chat_routes.MongoDB.get_db", return_value=self.db),
+            patch("src.analysis.llm_gateway.get_model", return_value=_slow_model()),
+        )
+        chat_routes._planner = None
+        yield
+        chat_routes._planner = None
+
+    @pytest.mark.asyncio
+    async def test_health_is_served_while_chat_is_planning(self):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            chat = asyncio.create_task(
+                client.post("/api/v1/chat/message", json={"session_id": "s1", "message": "Привіт"})
+            )
+            await asyncio.sleep(0.05)
+
+            health_latencies = []
+            for _ in range(5):
+                request_started = time.perf_counter()
+                response = await client.get("/api/v1/health")
+                health_latencies.append(time.perf_counter() - request_started)
+                assert response.status_code == 200
+            assert not chat.done()  # Health checks finished while the chat turn was still planning
+
+            chat_response = await chat
+            chat_seconds = time.perf_counter() - started
+
+        assert chat_response.status_code == 200
+        assert chat_response.json()["type"] == "ask"
+        assert chat_seconds >= LLM_SECONDS
+        assert max(health_latencies) < LLM_SECONDS / 5
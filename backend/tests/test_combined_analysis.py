@@ -0,0 +1,104 @@
+"""
+Unit tests for the combined creative analysis + policy check mode.
+Uses mocks in place of the analysis cache and Gemini.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.analysis.policy_checker import POLICY_PROMPT_VERSION
+from src.services import task_service
+
+AD = {"ad_archive_id": "a1", "page_name": "Brand"}
+POLICY = {"compliance_summary": {"risk_level": "high", "will_pass_moderation": False}}
+
+
+class TestCombinedAnalysis:
+    """Tests for _analyze_video(check_policy=True)"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.cache_get = AsyncMock(return_value=None)
+        self.cache_put = AsyncMock()
+        self.acquire = AsyncMock(return_value="files/abc")
+        self.analyze = AsyncMock(return_value={"hook": "strong"})
+        self.policy = AsyncMock(return_value=POLICY)
+        start_patches(
+            patch("src.services.task_service.AnalysisCache.get", new=self.cache_get),
+            patch("src.services.task_service.AnalysisCache.put", new=self.cache_put),
+            patch("src.services.task_service.GeminiFiles.acquire", new=self.acquire),
+            patch("src.services.task_service.analyze_video_file", new=self.analyze),
+            patch("src.services.task_service.check_video_policy", new=self.policy),
+            patch("src.services.task_service.resolve_model_name", return_value="models/gemini-x"),
+        )
+
+    async def _run(self, check_policy=True):
+        return await task_service._analyze_video(
+            1, 1, AD, "/cache/v.mp4", "hash1", asyncio.Semaphore(1), {}, None, check_policy
+        )
+
+    @pytest.mark.asyncio
+    async def test_both_checks_share_one_upload(self):
+        result, from_cache = await self._run()
+
+        self.acquire.assert_awaited_once()
+        assert self.acquire.call_args.args[:2] == ("hash1", "policy")
+        assert self.analyze.call_args.args[5] == "files/abc"
+        assert self.policy.call_args.args[6] == "files/abc"
+        assert result == {"hook": "strong", "policy_check": POLICY}
+        assert not from_cache
+        versions = [call.args[3] for call in self.cache_put.call_args_list]
+        assert versions == [task_service.PROMPT_VERSION, POLICY_PROMPT_VERSION]
+
+    @pytest.mark.asyncio
+    async def test_checks_run_concurrently(self):
+        async def slow(*args, **kwargs):
+            await asyncio.sleep(0.2)
+            return {}
+
+        self.analyze.side_effect = slow
+        self.policy.side_effect = slow
+        started = asyncio.get_running_loop().time()
+
+        await self._run()
+
+        assert asyncio.get_running_loop().time() - started < 0.35
+
+    @pytest.mark.asyncio
+    async def test_policy_failure_does_not_fail_creative(self):
+        self.policy.side_effect = RuntimeError("blocked")
+
+        result, _ = await self._run()
+
+        assert result["hook"] == "strong"
+        assert result["policy_check"] == {"error": "blocked"}
+        assert self.cache_put.await_count == 1  # Failed check is not cached
+
+    @pytest.mark.asyncio
+    async def test_cached_analysis_only_runs_policy_check(self):
+        self.cache_get.side_effect = [{"hook": "cached"}, None]
+
+        result, from_cache = await self._run()
+
+        self.analyze.assert_not_called()
+        self.policy.assert_awaited_once()
+        assert result == {"hook": "cached", "policy_check": POLICY}
+        assert from_cache
+
+    @pytest.mark.asyncio
+    async def test_without_option_policy_is_skipped(self):
+        result, _ = await self._run(check_policy=False)
+
+        assert self.acquire.call_args.args[1] == "analysis"
+        self.policy.assert_not_called()
+        assert "policy_check" not in result
+
+    def test_risk_flag_is_surfaced_on_creative(self):
+        analysis = task_service._build_creative_analysis(
+            AD, {"policy_check": POLICY}, "https://x/v.mp4", "/cache/v.mp4"
+        )
+
+        assert analysis.policy_risk_level == "high"
+        assert analysis.will_pass_moderation is False
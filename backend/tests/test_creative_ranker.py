@@ -0,0 +1,66 @@
+"""
+Unit tests for ad prioritization before video analysis.
+"""
+
+from datetime import datetime, timezone
+
+from src.services.creative_ranker import delivery_days, rank_ads, select_ads_for_analysis
+
+NOW = datetime(2025, 10, 1, tzinfo=timezone.utc)
+DAY = 86400
+
+
+def _ad(ad_id, days=0, collation=0, active=False, platforms=None, ended_days_ago=None):
+    start = int(NOW.timestamp()) - days * DAY
+    ad = {
+        "ad_archive_id": ad_id,
+        "start_date": start,
+        "collation_count": collation,
+        "is_active": active,
+        "publisher_platform": platforms or ["FACEBOOK"],
+    }
+    if ended_days_ago is not None:
+        ad["end_date"] = int(NOW.timestamp()) - ended_days_ago * DAY
+    return ad
+
+
+class TestCreativeRanker:
+    """Tests for creative ranking and budget selection"""
+
+    def test_delivery_days_for_active_ad_runs_until_now(self):
+        ad = _ad("1", days=30, active=True, ended_days_ago=20)
+
+        assert round(delivery_days(ad, NOW)) == 30
+
+    def test_delivery_days_for_stopped_ad_uses_end_date(self):
+        ad = _ad("1", days=30, ended_days_ago=20)
+
+        assert round(delivery_days(ad, NOW)) == 10
+
+    def test_missing_dates_do_not_fail(self):
+        assert delivery_days({"ad_archive_id": "1"}, NOW) == 0.0
+
+    def test_long_running_scaled_ads_rank_first(self):
+        ads = [
+            _ad("new", days=1),
+            _ad("evergreen", days=120, collation=12, active=True, platforms=["FACEBOOK", "INSTAGRAM"]),
+            _ad("medium", days=20, collation=2),
+        ]
+
+        ranked = [ad["ad_archive_id"] for ad in rank_ads(ads, NOW)]
+
+        assert ranked == ["evergreen", "medium", "new"]
+
+    def test_ties_keep_original_order(self):
+        ads = [_ad("a"), _ad("b"), _ad("c")]
+
+        ranked = [ad["ad_archive_id"] for ad in rank_ads(ads, NOW)]
+
+        assert ranked == ["a", "b", "c"]
+
+    def test_budget_limits_selection(self):
+        ads = [_ad(str(i), days=i) for i in range(10)]
+
+        selected = select_ads_for_analysis(ads, 3, NOW)
+
+        assert [ad["ad_archive_id"] for ad in selected] == ["9", "8", "7"]
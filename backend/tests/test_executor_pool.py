@@ -0,0 +1,60 @@
+"""
+Unit tests for the shared executor pool registry.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.services.executor_pool import ExecutorPool
+
+
+class TestExecutorPool:
+    """Tests for ExecutorPool"""
+
+    def setup_method(self):
+        ExecutorPool.shutdown()
+
+    def teardown_method(self):
+        ExecutorPool.shutdown()
+
+    def test_pool_sizes_from_env(self, monkeypatch):
+        """Pool sizes are read from configuration on start"""
+        monkeypatch.setenv("IO_POOL_SIZE", "3")
+        monkeypatch.setenv("CPU_POOL_SIZE", "2")
+
+        ExecutorPool.start()
+
+        sizes = ExecutorPool.sizes()
+        assert sizes["io"] == 3
+        assert sizes["cpu"] == 2
+
+    def test_unknown_pool_raises(self):
+        """Unknown pool names are rejected"""
+        with pytest.raises(ValueError):
+            ExecutorPool.get("gpu")
+
+    @pytest.mark.asyncio
+    async def test_run_reports_gauges(self):
+        """Active-worker and queue-depth gauges track running calls"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(timeout=5)
+            return threading.current_thread().name
+
+        task = asyncio.create_task(ExecutorPool.run("io", blocking))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+
+        stats = ExecutorPool.stats()["io"]
+        assert stats["active_workers"] == 1
+        assert stats["queue_depth"] == 0
+
+        release.set()
+        thread_name = await task
+
+        assert thread_name.startswith("pool-io")
+        assert ExecutorPool.stats()["io"]["active_workers"] == 0
@@ -0,0 +1,148 @@
+"""
+Unit tests for the Gemini upload registry.
+Uses mocks in place of the Motor database and the Gemini File API.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.gemini_files import GeminiFiles
+
+
+def _file(name="files/abc", state="ACTIVE"):
+    return SimpleNamespace(
+        name=name,
+        state=SimpleNamespace(name=state),
+        uri=f"https://example.com/{name}",
+        size_bytes=100,
+        expiration_time=datetime.utcnow() + timedelta(hours=48)
+    )
+
+
+class TestGeminiFilesAcquire:
+    """Tests for GeminiFiles.acquire()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.gemini_files.find_one = AsyncMock(return_value=None)
+        self.db.gemini_files.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        self.db.gemini_files.delete_one = AsyncMock()
+        self.upload = MagicMock(return_value=_file())
+        self.get_file = MagicMock(return_value=_file())
+        start_patches(
+            patch("src.services.gemini_files.MongoDB.get_db", return_value=self.db),
+            patch(
+                "src.services.gemini_files.ExecutorPool.run",
+                new=AsyncMock(side_effect=lambda pool, fn, *args: fn(*args))
+            ),
+            patch("src.services.gemini_files.upload_file", new=self.upload),
+            patch("src.services.gemini_files.GeminiPoller.wait_active", new=AsyncMock(side_effect=lambda f, *args: f)),
+            patch("src.services.gemini_files.get_active_file", new=self.get_file),
+        )
+        GeminiFiles._inflight = {}
+
+    @pytest.mark.asyncio
+    async def test_miss_uploads_and_registers(self):
+        upload_path = AsyncMock(return_value="/tmp/proxy.mp4")
+
+        video_file = await GeminiFiles.acquire("hash1", "analysis", upload_path)
+
+        assert video_file.name == "files/abc"
+        upload_path.assert_awaited_once()
+        assert self.upload.call_args.args[0] == "/tmp/proxy.mp4"
+        update = self.db.gemini_files.update_one.call_args
+        assert update.args[0] == {"name": "files/abc"}
+        assert update.args[1]["$set"]["content_hash"] == "hash1"
+        assert update.args[1]["$set"]["state"] == "ACTIVE"
+
+    @pytest.mark.asyncio
+    async def test_registered_active_file_is_reused(self):
+        self.db.gemini_files.find_one.return_value = {"name": "files/abc"}
+        upload_path = AsyncMock(return_value="/tmp/proxy.mp4")
+        timings = {}
+
+        video_file = await GeminiFiles.acquire("hash1", "policy", upload_path, timings)
+
+        assert video_file.name == "files/abc"
+        assert timings["gemini_file_reused"] is True
+        upload_path.assert_not_called()  # No transcode either
+        self.upload.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_file_gone_remotely_is_uploaded_again(self):
+        self.db.gemini_files.find_one.return_value = {"name": "files/old"}
+        self.get_file.return_value = None
+
+        await GeminiFiles.acquire("hash1", "analysis", AsyncMock(return_value="/tmp/v.mp4"))
+
+        self.db.gemini_files.delete_one.assert_awaited_once_with({"name": "files/old"})
+        self.upload.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_upload(self):
+        release = asyncio.Event()
+
+        async def slow_path():
+            await release.wait()
+            return "/tmp/v.mp4"
+
+        first = asyncio.create_task(GeminiFiles.acquire("hash1", "analysis", slow_path))
+        await asyncio.sleep(0)
+        timings = {}
+        second = asyncio.create_task(GeminiFiles.acquire("hash1", "analysis", slow_path, timings))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert (await first).name == (await second).name
+        self.upload.assert_called_once()
+        assert timings["gemini_file_reused"] is True
+
+
+class TestGeminiFilesCleanup:
+    """Tests for GeminiFiles.cleanup()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.gemini_files.delete_one = AsyncMock(return_value=MagicMock(deleted_count=1))
+        self.delete = MagicMock(return_value=True)
+        start_patches(
+            patch("src.services.gemini_files.MongoDB.get_db", return_value=self.db),
+            patch(
+                "src.services.gemini_files.ExecutorPool.run",
+                new=AsyncMock(side_effect=lambda pool, fn, *args: fn(*args))
+            ),
+            patch("src.services.gemini_files.delete_uploaded_file", new=self.delete),
+        )
+
+    @pytest.mark.asyncio
+    async def test_deletes_idle_files_and_drops_expired_records(self):
+        now = datetime.utcnow()
+        idle_since = now - timedelta(hours=10)
+        self.db.gemini_files.find.return_value.to_list = AsyncMock(return_value=[
+            {"name": "files/idle", "expires_at": now + timedelta(hours=20), "last_used_at": idle_since},
+            {"name": "files/expired", "expires_at": now - timedelta(hours=1), "last_used_at": idle_since},
+        ])
+
+        result = await GeminiFiles.cleanup()
+
+        assert result == {"expired": 1, "deleted": 1, "failed": 0}
+        self.delete.assert_called_once_with("files/idle")  # Gemini already removed the expired one
+
+    @pytest.mark.asyncio
+    async def test_file_reused_meanwhile_is_kept(self):
+        now = datetime.utcnow()
+        self.db.gemini_files.find.return_value.to_list = AsyncMock(return_value=[
+            {"name": "files/idle", "expires_at": now + timedelta(hours=20), "last_used_at": now - timedelta(hours=10)},
+        ])
+        self.db.gemini_files.delete_one.return_value = MagicMock(deleted_count=0)
+
+        result = await GeminiFiles.cleanup()
+
+        assert result == {"expired": 0, "deleted": 0, "failed": 0}
+        self.delete.assert_not_called()
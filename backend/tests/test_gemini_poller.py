@@ -0,0 +1,123 @@
+"""
+Unit tests for the shared Gemini processing poller.
+Uses mocks in place of the Gemini File API.
+"""
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.gemini_poller import GeminiPoller
+
+
+def _file(name, state):
+    return SimpleNamespace(name=name, state=SimpleNamespace(name=state))
+
+
+class TestGeminiPoller:
+    """Tests for GeminiPoller.wait_active()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.states = {}
+        self.polled = []
+
+        def get_file(name):
+            self.polled.append(name)
+            return _file(name, next(self.states[name]))
+
+        self.delete = MagicMock()
+        start_patches(
+            patch(
+                "src.services.gemini_poller.ExecutorPool.run",
+                new=AsyncMock(side_effect=lambda pool, fn, *args: fn(*args))
+            ),
+            patch("src.services.gemini_poller.get_file", new=get_file),
+            patch("src.services.gemini_poller.processing_poll_delays", new=lambda: itertools.repeat(0.01)),
+            patch("src.analysis.gemini_client.delete_uploaded_file", new=self.delete),
+        )
+        yield
+        GeminiPoller._pending = {}
+
+    @pytest.mark.asyncio
+    async def test_polls_many_uploads_in_one_loop(self):
+        self.states = {
+            "files/a": iter(["PROCESSING", "ACTIVE"]),
+            "files/b": iter(["PROCESSING", "PROCESSING", "ACTIVE"]),
+        }
+        timings = {}
+
+        results = await asyncio.gather(
+            GeminiPoller.wait_active(_file("files/a", "PROCESSING"), timings=timings),
+            GeminiPoller.wait_active(_file("files/b", "PROCESSING")),
+        )
+
+        assert [f.state.name for f in results] == ["ACTIVE", "ACTIVE"]
+        assert self.polled.count("files/a") == 2 and self.polled.count("files/b") == 3
+        assert "processing_wait" in timings
+        assert GeminiPoller.stats() == {"processing": 0}
+
+    @pytest.mark.asyncio
+    async def test_active_file_is_returned_without_polling(self):
+        video_file = await GeminiPoller.wait_active(_file("files/a", "ACTIVE"))
+
+        assert video_file.name == "files/a"
+        assert self.polled == []
+
+    @pytest.mark.asyncio
+    async def test_deadline_raises_timeout(self):
+        self.states = {"files/stuck": itertools.repeat("PROCESSING")}
+
+        with pytest.raises(TimeoutError, match="files/stuck"):
+            await GeminiPoller.wait_active(_file("files/stuck", "PROCESSING"), timeout=0.05)
+        assert GeminiPoller.stats() == {"processing": 0}
+
+    @pytest.mark.asyncio
+    async def test_failed_processing_deletes_file(self):
+        self.states = {"files/bad": iter(["FAILED"])}
+
+        with pytest.raises(RuntimeError, match="FAILED"):
+            await GeminiPoller.wait_active(_file("files/bad", "PROCESSING"))
+        self.delete.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_stops_polling(self):
+        self.states = {"files/a": itertools.repeat("PROCESSING")}
+
+        waiter = asyncio.create_task(GeminiPoller.wait_active(_file("files/a", "PROCESSING")))
+        await asyncio.sleep(0.03)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        polls = len(self.polled)
+        await asyncio.sleep(0.03)
+
+        assert len(self.polled) == polls
+        assert GeminiPoller.stats() == {"processing": 0}
+
+    @pytest.mark.asyncio
+    async def test_upload_waits_with_poller(self):
+        self.states = {"files/a": iter(["ACTIVE"])}
+
+        with patch("src.services.gemini_poller.upload_file", return_value=_file("files/a", "PROCESSING")) as upload:
+            video_file = await GeminiPoller.upload("/tmp/v.mp4", "Policy check")
+
+        assert upload.call_args.args[:2] == ("/tmp/v.mp4", "Policy check")
+        assert video_file.state.name == "ACTIVE"
+        assert self.polled == ["files/a"]
+
+    @pytest.mark.asyncio
+    async def test_upload_is_deleted_when_processing_times_out(self):
+        self.states = {"files/stuck": itertools.repeat("PROCESSING")}
+        io_pool = MagicMock()
+
+        with patch("src.services.gemini_poller.upload_file", return_value=_file("files/stuck", "PROCESSING")), \
+                patch("src.services.gemini_poller.processing_timeout", return_value=0.05), \
+                patch("src.services.gemini_poller.ExecutorPool.get", return_value=io_pool):
+            with pytest.raises(TimeoutError):
+                await GeminiPoller.upload("/tmp/v.mp4")
+
+        assert io_pool.submit.call_args.args[1].name == "files/stuck"
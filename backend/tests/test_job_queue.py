@@ -0,0 +1,119 @@
+"""
+Unit tests for the MongoDB-backed job queue.
+Uses mocks in place of the Motor database.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.db import JobStatus
+from src.services.job_queue import JobQueue, JobWorker, retry_delay_seconds
+
+
+class TestRetryBackoff:
+    """Tests for retry backoff calculation"""
+
+    def test_backoff_doubles(self, monkeypatch):
+        monkeypatch.setenv("JOB_RETRY_BASE_SECONDS", "10")
+        monkeypatch.setenv("JOB_RETRY_MAX_SECONDS", "1000")
+
+        assert retry_delay_seconds(1) == 10
+        assert retry_delay_seconds(2) == 20
+        assert retry_delay_seconds(3) == 40
+
+    def test_backoff_is_capped(self, monkeypatch):
+        monkeypatch.setenv("JOB_RETRY_BASE_SECONDS", "10")
+        monkeypatch.setenv("JOB_RETRY_MAX_SECONDS", "30")
+
+        assert retry_delay_seconds(5) == 30
+
+
+class TestJobQueue:
+    """Tests for JobQueue failure handling"""
+
+    def setup_method(self):
+        self.db = MagicMock()
+        self.db.jobs.update_one = AsyncMock()
+        self.patcher = patch("src.services.job_queue.MongoDB.get_db", return_value=self.db)
+        self.patcher.start()
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_fail_schedules_retry(self):
+        """A failed attempt with attempts left goes back to the queue"""
+        job = {"job_id": "j1", "attempts": 1, "max_attempts": 3}
+
+        dead = await JobQueue.fail(job, "w1", "boom")
+
+        assert dead is False
+        update = self.db.jobs.update_one.call_args[0][1]["$set"]
+        assert update["status"] == JobStatus.QUEUED
+        assert update["last_error"] == "boom"
+        assert "run_at" in update
+
+    @pytest.mark.asyncio
+    async def test_fail_dead_letters_when_exhausted(self):
+        """The last failed attempt dead-letters the job"""
+        job = {"job_id": "j1", "attempts": 3, "max_attempts": 3}
+
+        dead = await JobQueue.fail(job, "w1", "boom")
+
+        assert dead is True
+        update = self.db.jobs.update_one.call_args[0][1]["$set"]
+        assert update["status"] == JobStatus.DEAD
+
+
+class TestJobWorker:
+    """Tests for JobWorker job execution"""
+
+    @pytest.mark.asyncio
+    async def test_execute_completes_successful_job(self):
+        handler = AsyncMock()
+        worker = JobWorker({"parse_ads": handler}, worker_id="w1")
+        job = {"job_id": "j1", "type": "parse_ads", "attempts": 1, "max_attempts": 3, "payload": {}}
+
+        with patch.object(JobQueue, "complete", AsyncMock()) as complete:
+            await worker._execute(job)
+
+        handler.assert_awaited_once_with(job)
+        complete.assert_awaited_once_with("j1", "w1")
+
+    @pytest.mark.asyncio
+    async def test_execute_dead_letters_failed_job(self):
+        handler = AsyncMock(side_effect=RuntimeError("boom"))
+        on_dead = AsyncMock()
+        worker = JobWorker({"parse_ads": handler}, on_dead_letter=on_dead, worker_id="w1")
+        job = {"job_id": "j1", "type": "parse_ads", "attempts": 3, "max_attempts": 3, "payload": {}}
+
+        with patch.object(JobQueue, "fail", AsyncMock(return_value=True)) as fail:
+            await worker._execute(job)
+
+        fail.assert_awaited_once_with(job, "w1", "boom")
+        on_dead.assert_awaited_once_with(job, "boom")
+
+    @pytest.mark.asyncio
+    async def test_cancel_request_cancels_running_handler(self, monkeypatch):
+        monkeypatch.setenv("JOB_CANCEL_POLL_SECONDS", "0.5")
+        started = asyncio.Event()
+
+        async def handler(job):
+            started.set()
+            await asyncio.sleep(30)
+
+        worker = JobWorker({"parse_ads": handler}, worker_id="w1")
+        job = {"job_id": "j1", "type": "parse_ads", "attempts": 1, "max_attempts": 3, "payload": {}}
+
+        with patch.object(JobQueue, "is_cancel_requested", AsyncMock(return_value=True)), \
+                patch.object(JobQueue, "mark_cancelled", AsyncMock()) as mark_cancelled, \
+                patch.object(JobQueue, "complete", AsyncMock()) as complete:
+            task = asyncio.create_task(worker._execute(job))
+            worker._running["j1"] = task
+            await asyncio.wait_for(task, timeout=5)
+
+        assert started.is_set()
+        mark_cancelled.assert_awaited_once_with("j1", "w1")
+        complete.assert_not_awaited()
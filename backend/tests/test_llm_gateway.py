@@ -0,0 +1,101 @@
+"""
+Unit tests for the async Gemini gateway.
+Uses mocks in place of the Gemini SDK models.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.analysis import llm_gateway
+
+
+def _response(text='{"ok": true}', block_reason=None):
+    return SimpleNamespace(text=text, prompt_feedback=SimpleNamespace(block_reason=block_reason))
+
+
+class TestGenerate:
+    """Tests for llm_gateway.generate()/generate_json()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.models = {}
+
+        def get_model(name, generation_config=None):
+            if name not in self.models:
+                self.models[name] = MagicMock(generate_content_async=AsyncMock(return_value=_response()))
+            return self.models[name]
+
+        start_patches(
+            patch("src.analysis.llm_gateway.get_model", new=get_model),
+            patch("src.analysis.llm_gateway.RETRY_BASE_SECONDS", 0.0),
+        )
+
+    def _model(self, name):
+        return llm_gateway.get_model(name)
+
+    @pytest.mark.asyncio
+    async def test_returns_parsed_json_and_records_timing(self):
+        timings = {}
+
+        result = await llm_gateway.generate_json(["prompt"], model_name="gemini-x", timings=timings)
+
+        assert result == {"ok": True}
+        assert "generate" in timings
+        assert "models/gemini-x" in self.models
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_is_retried(self):
+        model = self._model("models/gemini-x")
+        model.generate_content_async.side_effect = [google_exceptions.ResourceExhausted("quota"), _response()]
+
+        result = await llm_gateway.generate_json(["prompt"], model_name="gemini-x", retries=2)
+
+        assert result == {"ok": True}
+        assert model.generate_content_async.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        model = self._model("models/gemini-x")
+        model.generate_content_async.side_effect = google_exceptions.InvalidArgument("bad")
+
+        with pytest.raises(google_exceptions.InvalidArgument):
+            await llm_gateway.generate(["prompt"], model_name="gemini-x", retries=2)
+        assert model.generate_content_async.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_retried_then_raised(self):
+        model = self._model("models/gemini-x")
+
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(1)
+
+        model.generate_content_async.side_effect = hang
+
+        with pytest.raises(asyncio.TimeoutError):
+            await llm_gateway.generate(["prompt"], model_name="gemini-x", timeout=0.01, retries=1)
+        assert model.generate_content_async.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_model_falls_back(self):
+        self._model("models/gemini-x").generate_content_async.side_effect = google_exceptions.NotFound("no model")
+
+        await llm_gateway.generate(["prompt"], model_name="gemini-x", fallback_models=["gemini-y"])
+
+        self._model("models/gemini-y").generate_content_async.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_blocked_prompt_raises(self):
+        self._model("models/gemini-x").generate_content_async.return_value = _response(block_reason="SAFETY")
+
+        with pytest.raises(RuntimeError, match="blocked"):
+            await llm_gateway.generate(["prompt"], model_name="gemini-x")
+
+
+def test_parse_json_extracts_fenced_object():
+    assert llm_gateway.parse_json('```json\n{"a": 1}\n```') == {"a": 1}
+    with pytest.raises(ValueError):
+        llm_gateway.parse_json("not json")
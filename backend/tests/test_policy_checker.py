@@ -0,0 +1,39 @@
+"""
+Unit tests for the video policy checker.
+Uses mocks in place of the video downloader and Gemini.
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.analysis import policy_checker
+
+
+@pytest.mark.asyncio
+async def test_url_is_downloaded_through_shared_downloader():
+    download = AsyncMock(return_value=("hash1", 1234))
+    uploaded = {}
+
+    async def upload(path, *args):
+        uploaded["path"] = path
+        uploaded["exists"] = os.path.exists(path)
+        return SimpleNamespace(name="files/abc")
+
+    response = MagicMock(text='{"compliance_summary": {"risk_level": "low"}}')
+    timings = {}
+    with patch("src.analysis.policy_checker.VideoDownloader.download", new=download), \
+            patch("src.analysis.policy_checker.GeminiPoller.upload", new=upload), \
+            patch("src.analysis.policy_checker.llm_gateway.generate", new=AsyncMock(return_value=response)):
+        result = await policy_checker.check_video_policy(
+            None, "facebook", None, "https://cdn.example.com/v.mp4", timings
+        )
+
+    assert download.call_args.args[0] == "https://cdn.example.com/v.mp4"
+    assert str(download.call_args.args[1]) == uploaded["path"]  # Uploaded from the downloaded file
+    assert uploaded["exists"]
+    assert not os.path.exists(uploaded["path"])  # Temporary copy is removed
+    assert timings["download_bytes"] == 1234
+    assert result["compliance_summary"]["risk_level"] == "low"
@@ -0,0 +1,69 @@
+"""
+Unit tests for cancelling parse/analysis tasks.
+Uses mocks in place of the Motor database and the job queue.
+"""
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.db import TaskStatus
+from src.main import app
+from src.services import task_service
+
+BATCH_JOB = {"job_id": "b1", "payload": {"tasks": [{"task_id": "t1"}, {"task_id": "t2"}]}}
+
+
+class TestCancelTask:
+    """Tests for DELETE /task/{task_id}"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.tasks.find_one = AsyncMock(return_value={"status": TaskStatus.PARSING})
+        self.db.tasks.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        self.db.tasks.count_documents = AsyncMock(return_value=0)
+        self.cancel_job = AsyncMock(return_value=1)
+        start_patches(
+            patch("src.api.routes.MongoDB.get_db", return_value=self.db),
+            patch("src.api.routes.TaskEvents.publish", new=AsyncMock()),
+            patch("src.api.routes.JobQueue.request_cancel", new=AsyncMock(return_value=0)),
+            patch("src.api.routes.JobQueue.active_batch_jobs", new=AsyncMock(return_value=[BATCH_JOB])),
+            patch("src.api.routes.JobQueue.cancel_job", new=self.cancel_job),
+        )
+
+    async def _cancel(self):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.delete("/api/v1/task/t1")
+
+    @pytest.mark.asyncio
+    async def test_batch_run_is_cancelled_with_its_last_task(self):
+        response = await self._cancel()
+
+        assert response.status_code == 200
+        self.cancel_job.assert_awaited_once_with("b1")
+        query = self.db.tasks.count_documents.call_args.args[0]
+        assert query["task_id"] == {"$in": ["t1", "t2"]}
+
+    @pytest.mark.asyncio
+    async def test_batch_run_continues_for_other_competitors(self):
+        self.db.tasks.count_documents.return_value = 1  # t2 is still parsing
+
+        response = await self._cancel()
+
+        assert response.status_code == 200
+        self.cancel_job.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_task_does_not_start_prefetch():
+    db = MagicMock()
+    db.tasks.find_one = AsyncMock(return_value={"status": TaskStatus.CANCELLED})
+    ad = {"ad_archive_id": "a", "snapshot": {"videos": [{"video_hd_url": "https://x/a.mp4"}]}}
+
+    with patch("src.services.task_service.MongoDB.get_db", return_value=db), \
+            patch("src.services.task_service.prefetch_videos") as prefetch:
+        assert await task_service._start_prefetch("t1", [ad], None) is None
+
+    prefetch.assert_not_called()
@@ -0,0 +1,127 @@
+"""
+Unit tests for coalescing duplicate parse requests.
+Uses mocks in place of the Motor database.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import DuplicateKeyError
+
+from src.db import Task, TaskStatus
+from src.services import task_service
+from src.services.task_coalescing import create_or_join_task, request_key
+from src.utils.timings import StageTimer
+
+URL = "https://www.facebook.com/ads/library/?active_status=all&ad_type=all&country=ALL&view_all_page_id=111"
+
+
+class TestRequestKey:
+    """Tests for request_key()"""
+
+    def test_parameter_order_and_media_type_do_not_matter(self):
+        reordered = "https://facebook.com/ads/library/?view_all_page_id=111&country=ALL&ad_type=all&active_status=all&media_type=video"
+        assert request_key(URL, 5) == request_key(reordered, 5)
+
+    def test_max_results_and_page_change_the_key(self):
+        assert request_key(URL, 5) != request_key(URL, 10)
+        assert request_key(URL, 5) != request_key(URL.replace("111", "222"), 5)
+
+    def test_analysis_options_change_the_key(self):
+        assert request_key(URL, 5) == request_key(URL, 5, True, 10, False)
+        assert request_key(URL, 5) != request_key(URL, 5, auto_analyze=False)
+        assert request_key(URL, 5) != request_key(URL, 5, analysis_budget=3)
+        assert request_key(URL, 5) != request_key(URL, 5, check_policy=True)
+
+
+class TestCreateOrJoinTask:
+    """Tests for create_or_join_task()"""
+
+    def setup_method(self):
+        self.db = MagicMock()
+        self.db.tasks.insert_one = AsyncMock()
+        self.db.tasks.find_one = AsyncMock(return_value=None)
+        self.db.tasks.update_one = AsyncMock()
+        self.patcher = patch("src.services.task_coalescing.MongoDB.get_db", return_value=self.db)
+        self.patcher.start()
+        self.task = Task(task_id="new", url=URL)
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_creates_task_with_inflight_key(self):
+        task_id, created = await create_or_join_task(self.task, "k")
+
+        assert (task_id, created) == ("new", True)
+        doc = self.db.tasks.insert_one.call_args[0][0]
+        assert doc["inflight_key"] == "k" and doc["request_key"] == "k"
+
+    @pytest.mark.asyncio
+    async def test_idempotency_key_returns_existing_task(self):
+        self.db.tasks.find_one.return_value = {"task_id": "old"}
+
+        assert await create_or_join_task(self.task, "k", "idem-1") == ("old", False)
+        self.db.tasks.insert_one.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_joins_running_task(self):
+        self.db.tasks.insert_one.side_effect = DuplicateKeyError("dup")
+        self.db.tasks.find_one.return_value = {"task_id": "old", "status": TaskStatus.ANALYZING}
+
+        assert await create_or_join_task(self.task, "k") == ("old", False)
+
+    @pytest.mark.asyncio
+    async def test_releases_key_of_finished_task_and_retries(self):
+        self.db.tasks.insert_one.side_effect = [DuplicateKeyError("dup"), None]
+        self.db.tasks.find_one.return_value = {"task_id": "old", "status": TaskStatus.COMPLETED}
+
+        assert await create_or_join_task(self.task, "k") == ("new", True)
+        self.db.tasks.update_one.assert_awaited_once_with(
+            {"task_id": "old", "inflight_key": "k"}, {"$unset": {"inflight_key": ""}}
+        )
+
+    @pytest.mark.asyncio
+    async def test_parsed_task_without_pending_analysis_is_not_joined(self):
+        self.db.tasks.insert_one.side_effect = [DuplicateKeyError("dup"), None]
+        self.db.tasks.find_one.return_value = {"task_id": "old", "status": TaskStatus.PARSED}
+
+        with patch("src.services.task_coalescing.JobQueue.has_active_job", new=AsyncMock(return_value=False)):
+            assert await create_or_join_task(self.task, "k") == ("new", True)
+
+    @pytest.mark.asyncio
+    async def test_parsed_task_with_queued_analysis_is_joined(self):
+        self.db.tasks.insert_one.side_effect = DuplicateKeyError("dup")
+        self.db.tasks.find_one.return_value = {"task_id": "old", "status": TaskStatus.PARSED}
+
+        with patch("src.services.task_coalescing.JobQueue.has_active_job", new=AsyncMock(return_value=True)):
+            assert await create_or_join_task(self.task, "k") == ("old", False)
+
+
+class TestReleaseOnParsed:
+    """inflight_key is released once a task is parsed without auto-analysis"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.tasks.update_one = AsyncMock()
+        self.enqueue = AsyncMock()
+        start_patches(
+            patch("src.services.task_service.MongoDB.get_db", return_value=self.db),
+            patch("src.services.task_service._save_parsed_ads", new=AsyncMock(return_value=True)),
+            patch("src.services.task_service.JobQueue.enqueue", new=self.enqueue),
+        )
+
+    @pytest.mark.asyncio
+    async def test_key_released_without_auto_analyze(self):
+        await task_service._finalize_parsed_ads("t1", URL, [{"ad_archive_id": "a"}], False, StageTimer())
+
+        self.db.tasks.update_one.assert_awaited_once_with({"task_id": "t1"}, {"$unset": {"inflight_key": ""}})
+        self.enqueue.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_key_kept_while_analysis_is_queued(self):
+        with patch("src.services.task_service._start_prefetch", new=AsyncMock(return_value=None)):
+            await task_service._finalize_parsed_ads("t1", URL, [{"ad_archive_id": "a"}], True, StageTimer())
+
+        self.enqueue.assert_awaited_once()
+        self.db.tasks.update_one.assert_not_called()
@@ -0,0 +1,101 @@
+"""
+Unit tests for task progress events and SSE formatting.
+Uses mocks in place of the Motor database.
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.services.task_events import TaskEvents, format_sse, sse_stream
+
+
+def _parse(frame: str):
+    lines = frame.strip().split("\n")
+    return lines[0].removeprefix("event: "), json.loads(lines[1].removeprefix("data: "))
+
+
+class TestSSEStream:
+    """Tests for sse_stream"""
+
+    def test_format_sse(self):
+        frame = format_sse("status", {"status": "PARSING"})
+
+        assert frame.endswith("\n\n")
+        assert _parse(frame) == ("status", {"status": "PARSING"})
+
+    @pytest.mark.asyncio
+    async def test_terminal_snapshot_closes_stream(self):
+        """A finished task only gets its snapshot"""
+        frames = [f async for f in sse_stream("t1", "task", {"status": "COMPLETED"}, ["COMPLETED", "FAILED"])]
+
+        assert len(frames) == 1
+        assert _parse(frames[0])[0] == "snapshot"
+
+    @pytest.mark.asyncio
+    async def test_stream_ends_on_terminal_status(self):
+        """Events are forwarded until a terminal status event"""
+        async def fake_subscribe(task_id, kind, since=None):
+            yield {"event": "creative", "data": {"ad_archive_id": "1", "outcome": "done"}}
+            yield None
+            yield {"event": "status", "data": {"status": "COMPLETED"}}
+            yield {"event": "creative", "data": {"ad_archive_id": "2"}}
+
+        with patch.object(TaskEvents, "subscribe", fake_subscribe):
+            frames = [f async for f in sse_stream("t1", "task", {"status": "ANALYZING"}, ["COMPLETED", "FAILED"])]
+
+        events = [_parse(f)[0] for f in frames]
+        assert events == ["snapshot", "creative", "status"]
+
+    @pytest.mark.asyncio
+    async def test_stream_starts_after_snapshot(self):
+        """Events published before the snapshot was read are not replayed"""
+        since = datetime(2025, 1, 1, 12, 0, 0)
+        seen = {}
+
+        async def fake_subscribe(task_id, kind, since=None):
+            seen["since"] = since
+            yield {"event": "status", "data": {"status": "COMPLETED"}}
+
+        with patch.object(TaskEvents, "subscribe", fake_subscribe):
+            [f async for f in sse_stream("t1", "task", {"status": "ANALYZING"}, ["COMPLETED"], since)]
+
+        assert seen["since"] == since
+
+
+class _Cursor:
+    """Tailable cursor stand-in that delivers its documents once, then dies."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.alive = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            self.alive = False
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+
+class TestSubscribe:
+    """Tests for TaskEvents.subscribe"""
+
+    @pytest.mark.asyncio
+    async def test_tail_is_bounded_by_since(self):
+        db = MagicMock()
+        db.task_events.find.return_value = _Cursor([{"_id": 1, "event": "status"}])
+        since = datetime(2025, 1, 1, 12, 0, 0)
+
+        with patch("src.services.task_events.MongoDB.get_db", return_value=db):
+            events = TaskEvents.subscribe("t1", "task", since)
+            doc = await events.__anext__()
+            await events.aclose()
+
+        assert doc["_id"] == 1
+        query = db.task_events.find.call_args.args[0]
+        assert query == {"task_id": "t1", "kind": "task", "ts": {"$gte": since}}
@@ -0,0 +1,104 @@
+"""
+Unit tests for per-creative checkpoints and progress counters of an analysis.
+Uses an in-memory task document in place of the Motor database.
+"""
+
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.db import CreativeAnalysis, TaskStatus
+from src.services import task_service
+
+
+class _TaskDoc:
+    """The single task document, updated like MongoDB would (dotted $set/$inc, $push)."""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def _apply(self, update):
+        for key, value in update.get("$set", {}).items():
+            self._path(key)[key.rsplit(".", 1)[-1]] = value
+        for key, value in update.get("$inc", {}).items():
+            parent = self._path(key)
+            name = key.rsplit(".", 1)[-1]
+            parent[name] = parent.get(name, 0) + value
+        for key, value in update.get("$push", {}).items():
+            self.doc.setdefault(key, []).append(value)
+
+    def _path(self, key):
+        node = self.doc
+        for part in key.split(".")[:-1]:
+            node = node.setdefault(part, {})
+        return node
+
+    async def find_one(self, *args, **kwargs):
+        return json.loads(json.dumps(self.doc, default=str))
+
+    async def update_one(self, query, update):
+        self._apply(update)
+        return MagicMock(matched_count=1)
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self._apply(update)
+        return {"progress": dict(self.doc["progress"])}
+
+
+class TestAnalysisProgress:
+    """Tests for the incremental results of analyze_creatives_task()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        start_patches(
+            patch("src.services.task_service.MongoDB.get_db", return_value=self.db),
+            patch("src.services.task_service.TaskEvents.publish", new=AsyncMock()),
+            patch("src.services.task_service.VideoCache.unpin_task", new=AsyncMock()),
+            patch("src.services.task_service._aggregate_analysis", new=AsyncMock(side_effect=RuntimeError("skip"))),
+            patch("src.services.task_service.ExecutorPool.run", new=AsyncMock(return_value="<html/>")),
+        )
+
+    def _task(self, tmp_path, ad_ids):
+        creatives_file = tmp_path / "ads.json"
+        creatives_file.write_text(json.dumps({"ads": [
+            {"ad_archive_id": ad_id, "snapshot": {"videos": [{"video_hd_url": f"https://x/{ad_id}.mp4"}]}}
+            for ad_id in ad_ids
+        ]}))
+        task = _TaskDoc({"task_id": "t1", "status": TaskStatus.PARSED, "creatives_file": str(creatives_file)})
+        self.db.tasks = task
+        return task
+
+    @pytest.mark.asyncio
+    async def test_each_creative_is_checkpointed_with_counters(self, tmp_path):
+        task = self._task(tmp_path, ["a", "b", "c"])
+        checkpoints = []
+
+        async def fake_analyze(idx, total, ad, *args):
+            checkpoints.append(len(task.doc["creatives_analyzed"]))  # Earlier creatives already stored
+            return CreativeAnalysis(creative_id=ad["ad_archive_id"], ad_archive_id=ad["ad_archive_id"])
+
+        with patch("src.services.task_service._analyze_single_creative", new=fake_analyze):
+            await task_service.analyze_creatives_task("t1")
+
+        assert checkpoints == [0, 1, 2]
+        assert task.doc["progress"] == {"total": 3, "done": 3, "failed": 0, "skipped": 0}
+        assert len(task.doc["creatives_analyzed"]) == 3
+        assert task.doc["status"] == TaskStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_failed_creative_is_counted_without_aborting(self, tmp_path):
+        task = self._task(tmp_path, ["a", "b", "c"])
+
+        async def fake_analyze(idx, total, ad, *args):
+            if ad["ad_archive_id"] == "b":
+                raise RuntimeError("download failed")
+            return CreativeAnalysis(creative_id=ad["ad_archive_id"], ad_archive_id=ad["ad_archive_id"])
+
+        with patch("src.services.task_service._analyze_single_creative", new=fake_analyze):
+            await task_service.analyze_creatives_task("t1")
+
+        assert task.doc["progress"] == {"total": 3, "done": 2, "failed": 1, "skipped": 0}
+        assert sorted(c["ad_archive_id"] for c in task.doc["creatives_analyzed"]) == ["a", "c"]
+        assert task.doc["status"] == TaskStatus.COMPLETED
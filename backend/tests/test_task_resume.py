@@ -0,0 +1,187 @@
+"""
+Unit tests for resuming an interrupted creative analysis.
+Uses mocks in place of the Motor database and Gemini.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.analysis.policy_checker import POLICY_PROMPT_VERSION
+from src.db import CreativeAnalysis, TaskStatus
+from src.main import app
+from src.services import task_service
+from src.services.job_handlers import run_analyze_creatives_job
+from src.services.job_queue import JobQueue, JobWorker
+from src.services.video_fingerprint import CreativeClusters
+
+
+def _analysis(ad_id):
+    return CreativeAnalysis(creative_id=ad_id, ad_archive_id=ad_id)
+
+
+class TestResumeAnalysis:
+    """Tests for analyze_creatives_task(resume=True)"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.tasks.update_one = AsyncMock()
+        self.db.tasks.find_one_and_update = AsyncMock(return_value={"progress": {}})
+        start_patches(
+            patch("src.services.task_service.MongoDB.get_db", return_value=self.db),
+            patch("src.services.task_service.TaskEvents.publish", new=AsyncMock()),
+            patch("src.services.task_service.AnalysisCache.get", new=AsyncMock(return_value=None)),
+            patch("src.services.task_service._aggregate_analysis", new=AsyncMock(side_effect=RuntimeError("skip"))),
+            patch("src.services.task_service.ExecutorPool.run", new=AsyncMock(return_value="<html/>")),
+        )
+
+    def _task(self, tmp_path, status):
+        creatives_file = tmp_path / "ads.json"
+        creatives_file.write_text(json.dumps({"ads": [
+            {"ad_archive_id": ad_id, "snapshot": {"videos": [{"video_hd_url": f"https://x/{ad_id}.mp4"}]}}
+            for ad_id in ("a", "b", "c")
+        ]}))
+        return {
+            "task_id": "t1",
+            "status": status,
+            "creatives_file": str(creatives_file),
+            "analysis_selection": [{"ad_archive_id": "c"}, {"ad_archive_id": "a"}, {"ad_archive_id": "b"}],
+            "creatives_analyzed": [_analysis("c").model_dump()],
+        }
+
+    @pytest.mark.asyncio
+    async def test_resume_only_analyzes_remaining_creatives(self, tmp_path):
+        self.db.tasks.find_one = AsyncMock(return_value=self._task(tmp_path, TaskStatus.ANALYZING))
+        analyzed = []
+
+        async def fake_analyze(idx, total, ad, *args):
+            analyzed.append(ad["ad_archive_id"])
+            return _analysis(ad["ad_archive_id"])
+
+        with patch("src.services.task_service._analyze_single_creative", new=fake_analyze):
+            await task_service.analyze_creatives_task("t1", resume=True)
+
+        assert sorted(analyzed) == ["a", "b"]
+        final = self.db.tasks.update_one.call_args_list[-1].args[1]["$set"]
+        assert final["status"] == TaskStatus.COMPLETED
+        assert [c["ad_archive_id"] for c in final["creatives_analyzed"]] == ["c", "a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_without_resume_requires_parsed_status(self, tmp_path):
+        self.db.tasks.find_one = AsyncMock(return_value=self._task(tmp_path, TaskStatus.ANALYZING))
+
+        await task_service.analyze_creatives_task("t1")
+
+        final = self.db.tasks.update_one.call_args_list[-1].args[1]["$set"]
+        assert final["status"] == TaskStatus.FAILED
+
+    @pytest.mark.asyncio
+    async def test_job_released_on_shutdown_resumes_when_redelivered(self, tmp_path):
+        self.db.tasks.find_one = AsyncMock(return_value=self._task(tmp_path, TaskStatus.PARSED))
+        started = asyncio.Event()
+        analyzed = []
+
+        async def hang(idx, total, ad, *args):
+            started.set()
+            await asyncio.sleep(30)
+
+        async def fake_analyze(idx, total, ad, *args):
+            analyzed.append(ad["ad_archive_id"])
+            return _analysis(ad["ad_archive_id"])
+
+        self.db.jobs.find_one = AsyncMock(return_value=None)  # No other job holds a lease
+        job = {"job_id": "j1", "type": "analyze_creatives", "attempts": 1, "max_attempts": 3, "payload": {"task_id": "t1"}}
+        handlers = {"analyze_creatives": run_analyze_creatives_job}
+
+        # Worker shuts down mid-analysis and hands the job back
+        worker = JobWorker(handlers, worker_id="w1")
+        with patch("src.services.task_service._analyze_single_creative", new=hang), \
+                patch.object(JobQueue, "release", AsyncMock()) as release:
+            task = asyncio.create_task(worker._execute(job))
+            worker._running["j1"] = task
+            await asyncio.wait_for(started.wait(), timeout=5)
+            await worker.stop()
+        release.assert_awaited_once_with("j1", "w1")
+
+        # Redelivered with the attempt not counted, task still ANALYZING
+        self.db.tasks.find_one.return_value = self._task(tmp_path, TaskStatus.ANALYZING)
+        with patch("src.services.task_service._analyze_single_creative", new=fake_analyze), \
+                patch.object(JobQueue, "complete", AsyncMock()) as complete:
+            await JobWorker(handlers, worker_id="w2")._execute(job)
+
+        complete.assert_awaited_once_with("j1", "w2")
+        assert sorted(analyzed) == ["a", "b"]
+        final = self.db.tasks.update_one.call_args_list[-1].args[1]["$set"]
+        assert final["status"] == TaskStatus.COMPLETED
+
+
+class TestSeedClustersCombined:
+    """Tests for _seed_clusters() with check_policy"""
+
+    @pytest.mark.asyncio
+    async def test_duplicates_inherit_checkpointed_policy_check(self):
+        policy = {"compliance_summary": {"risk_level": "high", "will_pass_moderation": False}}
+        leader = CreativeAnalysis(creative_id="c", ad_archive_id="c", video_hash="h1", policy_check=policy)
+        clusters = CreativeClusters()
+
+        with patch("src.services.task_service.AnalysisCache.get", new=AsyncMock(return_value={"hook": {}})):
+            await task_service._seed_clusters(clusters, [leader], check_policy=True)
+
+        cluster, is_representative = await clusters.join("a", "h1", None)
+        assert not is_representative
+        assert (await cluster.wait())["policy_check"] == policy
+
+    @pytest.mark.asyncio
+    async def test_policy_check_falls_back_to_cache(self):
+        policy = {"compliance_summary": {"risk_level": "low"}}
+        leader = CreativeAnalysis(creative_id="c", ad_archive_id="c", video_hash="h1")
+        cache = AsyncMock(side_effect=lambda ad_id, video_hash, model, version: (
+            policy if version == POLICY_PROMPT_VERSION else {"hook": {}}
+        ))
+        clusters = CreativeClusters()
+
+        with patch("src.services.task_service.AnalysisCache.get", new=cache):
+            await task_service._seed_clusters(clusters, [leader], check_policy=True)
+
+        cluster, _ = await clusters.join("a", "h1", None)
+        assert (await cluster.wait())["policy_check"] == policy
+
+
+@pytest.mark.asyncio
+async def test_redelivered_job_resumes():
+    with patch("src.services.job_handlers.JobQueue.has_live_lease", new=AsyncMock(return_value=False)), \
+            patch("src.services.job_handlers.analyze_creatives_task", new=AsyncMock()) as analyze:
+        await run_analyze_creatives_job({"job_id": "j2", "payload": {"task_id": "t1"}, "attempts": 2})
+
+    analyze.assert_awaited_once_with("t1", resume=True)
+
+
+@pytest.mark.asyncio
+async def test_duplicate_job_skips_task_analyzed_by_another_worker():
+    has_live_lease = AsyncMock(return_value=True)
+    with patch("src.services.job_handlers.JobQueue.has_live_lease", new=has_live_lease), \
+            patch("src.services.job_handlers.analyze_creatives_task", new=AsyncMock()) as analyze:
+        await run_analyze_creatives_job({"job_id": "j2", "payload": {"task_id": "t1"}, "attempts": 1})
+
+    has_live_lease.assert_awaited_once_with("analyze_creatives", "t1", exclude_job_id="j2")
+    analyze.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_analyze_creatives_rejects_task_with_active_job():
+    db = MagicMock()
+    db.tasks.find_one = AsyncMock(return_value={"task_id": "t1", "status": TaskStatus.PARSED, "total_ads": 5})
+    enqueue = AsyncMock()
+    transport = httpx.ASGITransport(app=app)
+    with patch("src.api.routes.MongoDB.get_db", return_value=db), \
+            patch("src.api.routes.JobQueue.has_active_job", new=AsyncMock(return_value=True)), \
+            patch("src.api.routes.JobQueue.enqueue", new=enqueue):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/v1/analyze-creatives/t1")
+
+    assert response.status_code == 409
+    enqueue.assert_not_called()
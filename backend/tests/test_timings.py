@@ -0,0 +1,72 @@
+"""
+Unit tests for stage timing helpers and percentile reports.
+"""
+
+from src.utils.timings import StageTimer, percentile, timed, timing_report
+
+
+class TestTimings:
+    """Tests for timing collection and aggregation"""
+
+    def test_timed_accumulates_and_ignores_none(self):
+        timings = {}
+        with timed(timings, "upload"):
+            pass
+        with timed(timings, "upload"):
+            pass
+        with timed(None, "upload"):
+            pass
+
+        assert set(timings) == {"upload"}
+        assert timings["upload"] >= 0
+
+    def test_stage_timer_update_uses_dotted_fields(self):
+        timer = StageTimer()
+        with timer.stage("apify"):
+            pass
+        timer.add_bytes("download", 10)
+        timer.add_bytes("download", 5)
+
+        update = timer.as_update()
+
+        assert "timings.stages.apify" in update
+        assert update["timings.bytes.download"] == 15
+
+    def test_stage_timer_keeps_flags_out_of_stages(self):
+        timer = StageTimer()
+        timer.stages["upload"] = 1.5
+        timer.stages["gemini_file_reused"] = True  # Set by GeminiFiles.acquire
+
+        update = timer.as_update()
+
+        assert update == {"timings.stages.upload": 1.5, "timings.flags.gemini_file_reused": True}
+
+    def test_timing_report_ignores_flags_stored_as_stages(self):
+        report = timing_report([{"stages": {"upload": 2.0, "gemini_file_reused": True}}])
+
+        assert set(report["stages"]) == {"upload"}
+
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) is None
+
+    def test_timing_report_splits_stages_creatives_and_bytes(self):
+        docs = [
+            {"stages": {"apify": 10.0}, "creatives": [
+                {"ad_archive_id": "1", "generate": 4.0, "download_bytes": 100, "download_cached": True}
+            ]},
+            {"stages": {"apify": 20.0}, "bytes": {"download": 300}},
+            None,
+        ]
+
+        report = timing_report(docs)
+
+        assert report["tasks"] == 2
+        assert report["stages"]["apify"]["p50"] == 10.0
+        assert report["stages"]["apify"]["max"] == 20.0
+        assert report["creative_stages"] == {"generate": {"count": 1, "p50": 4.0, "p90": 4.0, "p99": 4.0, "max": 4.0}}
+        assert report["bytes"]["creative_download_bytes"]["count"] == 1
+        assert report["bytes"]["download"]["count"] == 1
@@ -0,0 +1,93 @@
+"""
+Unit tests for transient error handling in background tasks.
+Uses mocks in place of the Motor database and the Apify client.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from google.api_core import exceptions as google_exceptions
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.db import JobStatus, TaskStatus
+from src.services.job_handlers import run_parse_ads_job
+from src.services.job_queue import JobWorker
+from src.utils.transient_errors import is_transient_error
+
+
+class _ApiError(Exception):
+    """Stand-in for ApifyApiError (carries the HTTP status as status_code)."""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_transient_errors_are_recognized():
+    assert is_transient_error(_ApiError(429))
+    assert is_transient_error(google_exceptions.ServiceUnavailable("overloaded"))
+    assert is_transient_error(httpx.ConnectTimeout("timed out"))
+    assert is_transient_error(asyncio.TimeoutError())
+    assert not is_transient_error(_ApiError(400))
+    assert not is_transient_error(ValueError("bad input"))
+
+
+def test_wrapped_transient_error_is_recognized():
+    try:
+        try:
+            raise _ApiError(503)
+        except Exception as e:
+            raise Exception(f"Failed to extract ads: {e}") from e
+    except Exception as wrapped:
+        assert is_transient_error(wrapped)
+
+
+class TestParseJobRetry:
+    """A parse job failing on a transient Apify error is retried, not failed"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.jobs.update_one = AsyncMock()
+        self.db.tasks.update_one = AsyncMock()
+        self.apify = AsyncMock()
+        start_patches(
+            patch.dict("os.environ", {"APIFY_API_KEY": "test-key", "JOB_RETRY_BASE_SECONDS": "30"}),
+            patch("src.services.task_service.MongoDB.get_db", return_value=self.db),
+            patch("src.services.task_service.TaskEvents.publish", new=AsyncMock()),
+            patch("src.services.apify_service.ExecutorPool.run", new=self.apify),
+        )
+
+    async def _run(self):
+        job = {
+            "job_id": "j1", "type": "parse_ads", "attempts": 1, "max_attempts": 3,
+            "payload": {"task_id": "t1", "url": "https://www.facebook.com/ads/library/?q=x"}
+        }
+        await JobWorker({"parse_ads": run_parse_ads_job}, worker_id="w1")._execute(job)
+
+    def _task_statuses(self):
+        return [c.args[1]["$set"].get("status") for c in self.db.tasks.update_one.call_args_list]
+
+    @pytest.mark.asyncio
+    async def test_transient_error_is_rescheduled_with_backoff(self):
+        self.apify.side_effect = _ApiError(429)
+        started = datetime.utcnow()
+
+        await self._run()
+
+        update = self.db.jobs.update_one.call_args.args[1]["$set"]
+        assert update["status"] == JobStatus.QUEUED
+        assert update["run_at"] >= started + timedelta(seconds=30)
+        assert TaskStatus.FAILED not in self._task_statuses()
+
+    @pytest.mark.asyncio
+    async def test_permanent_error_fails_task(self):
+        self.apify.side_effect = _ApiError(400)
+
+        await self._run()
+
+        update = self.db.jobs.update_one.call_args.args[1]["$set"]
+        assert update["status"] == JobStatus.COMPLETED
+        assert self._task_statuses()[-1] == TaskStatus.FAILED
@@ -0,0 +1,256 @@
+"""
+Unit tests for the content-addressed video cache.
+Uses mocks in place of the Motor database and the CDN.
+"""
+
+import asyncio
+import hashlib
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services import video_cache
+from src.services.video_cache import VideoCache, download_to_blob, video_alias_key
+
+URL = "https://video-waw1-1.xx.fbcdn.net/v/t42.1790-2/123_n.mp4?_nc_cat=1&oh=aaa&oe=111"
+RESIGNED = "https://video-fra3-2.xx.fbcdn.net/v/t42.1790-2/123_n.mp4?_nc_cat=7&oh=bbb&oe=222"
+
+
+def _fake_download(*chunks, error=None):
+    """Stand-in for VideoDownloader.download writing the given chunks."""
+    async def download(url, path, cancel_event=None, timings=None):
+        data = b"".join(chunks)
+        path.write_bytes(data)
+        if error:
+            raise error
+        return hashlib.sha256(data).hexdigest(), len(data)
+    return download
+
+
+def test_alias_key_ignores_signature_and_host():
+    assert video_alias_key(URL, "ad1") == video_alias_key(RESIGNED, "ad1")
+    assert video_alias_key(URL, "ad1") != video_alias_key(URL, "ad2")
+
+
+@pytest.mark.asyncio
+async def test_download_is_stored_by_content_hash(tmp_path):
+    timings = {}
+    with patch.object(video_cache, "CACHE_DIR", tmp_path), \
+         patch("src.services.video_cache.VideoDownloader.download", new=_fake_download(b"hel", b"lo")):
+        content_hash, size = await download_to_blob(URL, timings)
+
+    assert content_hash == hashlib.sha256(b"hello").hexdigest()
+    assert size == 5 and timings["download_bytes"] == 5
+    assert [p.name for p in tmp_path.iterdir()] == [f"{content_hash}.mp4"]
+
+
+class TestVideoCacheFetch:
+    """Tests for VideoCache.fetch()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.video_aliases.find_one = AsyncMock(return_value=None)
+        self.db.video_aliases.update_one = AsyncMock()
+        self.db.video_blobs.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        self.db.video_cache_stats.update_one = AsyncMock()
+        start_patches(
+            patch("src.services.video_cache.MongoDB.get_db", return_value=self.db),
+            patch("src.services.video_cache.VideoCache.evict", new=AsyncMock()),
+        )
+
+    @pytest.mark.asyncio
+    async def test_resigned_url_hits_stored_blob(self, tmp_path):
+        (tmp_path / "abc.mp4").write_bytes(b"video")
+        self.db.video_aliases.find_one.return_value = {"content_hash": "abc"}
+        timings = {}
+
+        with patch.object(video_cache, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_cache.download_to_blob", new=AsyncMock()) as run:
+            path, content_hash = await VideoCache.fetch(RESIGNED, "ad1", timings, task_id="t1")
+
+        assert content_hash == "abc" and path == str(tmp_path / "abc.mp4")
+        assert timings["download_cached"] is True
+        run.assert_not_called()
+        assert self.db.video_blobs.update_one.call_args.args[1]["$addToSet"] == {"pinned_by": "t1"}
+        self.db.video_cache_stats.update_one.assert_awaited_once_with(
+            {"_id": "counters"}, {"$inc": {"hits": 1}}, upsert=True
+        )
+
+    @pytest.mark.asyncio
+    async def test_blob_evicted_after_lookup_is_downloaded_again(self, tmp_path):
+        (tmp_path / "abc.mp4").write_bytes(b"video")
+        self.db.video_aliases.find_one.return_value = {"content_hash": "abc"}
+        self.db.video_blobs.update_one.return_value = MagicMock(matched_count=0)
+
+        with patch.object(video_cache, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_cache.download_to_blob", new=AsyncMock(return_value=("def", 5))) as run:
+            _, content_hash = await VideoCache.fetch(URL, "ad1")
+
+        assert content_hash == "def"
+        run.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_miss_downloads_and_records_alias(self, tmp_path):
+        with patch.object(video_cache, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_cache.download_to_blob", new=AsyncMock(return_value=("abc", 5))):
+            path, content_hash = await VideoCache.fetch(URL, "ad1")
+
+        assert content_hash == "abc"
+        alias_filter, alias_update = self.db.video_aliases.update_one.call_args.args
+        assert alias_filter == {"alias": video_alias_key(URL, "ad1")}
+        assert alias_update["$set"]["content_hash"] == "abc"
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class TestVideoCacheEviction:
+    """Tests for VideoCache.evict() and cleanup_orphans()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.db = MagicMock()
+        self.db.tasks.distinct = AsyncMock(return_value=["running"])
+        self.db.video_blobs.update_many = AsyncMock()
+        self.db.video_blobs.find_one_and_delete = AsyncMock(side_effect=lambda query: {"content_hash": query["content_hash"]})
+        self.db.video_aliases.delete_many = AsyncMock()
+        self.db.video_cache_stats.update_one = AsyncMock()
+        start_patches(
+            patch("src.services.video_cache.MongoDB.get_db", return_value=self.db),
+            patch("src.services.video_cache.VideoCache._total_bytes", new=AsyncMock(return_value=300)),
+            patch("src.services.video_cache.ExecutorPool.run", new=AsyncMock(side_effect=lambda pool, fn, *args: fn(*args))),
+        )
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_until_under_cap(self, tmp_path):
+        for name in ("old", "mid", "new"):
+            (tmp_path / f"{name}.mp4").write_bytes(b"x")
+        self.db.video_blobs.find = MagicMock(return_value=_Cursor([
+            {"content_hash": "old", "size": 100},
+            {"content_hash": "mid", "size": 100},
+            {"content_hash": "new", "size": 100},
+        ]))
+
+        with patch.object(video_cache, "CACHE_DIR", tmp_path):
+            result = await VideoCache.evict(max_bytes=150)
+
+        assert result == {"evicted": 2, "freed_bytes": 200}
+        assert sorted(p.stem for p in tmp_path.iterdir()) == ["new"]
+        self.db.video_aliases.delete_many.assert_awaited_once_with({"content_hash": {"$in": ["old", "mid"]}})
+
+    @pytest.mark.asyncio
+    async def test_no_eviction_under_cap(self):
+        assert await VideoCache.evict(max_bytes=1000) == {"evicted": 0, "freed_bytes": 0}
+        self.db.video_blobs.find_one_and_delete.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_removes_unindexed_files_and_missing_blobs(self, tmp_path):
+        (tmp_path / "known.mp4").write_bytes(b"x")
+        (tmp_path / "legacy0123456789.mp4").write_bytes(b"xyz")
+        self.db.video_blobs.distinct = AsyncMock(return_value=["known", "gone"])
+        self.db.video_blobs.delete_many = AsyncMock()
+
+        with patch.object(video_cache, "CACHE_DIR", tmp_path):
+            result = await VideoCache.cleanup_orphans(grace_seconds=0)
+
+        assert result == {"files_removed": 1, "bytes_freed": 3, "records_removed": 1}
+        assert [p.name for p in tmp_path.iterdir()] == ["known.mp4"]
+        self.db.video_blobs.delete_many.assert_awaited_once_with({"content_hash": {"$in": ["gone"]}})
+
+
+class TestSingleFlightDownload:
+    """Tests for atomic, deduplicated downloads"""
+
+    @pytest.mark.asyncio
+    async def test_failed_download_leaves_no_partial_file(self, tmp_path):
+        broken = _fake_download(b"partial", error=ConnectionError("reset"))
+
+        with patch.object(video_cache, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_cache.VideoDownloader.download", new=broken):
+            with pytest.raises(ConnectionError):
+                await download_to_blob(URL, alias="a1")
+
+        assert [p.name for p in tmp_path.iterdir()] == [".locks"]
+
+    @pytest.mark.asyncio
+    async def test_download_finished_by_another_process_is_reused(self, tmp_path):
+        (tmp_path / "abc.mp4").write_bytes(b"video")
+        (tmp_path / ".locks").mkdir()
+        (tmp_path / ".locks" / "a1.lock").write_text("abc")
+        timings = {}
+
+        with patch.object(video_cache, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_cache.VideoDownloader.download", new=AsyncMock()) as download:
+            assert await download_to_blob(URL, timings, alias="a1") == ("abc", 5)
+
+        download.assert_not_called()
+        assert timings["download_cached"] is True
+
+    @pytest.mark.asyncio
+    async def test_concurrent_fetches_share_one_download(self):
+        db = MagicMock()
+        db.video_aliases.find_one = AsyncMock(return_value=None)
+        db.video_aliases.update_one = AsyncMock()
+        db.video_blobs.update_one = AsyncMock()
+        db.video_cache_stats.update_one = AsyncMock()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_download(*args):
+            started.set()
+            await release.wait()
+            return "abc", 5
+
+        with patch("src.services.video_cache.MongoDB.get_db", return_value=db), \
+             patch("src.services.video_cache.VideoCache.evict", new=AsyncMock()), \
+             patch("src.services.video_cache.download_to_blob", new=AsyncMock(side_effect=slow_download)) as run:
+            first = asyncio.create_task(VideoCache.fetch(URL, "ad1"))
+            await started.wait()
+            second = asyncio.create_task(VideoCache.fetch(RESIGNED, "ad1"))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(first, second)
+
+        assert [content_hash for _, content_hash in results] == ["abc", "abc"]
+        assert run.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_proxies_count_towards_cap_and_are_evicted_with_blob(tmp_path):
+    proxy_dir = tmp_path / video_cache.PROXY_DIRNAME
+    proxy_dir.mkdir()
+    for name in ("old", "new"):
+        (tmp_path / f"{name}.mp4").write_bytes(b"x" * 100)
+        (proxy_dir / f"{name}_analysis.mp4").write_bytes(b"x" * 40)
+    db = MagicMock()
+    db.tasks.distinct = AsyncMock(return_value=[])
+    db.video_blobs.aggregate = MagicMock(return_value=MagicMock(to_list=AsyncMock(return_value=[{"total": 200}])))
+    db.video_blobs.update_many = AsyncMock()
+    db.video_blobs.find = MagicMock(return_value=_Cursor([
+        {"content_hash": "old", "size": 100},
+        {"content_hash": "new", "size": 100},
+    ]))
+    db.video_blobs.find_one_and_delete = AsyncMock(side_effect=lambda query: {"content_hash": query["content_hash"]})
+    db.video_aliases.delete_many = AsyncMock()
+    db.video_cache_stats.update_one = AsyncMock()
+
+    with patch.object(video_cache, "CACHE_DIR", tmp_path), \
+            patch("src.services.video_cache.MongoDB.get_db", return_value=db), \
+            patch("src.services.video_cache.ExecutorPool.run", new=AsyncMock(side_effect=lambda pool, fn, *args: fn(*args))):
+        result = await VideoCache.evict(max_bytes=200)  # Blobs alone would fit
+
+    assert result == {"evicted": 1, "freed_bytes": 140}
+    assert [p.name for p in proxy_dir.iterdir()] == ["new_analysis.mp4"]
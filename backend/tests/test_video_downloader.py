@@ -0,0 +1,82 @@
+"""
+Unit tests for the shared video downloader.
+Uses httpx.MockTransport in place of the CDN.
+"""
+
+import hashlib
+
+import httpx
+import pytest
+from unittest.mock import patch
+
+from src.services.video_downloader import VideoDownloader
+
+URL = "https://video.xx.fbcdn.net/v/123_n.mp4?oh=aaa"
+
+
+class _BrokenStream(httpx.AsyncByteStream):
+    """Response body that drops the connection after the first chunk."""
+
+    async def __aiter__(self):
+        yield b"hel"
+        raise httpx.ReadError("connection reset")
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestVideoDownloader:
+    """Tests for VideoDownloader.download()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        self.requests = []
+        start_patches(
+            patch("src.services.video_downloader.RETRY_BASE_SECONDS", 0),
+        )
+
+    @pytest.mark.asyncio
+    async def test_interrupted_download_resumes_with_range(self, tmp_path):
+        def handler(request):
+            self.requests.append(request.headers.get("Range"))
+            if len(self.requests) == 1:
+                return httpx.Response(200, stream=_BrokenStream())
+            return httpx.Response(206, content=b"lo")
+
+        path = tmp_path / "video.part"
+        timings = {}
+        with patch.object(VideoDownloader, "client", return_value=_client(handler)):
+            content_hash, size = await VideoDownloader.download(URL, path, timings=timings)
+
+        assert self.requests == [None, "bytes=3-"]
+        assert path.read_bytes() == b"hello"
+        assert (content_hash, size) == (hashlib.sha256(b"hello").hexdigest(), 5)
+        assert "download" in timings
+
+    @pytest.mark.asyncio
+    async def test_range_ignored_by_server_restarts_download(self, tmp_path):
+        def handler(request):
+            self.requests.append(request.headers.get("Range"))
+            if len(self.requests) == 1:
+                return httpx.Response(200, stream=_BrokenStream())
+            return httpx.Response(200, content=b"hello")
+
+        path = tmp_path / "video.part"
+        with patch.object(VideoDownloader, "client", return_value=_client(handler)):
+            content_hash, size = await VideoDownloader.download(URL, path)
+
+        assert path.read_bytes() == b"hello"
+        assert content_hash == hashlib.sha256(b"hello").hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, tmp_path):
+        def handler(request):
+            self.requests.append(request.headers.get("Range"))
+            return httpx.Response(403)
+
+        with patch.object(VideoDownloader, "client", return_value=_client(handler)):
+            with pytest.raises(httpx.HTTPStatusError):
+                await VideoDownloader.download(URL, tmp_path / "video.part")
+
+        assert len(self.requests) == 1
@@ -0,0 +1,78 @@
+"""
+Unit tests for perceptual video fingerprints and duplicate clustering.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from src.services.video_fingerprint import CreativeClusters, dhash, fingerprint_distance, fingerprint_video
+
+
+def _frame(values):
+    return bytes(values)
+
+
+class TestFingerprint:
+    """Tests for dHash and fingerprint distance"""
+
+    def test_dhash_of_gradient(self):
+        # Every row decreasing left-to-right -> all 64 bits set
+        frame = _frame([255 - x * 10 for x in range(9)] * 8)
+
+        assert dhash(frame) == 2 ** 64 - 1
+
+    def test_dhash_ignores_brightness_shift(self):
+        frame = [(x * 37 + y * 11) % 200 for y in range(8) for x in range(9)]
+        brighter = [v + 40 for v in frame]
+
+        assert dhash(_frame(frame)) == dhash(_frame(brighter))
+
+    def test_distance_is_mean_hamming(self):
+        assert fingerprint_distance([0b1111, 0], [0b0011, 0]) == 1.0
+        assert fingerprint_distance([], [1]) == float("inf")
+
+    def test_fingerprints_of_different_length_never_match(self):
+        assert fingerprint_distance([0, 0, 0], [0, 0]) == float("inf")
+
+    def test_short_video_has_no_fingerprint(self):
+        with patch("src.services.video_fingerprint.ffmpeg_available", return_value=True), \
+                patch("src.services.video_fingerprint.sample_gray_frames", return_value=[bytes(72)] * 3):
+            assert fingerprint_video("/cache/v.mp4", frame_count=8) is None
+            assert len(fingerprint_video("/cache/v.mp4", frame_count=3)) == 3
+
+
+class TestCreativeClusters:
+    """Tests for the per-task duplicate registry"""
+
+    @pytest.mark.asyncio
+    async def test_identical_content_joins_cluster(self):
+        clusters = CreativeClusters(max_distance=5)
+
+        first, first_rep = await clusters.join("a", "hash1", None)
+        second, second_rep = await clusters.join("b", "hash1", None)
+
+        assert first is second
+        assert first_rep is True and second_rep is False
+        assert clusters.duplicate_groups() == [{"representative": "a", "members": ["a", "b"], "size": 2}]
+
+    @pytest.mark.asyncio
+    async def test_near_identical_fingerprints_cluster(self):
+        clusters = CreativeClusters(max_distance=5)
+
+        await clusters.join("a", "hash1", [0, 0])
+        near, near_rep = await clusters.join("b", "hash2", [0b111, 0])
+        far, far_rep = await clusters.join("c", "hash3", [2 ** 64 - 1, 2 ** 64 - 1])
+
+        assert near_rep is False and near.representative == "a"
+        assert far_rep is True
+        assert len(clusters.duplicate_groups()) == 1
+
+    @pytest.mark.asyncio
+    async def test_members_receive_representative_result(self):
+        clusters = CreativeClusters()
+        cluster, _ = await clusters.join("a", "hash1", None)
+        await clusters.join("b", "hash1", None)
+
+        cluster.resolve({"summary": "x"})
+
+        assert await cluster.wait() == {"summary": "x"}
@@ -0,0 +1,54 @@
+"""
+Unit tests for prefetching creative videos during parsing.
+Uses mocks in place of the video cache.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.video_prefetch import prefetch_videos
+from src.utils.cancellation import OperationCancelled
+
+
+class TestPrefetchVideos:
+    """Tests for prefetch_videos()"""
+
+    @pytest.mark.asyncio
+    async def test_fetches_all_videos_pinned_to_task(self, monkeypatch):
+        monkeypatch.setenv("PREFETCH_QUEUE_SIZE", "1")
+        videos = [(f"ad{i}", f"https://v/{i}.mp4") for i in range(5)]
+
+        with patch("src.services.video_prefetch.VideoCache.fetch", new=AsyncMock(return_value=("p", "h"))) as fetch:
+            stats = await prefetch_videos("t1", videos)
+
+        assert stats["fetched"] == 5 and stats["failed"] == 0
+        assert sorted(call.args[1] for call in fetch.await_args_list) == [ad_id for ad_id, _ in videos]
+        assert all(call.kwargs["task_id"] == "t1" for call in fetch.await_args_list)
+
+    @pytest.mark.asyncio
+    async def test_failed_download_does_not_stop_prefetch(self):
+        async def fetch(url, ad_id, **kwargs):
+            if ad_id == "bad":
+                raise ConnectionError("expired link")
+            return "p", "h"
+
+        with patch("src.services.video_prefetch.VideoCache.fetch", new=fetch):
+            stats = await prefetch_videos("t1", [("bad", "u1"), ("ok", "u2")])
+
+        assert stats["fetched"] == 1 and stats["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancellation_stops_all_workers(self, monkeypatch):
+        monkeypatch.setenv("PREFETCH_QUEUE_SIZE", "1")
+        monkeypatch.setenv("PREFETCH_CONCURRENCY", "2")
+
+        async def fetch(url, ad_id, **kwargs):
+            if ad_id == "ad0":
+                raise OperationCancelled("Video download cancelled")
+            await asyncio.sleep(10)
+
+        with patch("src.services.video_prefetch.VideoCache.fetch", new=fetch):
+            with pytest.raises(OperationCancelled):
+                await asyncio.wait_for(prefetch_videos("t1", [(f"ad{i}", "u") for i in range(6)]), timeout=2)
@@ -0,0 +1,62 @@
+"""
+Unit tests for downscaled Gemini upload proxies.
+ffmpeg is mocked; only the fallback logic is tested here.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from src.services import video_proxy
+from src.services.video_proxy import make_proxy
+
+
+def _fake_transcode(output: bytes, ok: bool = True):
+    def transcode(src_path, dst_path, **profile):
+        if ok:
+            with open(dst_path, "wb") as f:
+                f.write(output)
+        return ok
+    return transcode
+
+
+class TestMakeProxy:
+    """Tests for make_proxy()"""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, start_patches):
+        start_patches(patch("src.services.video_proxy.ffmpeg_available", return_value=True))
+
+    def _original(self, tmp_path):
+        path = tmp_path / "abc.mp4"
+        path.write_bytes(b"x" * 1000)
+        return str(path)
+
+    def test_smaller_proxy_is_cached_by_hash_and_profile(self, tmp_path):
+        original = self._original(tmp_path)
+        with patch.object(video_proxy, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_proxy.transcode", side_effect=_fake_transcode(b"y" * 100)) as transcode:
+            first = make_proxy(original, "analysis")
+            second = make_proxy(original, "analysis")
+
+        assert first == second == str(tmp_path / "proxies" / "abc_analysis.mp4")
+        assert transcode.call_count == 1
+        assert transcode.call_args.kwargs["short_side"] == video_proxy.PROXY_PROFILES["analysis"]["short_side"]
+
+    def test_falls_back_to_original_when_not_smaller(self, tmp_path):
+        original = self._original(tmp_path)
+        with patch.object(video_proxy, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_proxy.transcode", side_effect=_fake_transcode(b"y" * 2000)) as transcode:
+            assert make_proxy(original, "policy") == original
+            assert make_proxy(original, "policy") == original
+
+        assert transcode.call_count == 1  # "No gain" is remembered
+        assert [p.name for p in (tmp_path / "proxies").iterdir()] == ["abc_policy.nogain"]
+
+    def test_falls_back_to_original_on_failure_or_without_ffmpeg(self, tmp_path, monkeypatch):
+        original = self._original(tmp_path)
+        with patch.object(video_proxy, "CACHE_DIR", tmp_path), \
+             patch("src.services.video_proxy.transcode", side_effect=_fake_transcode(b"", ok=False)):
+            assert make_proxy(original, "analysis") == original
+
+        monkeypatch.setenv("VIDEO_PROXY_ENABLED", "false")
+        assert make_proxy(original, "analysis") == original